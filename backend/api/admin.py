@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from .models import (
     CommunityUser,
     Category,
@@ -12,13 +13,43 @@ from .models import (
     ListingTag,
     Message,
     Order,  # ✅ NEW
+    OutboundEmail,
+    StripeEvent,
+    PlatformDailyStats,
+    PlatformDailyOrders,
+    PlatformCategoryListings,
 )
+from .pagination import EstimatedCountPaginator
 
 User = get_user_model()
 
 
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    For tables that grow without bound: estimated page counts, no second
+    COUNT(*) of the whole table next to a filtered list, and no per-filter
+    facet counts.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """Rows maintained by code (api.platform_stats); refresh instead of editing."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(User)
-class CommunityUserAdmin(admin.ModelAdmin):
+class CommunityUserAdmin(LargeTableAdmin):
     list_display = ("id", "username", "email", "is_buyer", "is_seller", "is_admin")
     list_filter = ("is_buyer", "is_seller", "is_admin")
     search_fields = ("username", "email")
@@ -43,7 +74,7 @@ class OfferingAdmin(admin.ModelAdmin):
 
 
 @admin.register(CommunityPosting)
-class CommunityPostingAdmin(admin.ModelAdmin):
+class CommunityPostingAdmin(LargeTableAdmin):
     list_display = ("id", "title", "user", "category", "price", "location", "created_at")
     list_filter = ("category", "location", "payment_methods", "offerings")
     search_fields = ("title", "description", "location")
@@ -51,14 +82,14 @@ class CommunityPostingAdmin(admin.ModelAdmin):
 
 
 @admin.register(PostingImage)
-class PostingImageAdmin(admin.ModelAdmin):
+class PostingImageAdmin(LargeTableAdmin):
     list_display = ("id", "posting", "uploaded_at")
     list_filter = ("uploaded_at",)
     search_fields = ("posting__title",)
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     list_display = ("id", "user", "listing", "created_at")
     list_filter = ("created_at",)
     search_fields = ("user__email", "listing__title")
@@ -77,15 +108,59 @@ class ListingTagAdmin(admin.ModelAdmin):
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(LargeTableAdmin):
     list_display = ("id", "listing", "sender", "recipient", "created_at", "read")
     list_filter = ("created_at", "read")
     search_fields = ("sender__email", "recipient__email", "listing__title", "content")
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdmin):
     list_display = ("id", "buyer", "listing", "payment_method", "total_price", "status", "created_at")
     list_filter = ("status", "created_at", "payment_method")
     search_fields = ("buyer__email", "listing__title", "payment_method__name")
     readonly_fields = ("total_price", "created_at", "paid_at", "address_details")
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(LargeTableAdmin):
+    list_display = ("id", "to", "subject", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("to", "subject")
+    readonly_fields = ("created_at", "sent_at", "last_error")
+    actions = ["retry"]
+
+    @admin.action(description="Queue selected emails again")
+    def retry(self, request, queryset):
+        queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+            status=OutboundEmail.STATUS_QUEUED, attempts=0, next_attempt_at=timezone.now()
+        )
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(LargeTableAdmin):
+    list_display = ("id", "event_id", "type", "received_at", "processed_at")
+    list_filter = ("type",)
+    search_fields = ("event_id",)
+    readonly_fields = ("event_id", "type", "payload", "received_at", "processed_at", "error")
+
+
+# ─── Platform aggregates (api.platform_stats) ───────────────────────────────
+
+@admin.register(PlatformDailyStats)
+class PlatformDailyStatsAdmin(ReadOnlyAdmin):
+    list_display = ("day", "new_users", "new_listings", "active_users", "refreshed_at")
+    date_hierarchy = "day"
+
+
+@admin.register(PlatformDailyOrders)
+class PlatformDailyOrdersAdmin(ReadOnlyAdmin):
+    list_display = ("day", "status", "orders", "amount")
+    list_filter = ("status",)
+    date_hierarchy = "day"
+
+
+@admin.register(PlatformCategoryListings)
+class PlatformCategoryListingsAdmin(ReadOnlyAdmin):
+    list_display = ("category", "listings")
+    ordering = ("-listings",)
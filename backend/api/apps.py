@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Signal handlers that live outside models.py
+        from . import conversations, counters, notifications, rollups, search  # noqa: F401
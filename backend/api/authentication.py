@@ -1,12 +1,147 @@
 # api/authentication.py
 
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+import jwt
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
 from rest_framework.authentication import BaseAuthentication
 from rest_framework import exceptions
-from firebase_admin import auth as firebase_auth
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
 
 User = get_user_model()
 
+DEFAULT_TOKEN_VERIFIER = "api.firebase_keys.verify_id_token"
+
+
+class TTLCache:
+    """
+    Thread-safe, bounded LRU where each entry also carries its own expiry.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [k for k, (v, _) in self._entries.items() if predicate(v)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _cache_size():
+    return getattr(settings, "FIREBASE_TOKEN_CACHE_SIZE", 1024)
+
+
+def _cache_ttl():
+    return getattr(settings, "FIREBASE_TOKEN_CACHE_TTL", 300)
+
+
+# sha256(token) → decoded claims
+token_cache = TTLCache(_cache_size())
+# email → user
+user_cache = TTLCache(_cache_size())
+
+
+def clear_caches():
+    token_cache.clear()
+    user_cache.clear()
+
+
+def get_token_verifier():
+    """
+    The callable that turns an ID token into its claims (or raises).
+    Swap it with FIREBASE_TOKEN_VERIFIER, e.g. for LocalTokenVerifier in tests.
+    """
+    return import_string(getattr(settings, "FIREBASE_TOKEN_VERIFIER", DEFAULT_TOKEN_VERIFIER))
+
+
+def verify_token(id_token):
+    """
+    Verify an ID token, paying for the signature check once per token.
+    Claims are cached until the sooner of FIREBASE_TOKEN_CACHE_TTL or the
+    token's own `exp`, so a cached token never outlives its validity.
+    """
+    key = hashlib.sha256(id_token.encode()).hexdigest()
+    claims = token_cache.get(key)
+    if claims is None:
+        claims = get_token_verifier()(id_token)
+        expires_at = time.time() + _cache_ttl()
+        if claims.get("exp"):
+            expires_at = min(expires_at, float(claims["exp"]))
+        token_cache.set(key, claims, expires_at)
+    return claims
+
+
+def get_user_for_email(email):
+    """
+    The user behind a verified email, or None if that user is deactivated.
+    A cached user is re-checked with one primary-key lookup: the signal
+    below only clears this process's cache, and a user deactivated or
+    deleted through another process must not stay signed in here.
+    """
+    user = user_cache.get(email)
+    if user is not None and not User.objects.filter(pk=user.pk, is_active=True).exists():
+        user_cache.discard(email)
+        user = None
+    if user is None:
+        user, created = User.objects.get_or_create(email=email)
+        if not user.is_active:
+            return None
+        user_cache.set(email, user, time.time() + _cache_ttl())
+    # Hand each request its own instance so views can't mutate the cached one.
+    return copy.copy(user)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.discard_where(lambda user: user.pk == instance.pk)
+
+
 class FirebaseAuthentication(BaseAuthentication):
     def authenticate(self, request):
         auth_header = request.headers.get("Authorization")
@@ -17,14 +152,88 @@ class FirebaseAuthentication(BaseAuthentication):
         id_token = auth_header.split(" ")[1]
 
         try:
-            decoded_token = firebase_auth.verify_id_token(id_token)
+            decoded_token = verify_token(id_token)
             email = decoded_token.get("email")
             if not email:
                 raise exceptions.AuthenticationFailed("Email not found in token")
 
-            user, created = User.objects.get_or_create(email=email)
+            user = get_user_for_email(email)
+            if user is None:
+                raise exceptions.AuthenticationFailed("User inactive or deleted")
             return (user, None)
 
         except Exception as e:
             raise exceptions.AuthenticationFailed(f"Invalid Firebase token: {e}")
 
+
+class DownloadLinkAuthentication(BaseAuthentication):
+    """
+    `?link_token=` from `sign_download_link()`, for downloads the browser
+    fetches itself (a plain <a href>), which can't carry the Authorization
+    header. Only the views that list it accept it, and only for
+    DOWNLOAD_LINK_MAX_AGE seconds.
+    """
+    salt = "api.authentication.download-link"
+
+    def authenticate(self, request):
+        link_token = request.query_params.get("link_token")
+        if not link_token:
+            return None
+        max_age = getattr(settings, "DOWNLOAD_LINK_MAX_AGE", 60)
+        try:
+            user_id = signing.loads(link_token, salt=self.salt, max_age=max_age)
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed("Invalid or expired download link")
+        user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed("User inactive or deleted")
+        return (user, None)
+
+
+def sign_download_link(user):
+    return signing.dumps(user.pk, salt=DownloadLinkAuthentication.salt)
+
+
+class FirebaseTokenAuthMiddleware(BaseMiddleware):
+    """
+    WebSocket counterpart of FirebaseAuthentication. Browsers can't set
+    headers on a WebSocket, so the ID token comes as `?token=...`. Without
+    a valid token the scope keeps whatever user the stack below resolved.
+    """
+
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get("query_string", b"").decode()).get("token")
+        if token:
+            user = await database_sync_to_async(self.get_user)(token[0])
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await super().__call__(scope, receive, send)
+
+    def get_user(self, id_token):
+        try:
+            email = verify_token(id_token).get("email")
+        except Exception:
+            return None
+        return get_user_for_email(email) if email else None
+
+
+class LocalTokenVerifier:
+    """
+    Offline stand-in for Firebase: accepts HS256 tokens signed with
+    SECRET_KEY, as minted by `issue()`. Enable it with
+        FIREBASE_TOKEN_VERIFIER = "api.authentication.local_verify_id_token"
+    """
+    algorithm = "HS256"
+
+    @classmethod
+    def issue(cls, email, uid=None, lifetime=3600):
+        now = int(time.time())
+        claims = {"email": email, "uid": uid or email, "iat": now, "exp": now + lifetime}
+        return jwt.encode(claims, settings.SECRET_KEY, algorithm=cls.algorithm)
+
+    @classmethod
+    def verify_id_token(cls, id_token):
+        return jwt.decode(id_token, settings.SECRET_KEY, algorithms=[cls.algorithm])
+
+
+local_verify_id_token = LocalTokenVerifier.verify_id_token
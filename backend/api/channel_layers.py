@@ -0,0 +1,184 @@
+# api/channel_layers.py
+
+"""
+Channel layers for the chat/notification WebSockets.
+
+CHANNEL_LAYERS picks one of two (see settings):
+
+* BatchedRedisChannelLayer (the default): channels_redis, with the fan-out
+  to several groups batched into one pipeline plus one script per shard.
+* FastInMemoryChannelLayer: a single-process layer for tests, and for
+  one-node deployments that opt in with CHANNEL_LAYERS_IN_MEMORY=1. No
+  Redis needed.
+
+Both layers implement `group_send_many(groups, message)`. Call it through
+the module-level `group_send_many()`, which falls back to concurrent
+`group_send` calls on layers that lack it. A channel in more than one of
+the groups gets the message once.
+"""
+
+import asyncio
+import collections
+import logging
+import time
+from copy import deepcopy
+
+from channels.layers import InMemoryChannelLayer
+
+logger = logging.getLogger(__name__)
+
+
+async def group_send_many(layer, groups, message):
+    groups = list(dict.fromkeys(groups))
+    send_many = getattr(layer, "group_send_many", None)
+    if send_many is not None:
+        await send_many(groups, message)
+    else:
+        await asyncio.gather(*(layer.group_send(group, message) for group in groups))
+
+
+class FastInMemoryChannelLayer(InMemoryChannelLayer):
+    """
+    InMemoryChannelLayer tuned for group fan-out. The stock layer scans
+    every channel and group for expired entries on each group_send, spawns
+    a task per member and deep-copies the message for each one. This layer
+    sweeps expired entries at most every `clean_interval` seconds, copies
+    the message once per send and puts it on the member queues directly.
+    """
+
+    clean_interval = 1.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last_clean = 0.0
+        self._loop = None
+
+    async def receive(self, channel):
+        # Remember the loop consumers wait on, so sends from other threads
+        # (e.g. the write-behind writer) can be handed over to it safely.
+        self._loop = asyncio.get_running_loop()
+        return await super().receive(channel)
+
+    def _clean_expired(self):
+        now = time.monotonic()
+        if now - self._last_clean < self.clean_interval:
+            return
+        self._last_clean = now
+        super()._clean_expired()
+
+    async def group_send(self, group, message):
+        await self.group_send_many([group], message)
+
+    async def group_send_many(self, groups, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        for group in groups:
+            self.require_valid_group_name(group)
+        self._clean_expired()
+
+        channels = {}
+        for group in groups:
+            channels.update(self.groups.get(group, {}))
+        if not channels:
+            return
+
+        message = deepcopy(message)
+        loop = self._loop
+        if loop is not None and loop is not asyncio.get_running_loop() and loop.is_running():
+            loop.call_soon_threadsafe(self._deliver, list(channels), message)
+        else:
+            self._deliver(channels, message)
+
+    def _deliver(self, channels, message):
+        expires_at = time.time() + self.expiry
+        for channel in channels:
+            queue = self.channels.get(channel)
+            if queue is None:
+                queue = self.channels[channel] = asyncio.Queue(maxsize=self.get_capacity(channel))
+            try:
+                # Consumers get their own dict; the (already copied) values are shared.
+                queue.put_nowait((expires_at, dict(message)))
+            except asyncio.QueueFull:
+                logger.info("Channel %s over capacity; dropped group message", channel)
+
+
+try:
+    from channels_redis.core import RedisChannelLayer
+except ImportError:  # channels_redis is only needed for the Redis layer
+    RedisChannelLayer = None
+
+
+# Same as channels_redis's group_send script, plus the expired-message sweep
+# it otherwise sends in a separate pipeline first.
+GROUP_SEND_MANY_LUA = """
+    local over_capacity = 0
+    local current_time = ARGV[#ARGV - 2]
+    local expiry = ARGV[#ARGV - 1]
+    local stale_before = ARGV[#ARGV]
+    for i=1,#KEYS do
+        redis.call('ZREMRANGEBYSCORE', KEYS[i], 0, stale_before)
+        if redis.call('ZCOUNT', KEYS[i], '-inf', '+inf') < tonumber(ARGV[i + #KEYS]) then
+            redis.call('ZADD', KEYS[i], current_time, ARGV[i])
+            redis.call('EXPIRE', KEYS[i], expiry)
+        else
+            over_capacity = over_capacity + 1
+        end
+    end
+    return over_capacity
+"""
+
+
+if RedisChannelLayer is not None:
+
+    class BatchedRedisChannelLayer(RedisChannelLayer):
+        """
+        RedisChannelLayer whose group_send_many needs two round trips per
+        shard, however many groups it targets. One pipeline expires and reads
+        the membership of all groups, and one script delivers to the
+        de-duplicated channels. channels_redis's group_send needs four per
+        group.
+        """
+
+        async def group_send(self, group, message):
+            await self.group_send_many([group], message)
+
+        async def group_send_many(self, groups, message):
+            for group in groups:
+                assert self.require_valid_group_name(group), "Group name not valid"
+
+            groups_by_connection = collections.defaultdict(list)
+            for group in groups:
+                groups_by_connection[self.consistent_hash(group)].append(group)
+
+            channel_names = set()
+            expired_before = int(time.time()) - self.group_expiry
+            for index, shard_groups in groups_by_connection.items():
+                pipe = self.connection(index).pipeline(transaction=False)
+                for group in shard_groups:
+                    key = self._group_key(group)
+                    pipe.zremrangebyscore(key, min=0, max=expired_before)
+                    pipe.zrange(key, 0, -1)
+                results = await pipe.execute()
+                for members in results[1::2]:
+                    channel_names.update(member.decode("utf8") for member in members)
+            if not channel_names:
+                return
+
+            (
+                connection_to_channel_keys,
+                channel_keys_to_message,
+                channel_keys_to_capacity,
+            ) = self._map_channel_keys_to_connection(sorted(channel_names), message)
+
+            now = time.time()
+            for index, channel_keys in connection_to_channel_keys.items():
+                args = [channel_keys_to_message[key] for key in channel_keys]
+                args += [channel_keys_to_capacity[key] for key in channel_keys]
+                args += [now, self.expiry, int(now) - int(self.expiry)]
+                over_capacity = await self.connection(index).eval(
+                    GROUP_SEND_MANY_LUA, len(channel_keys), *channel_keys, *args
+                )
+                if over_capacity > 0:
+                    logger.info(
+                        "%s of %s channels over capacity in groups %s",
+                        over_capacity, len(channel_names), ", ".join(groups),
+                    )
@@ -1,13 +1,20 @@
 # api/consumers.py
 import json
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 
-from .models import Message, CommunityPosting
+from .channel_layers import group_send_many
+from .conversations import get_listing_owner_id, listing_owners
+from .models import Message, CommunityPosting, Notification
+from .notifications import notification_group, push_event
+from .write_behind import get_message_writer
 
 User = get_user_model()
 
+
 class MessageConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         user = self.scope["user"]
@@ -16,7 +23,14 @@ class MessageConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        self.listing_id = self.scope["url_route"]["kwargs"]["listing_id"]
+        # Resolve the listing (and its owner) once, up front
+        try:
+            self.listing_id = int(self.scope["url_route"]["kwargs"]["listing_id"])
+            await database_sync_to_async(get_listing_owner_id)(self.listing_id)
+        except (ValueError, CommunityPosting.DoesNotExist):
+            await self.close()
+            return
+
         self.listing_group = f"message_{self.listing_id}"
         self.user_group = f"user_{user.id}"
 
@@ -28,6 +42,8 @@ class MessageConsumer(AsyncWebsocketConsumer):
         await self.accept()
 
     async def disconnect(self, close_code):
+        if not hasattr(self, "listing_group"):
+            return
         # Leave both groups
         await self.channel_layer.group_discard(self.listing_group, self.channel_name)
         await self.channel_layer.group_discard(self.user_group, self.channel_name)
@@ -39,35 +55,57 @@ class MessageConsumer(AsyncWebsocketConsumer):
         """
         data = json.loads(text_data)
         content = data.get("message", "").strip()
-        sender = self.scope["user"]
 
         if not content:
             # ignore or you could send back an error
             return
 
-        # Save to DB without blocking
-        listing = await database_sync_to_async(CommunityPosting.objects.get)(id=self.listing_id)
-        message = await database_sync_to_async(Message.objects.create)(
-            sender=sender,
-            recipient=listing.user if listing.user != sender else None,
-            listing=listing,
-            content=content
-        )
+        try:
+            writer = get_message_writer()
+            if writer is None:
+                # Save to DB without blocking (one thread hop, normally one INSERT)
+                message = await database_sync_to_async(self.save_message)(content)
+            else:
+                # Write-behind: broadcast now, the writer saves it with the next batch
+                owner_id = listing_owners.get(self.listing_id)
+                if owner_id is None:
+                    owner_id = await database_sync_to_async(get_listing_owner_id)(self.listing_id)
+                message = self.build_message(content, owner_id)
+                if not writer.submit(message):
+                    # Queue full: write through, which also slows this sender down
+                    await database_sync_to_async(message.save)()
+        except CommunityPosting.DoesNotExist:
+            # The listing was deleted while we were connected
+            await self.close()
+            return
 
-        payload = {
+        # Broadcast to everyone listening on this listing, and notify the
+        # listing owner directly (if they're not the sender), in one fan-out
+        groups = [self.listing_group]
+        if message.recipient_id:
+            groups.append(f"user_{message.recipient_id}")
+        await group_send_many(self.channel_layer, groups, {
             "type": "chat_message",
-            "message": content,
-            "sender": sender.email,
-            "listing_id": self.listing_id,
+            "id": str(message.uid),
+            "message": message.content,
+            "sender": message.sender.email,
+            "listing_id": str(self.listing_id),
             "timestamp": message.created_at.isoformat(),
-        }
+        })
 
-        # Broadcast to everyone listening on this listing
-        await self.channel_layer.group_send(self.listing_group, payload)
+    def build_message(self, content, owner_id):
+        sender = self.scope["user"]
+        return Message(
+            sender=sender,
+            recipient_id=owner_id if owner_id != sender.id else None,
+            listing_id=self.listing_id,
+            content=content,
+        )
 
-        # Also notify the listing owner directly (if they're not the sender)
-        if listing.user and listing.user != sender:
-            await self.channel_layer.group_send(f"user_{listing.user.id}", payload)
+    def save_message(self, content):
+        message = self.build_message(content, get_listing_owner_id(self.listing_id))
+        message.save()
+        return message
 
     async def chat_message(self, event):
         """
@@ -75,8 +113,71 @@ class MessageConsumer(AsyncWebsocketConsumer):
         Just forwards them back down the WebSocket.
         """
         await self.send(text_data=json.dumps({
+            "id": event.get("id"),
             "message": event["message"],
             "sender":  event["sender"],
             "listing_id": event["listing_id"],
             "timestamp": event["timestamp"],
         }))
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    ws/notifications/[?last_id=N]: pushes the user's new notifications and
+    unread counters as they happen. Every frame looks like
+
+        {"type": "notifications", "notifications": [...], "counters": {...}}
+
+    The first frame after connecting carries the notifications newer than
+    `last_id` (at most RESUME_LIMIT; "more": true means fetch the rest from
+    /api/notifications/), or, without `last_id`, none plus the current
+    "last_id" to resume from. Clients should de-duplicate by id: a push can
+    overlap the first frame.
+    """
+    RESUME_LIMIT = 100
+
+    async def connect(self):
+        user = self.scope["user"]
+        if not user or not user.is_authenticated:
+            await self.close()
+            return
+
+        self.group = notification_group(user.id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            last_id = int(query["last_id"][0])
+        except (KeyError, ValueError):
+            last_id = None
+        await self.send(text_data=json.dumps(
+            await database_sync_to_async(self.resume)(user.id, last_id)
+        ))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, "group"):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    def resume(self, user_id, last_id):
+        notifications = Notification.objects.filter(recipient_id=user_id)
+        if last_id is None:
+            latest = notifications.order_by("-id").values_list("id", flat=True).first()
+            return {**push_event(user_id, []), "last_id": latest or 0}
+
+        missed = list(
+            notifications.filter(id__gt=last_id)
+                .select_related("actor", "target_content_type")
+                .order_by("id")[:self.RESUME_LIMIT + 1]
+        )
+        return {
+            **push_event(user_id, missed[:self.RESUME_LIMIT]),
+            "more": len(missed) > self.RESUME_LIMIT,
+        }
+
+    async def notifications_push(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "notifications",
+            "notifications": event["notifications"],
+            "counters": event["counters"],
+        }))
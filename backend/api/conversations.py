@@ -0,0 +1,257 @@
+# api/conversations.py
+
+"""
+Conversation bookkeeping. A Conversation is one (listing, buyer, seller)
+thread. The seller is the listing's owner and the buyer is the other
+participant. It points at its newest message and keeps an unread count for
+each side, so an inbox is one indexed query with one row per thread.
+
+Messages are attached before they are inserted (`assign_conversations`),
+and the conversation is bumped after (`record_messages`). The signal
+handlers below do both for single saves; bulk writers (api.write_behind)
+call the functions themselves. Reads and deletes call
+`refresh_conversations`, which recounts from the messages.
+
+Whole threads are removed with `delete_messages` (set-based, replies and
+notifications included) or hidden from one side with `clear_conversations`.
+"""
+
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import (
+    Case, Count, Exists, F, IntegerField, OuterRef, Q, Subquery, Value, When,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .authentication import TTLCache
+from .counters import adjust as adjust_counters
+from .models import CommunityPosting, Conversation, Message, Notification
+
+# listing id → owner id. Entries are dropped when the posting is saved or
+# deleted here, and expire after LISTING_CACHE_TTL in case that happened in
+# another process.
+LISTING_CACHE_TTL = 300
+listing_owners = TTLCache(1024)
+
+
+def get_listing_owner_id(listing_id):
+    """Owner of the listing (cached); raises CommunityPosting.DoesNotExist."""
+    owner_id = listing_owners.get(listing_id)
+    if owner_id is None:
+        owner_id = (
+            CommunityPosting.objects.values_list("user_id", flat=True).get(id=listing_id)
+        )
+        listing_owners.set(listing_id, owner_id, time.time() + LISTING_CACHE_TTL)
+    return owner_id
+
+
+def conversation_key(message, seller_id):
+    """(listing, buyer, seller) for a message, or None if it isn't a two-party one."""
+    if not message.recipient_id:
+        return None
+    buyer_id = message.sender_id if message.sender_id != seller_id else message.recipient_id
+    if buyer_id == seller_id:
+        return None
+    return (message.listing_id, buyer_id, seller_id)
+
+
+def assign_conversations(messages):
+    """Set conversation_id on unsaved messages, creating conversations as needed."""
+    resolved = {}
+    for message in messages:
+        if message.conversation_id:
+            continue
+        key = conversation_key(message, get_listing_owner_id(message.listing_id))
+        if key is None:
+            continue
+        if key not in resolved:
+            listing_id, buyer_id, seller_id = key
+            # One lookup on the unique (listing, buyer, seller) index per thread
+            resolved[key] = Conversation.objects.get_or_create(
+                listing_id=listing_id, buyer_id=buyer_id, seller_id=seller_id,
+                defaults={"last_message_at": message.created_at},
+            )[0].id
+        message.conversation_id = resolved[key]
+
+
+def record_messages(messages):
+    """After insert: move each conversation's last message pointer and unread counts."""
+    by_conversation = {}
+    for message in messages:
+        if message.conversation_id:
+            by_conversation.setdefault(message.conversation_id, []).append(message)
+
+    for conversation_id, batch in by_conversation.items():
+        last = max(batch, key=lambda m: (m.created_at, m.pk))
+        unread = {}
+        for message in batch:
+            if not message.read:
+                unread[message.recipient_id] = unread.get(message.recipient_id, 0) + 1
+        Conversation.objects.filter(pk=conversation_id).update(
+            last_message_id=last.pk,
+            last_message_at=last.created_at,
+            buyer_unread=F("buyer_unread") + _added_for("buyer_id", unread),
+            seller_unread=F("seller_unread") + _added_for("seller_id", unread),
+        )
+
+
+def _added_for(side, unread):
+    whens = [When(**{side: recipient_id}, then=Value(n)) for recipient_id, n in unread.items()]
+    return Case(*whens, default=Value(0), output_field=IntegerField()) if whens else Value(0)
+
+
+def refresh_conversations(conversation_ids):
+    """Recount last message and unread counts from the messages (one UPDATE)."""
+    conversation_ids = [pk for pk in set(conversation_ids) if pk]
+    if not conversation_ids:
+        return
+    messages = Message.objects.filter(conversation=OuterRef("pk")).order_by("-created_at", "-id")
+
+    def unread_to(side):
+        return Coalesce(
+            Subquery(
+                Message.objects.filter(conversation=OuterRef("pk"), recipient=OuterRef(side), read=False)
+                    .order_by().values("conversation").annotate(n=Count("id")).values("n")
+            ),
+            0,
+        )
+
+    Conversation.objects.filter(pk__in=conversation_ids).update(
+        last_message=Subquery(messages.values("id")[:1]),
+        last_message_at=Coalesce(Subquery(messages.values("created_at")[:1]), F("created_at")),
+        buyer_unread=unread_to("buyer"),
+        seller_unread=unread_to("seller"),
+    )
+
+
+# ─── Deleting and clearing ──────────────────────────────────────────────────
+
+def _count_by_recipient(queryset):
+    return dict(queryset.order_by().values_list("recipient_id").annotate(n=Count("id")))
+
+
+def _with_replies(messages):
+    """
+    Ids of `messages` and of all replies below them (parent_message is
+    CASCADE), as one recursive CTE: the SQL stays flat however deep a
+    thread goes.
+    """
+    roots, params = messages.order_by().values("pk").query.sql_with_params()
+    qn = connection.ops.quote_name
+    table, pk = qn(Message._meta.db_table), qn(Message._meta.pk.column)
+    parent = qn(Message._meta.get_field("parent_message").column)
+    return RawSQL(
+        f"WITH RECURSIVE doomed(id) AS ({roots} UNION "
+        f"SELECT m.{pk} FROM {table} m INNER JOIN doomed ON m.{parent} = doomed.id) "
+        f"SELECT id FROM doomed",
+        params,
+    )
+
+
+def delete_messages(messages):
+    """
+    Delete the `messages` queryset, their replies and the notifications about
+    them in one transaction. Every step is a single set-based statement over
+    the same subquery, so the cost does not grow with Python-side work per
+    row: unlike QuerySet.delete() nothing is loaded and no per-row signals
+    run. Counters and conversations are adjusted here instead, and
+    conversations left empty are deleted. Returns the number of messages.
+    """
+    with transaction.atomic():
+        doomed = Message.objects.filter(pk__in=_with_replies(messages))
+        count = doomed.count()
+        if not count:
+            return 0
+        conversation_ids = list(
+            doomed.exclude(conversation=None).order_by()
+                .values_list("conversation_id", flat=True).distinct()
+        )
+        for user_id, n in _count_by_recipient(doomed.filter(read=False)).items():
+            adjust_counters(user_id, unread_messages=-n)
+
+        notifications = Notification.objects.filter(
+            target_content_type=ContentType.objects.get_for_model(Message),
+            target_object_id__in=doomed.values("pk"),
+        )
+        for user_id, n in _count_by_recipient(notifications.filter(unread=True)).items():
+            adjust_counters(user_id, unread_notifications=-n)
+        notifications._raw_delete(notifications.db)
+
+        Conversation.objects.filter(last_message__in=doomed.values("pk")).update(last_message=None)
+        doomed._raw_delete(doomed.db)
+
+        Conversation.objects.filter(pk__in=conversation_ids).exclude(
+            Exists(Message.objects.filter(conversation=OuterRef("pk")))
+        ).delete()
+        refresh_conversations(conversation_ids)
+    return count
+
+
+def clear_conversations(user, conversations):
+    """
+    Soft delete for one participant: hide everything in `conversations` up to
+    now from `user` and mark their unread messages there as read. The other
+    side is unaffected, and new messages show up again as usual.
+    Returns the ids of the conversations that were cleared.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(conversations.filter(Q(buyer=user) | Q(seller=user)).values_list("id", flat=True))
+        if not ids:
+            return ids
+        Conversation.objects.filter(pk__in=ids, buyer=user).update(buyer_cleared_at=now)
+        Conversation.objects.filter(pk__in=ids, seller=user).update(seller_cleared_at=now)
+        marked = Message.objects.filter(conversation_id__in=ids, recipient=user, read=False).update(read=True)
+        adjust_counters(user.id, unread_messages=-marked)
+        refresh_conversations(ids)
+    return ids
+
+
+def visible_conversations(user):
+    """The user's conversations, minus those cleared with nothing newer since."""
+    return Conversation.objects.filter(
+        Q(buyer=user) & (Q(buyer_cleared_at=None) | Q(last_message_at__gt=F("buyer_cleared_at")))
+        | Q(seller=user) & (Q(seller_cleared_at=None) | Q(last_message_at__gt=F("seller_cleared_at")))
+    )
+
+
+def visible_messages(messages, user):
+    """Filter out of `messages` those `user` has cleared (see clear_conversations)."""
+    return messages.filter(
+        Q(conversation=None)
+        | Q(conversation__buyer=user)
+        & (Q(conversation__buyer_cleared_at=None) | Q(created_at__gt=F("conversation__buyer_cleared_at")))
+        | Q(conversation__seller=user)
+        & (Q(conversation__seller_cleared_at=None) | Q(created_at__gt=F("conversation__seller_cleared_at")))
+    )
+
+
+# ─── Signal handlers ────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=CommunityPosting)
+@receiver(post_delete, sender=CommunityPosting)
+def invalidate_listing_owner(sender, instance, **kwargs):
+    listing_owners.discard(instance.pk)
+
+
+@receiver(pre_save, sender=Message)
+def attach_conversation(sender, instance, **kwargs):
+    if instance._state.adding and not kwargs.get("raw"):
+        assign_conversations([instance])
+
+
+@receiver(post_save, sender=Message)
+def bump_conversation(sender, instance, created, **kwargs):
+    if created and not kwargs.get("raw"):
+        record_messages([instance])
+
+
+@receiver(post_delete, sender=Message)
+def recount_conversation(sender, instance, **kwargs):
+    refresh_conversations([instance.conversation_id])
@@ -0,0 +1,105 @@
+# api/counters.py
+
+"""
+Denormalized per-user counters (UserCounters): unread messages, unread
+notifications and orders placed today on the user's listings.
+
+Counters change through single `UPDATE ... SET x = x + n` statements, so
+concurrent writers never lose an increment. The signal handlers below cover
+rows saved one at a time; code that uses bulk_create / update() (write-behind
+chat, mark_read) calls `adjust()` itself. Rows are created with the user
+(and by migration 0015 for existing users); should one be missing anyway it
+is rebuilt from scratch by `repair()`, which is also what `repair_counters`
+runs to reconcile drift.
+"""
+
+from django.db.models import Case, F, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CommunityUser, Message, Notification, Order, UserCounters
+
+
+def adjust(user_id, unread_messages=0, unread_notifications=0):
+    if not user_id or not (unread_messages or unread_notifications):
+        return
+    updated = UserCounters.objects.filter(pk=user_id).update(
+        unread_messages=F("unread_messages") + unread_messages,
+        unread_notifications=F("unread_notifications") + unread_notifications,
+    )
+    if not updated and unread_messages + unread_notifications > 0:
+        # No row (shouldn't happen): count what's there, this change included.
+        # Decrements skip this; they also run while a user is being deleted.
+        repair(user_id)
+
+
+def record_order(seller_id, day=None):
+    day = day or timezone.localdate()
+    updated = UserCounters.objects.filter(pk=seller_id).update(
+        new_orders=Case(When(new_orders_date=day, then=F("new_orders") + 1), default=Value(1)),
+        new_orders_date=day,
+    )
+    if not updated:
+        repair(seller_id)
+
+
+def repair(user_id):
+    """Recount everything for one user from the source tables."""
+    today = timezone.localdate()
+    counters, _ = UserCounters.objects.update_or_create(user_id=user_id, defaults={
+        "unread_messages": Message.objects.filter(recipient_id=user_id, read=False).count(),
+        "unread_notifications": Notification.objects.filter(recipient_id=user_id, unread=True).count(),
+        "new_orders": Order.objects.filter(listing__user_id=user_id, created_at__date=today).count(),
+        "new_orders_date": today,
+    })
+    return counters
+
+
+def get_counters(user_id):
+    """The user's counters as the API shows them (one primary-key lookup)."""
+    counters = UserCounters.objects.filter(pk=user_id).first() or repair(user_id)
+    today = timezone.localdate()
+    return {
+        "unreadMessages": counters.unread_messages,
+        "unreadNotifications": counters.unread_notifications,
+        "newOrdersToday": counters.new_orders if counters.new_orders_date == today else 0,
+    }
+
+
+# ─── Signal handlers ────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=CommunityUser)
+def create_counters(sender, instance, created, **kwargs):
+    if created:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Message)
+def count_new_message(sender, instance, created, **kwargs):
+    if created and not instance.read:
+        adjust(instance.recipient_id, unread_messages=1)
+
+
+@receiver(post_delete, sender=Message)
+def uncount_deleted_message(sender, instance, **kwargs):
+    if not instance.read:
+        adjust(instance.recipient_id, unread_messages=-1)
+
+
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, **kwargs):
+    if created and instance.unread:
+        adjust(instance.recipient_id, unread_notifications=1)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if instance.unread:
+        adjust(instance.recipient_id, unread_notifications=-1)
+
+
+@receiver(post_save, sender=Order)
+def count_new_order(sender, instance, created, **kwargs):
+    if created:
+        record_order(instance.listing.user_id, timezone.localdate(instance.created_at))
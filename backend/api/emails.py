@@ -0,0 +1,91 @@
+# api/emails.py
+
+"""
+Transactional emails, rendered from templates/emails/<name>.txt (body) and
+<name>_subject.txt, and queued on api.outbox.
+
+Templates are compiled once per process and kept (`_template`), so
+rendering a batch only walks the parsed node trees.
+
+Digests (`queue_digests`, run by the `send_digests` command on a schedule)
+roll each user's unread notifications since their last digest
+(UserCounters.digest_sent_through) into one email per user.
+"""
+
+from functools import lru_cache
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.template import engines
+
+from .models import Notification, OutboundEmail, UserCounters
+from .outbox import enqueue
+
+
+@lru_cache(maxsize=None)
+def _template(name):
+    return engines["django"].get_template(f"emails/{name}")
+
+
+def render(name, context):
+    """(subject, body) for the `name` email."""
+    subject = _template(f"{name}_subject.txt").render(context).strip()
+    return subject, _template(f"{name}.txt").render(context)
+
+
+def queue_order_confirmation(order):
+    """Queue the buyer's order confirmation (no-op without a buyer email)."""
+    if not order.buyer.email:
+        return None
+    subject, body = render("order_confirmation", {
+        "order": order,
+        "address": order.address_details or {},
+    })
+    return enqueue(order.buyer.email, subject, body)
+
+
+def queue_digests(batch_size=500):
+    """
+    Queue one digest per user with unread notifications newer than their
+    `digest_sent_through`, then move that mark. Returns the number queued.
+    """
+    max_items = getattr(settings, "EMAIL_DIGEST_MAX_ITEMS", 20)
+    pending = (
+        Notification.objects
+            .filter(unread=True, id__gt=F("recipient__counters__digest_sent_through"))
+            .exclude(recipient__email__isnull=True).exclude(recipient__email="")
+            .select_related("recipient__counters", "actor")
+            .order_by("recipient_id", "id")
+    )
+    queued = 0
+    emails, marks = [], []
+    with transaction.atomic():
+        for _, rows in groupby(pending.iterator(chunk_size=2000), key=attrgetter("recipient_id")):
+            notifications = list(rows)
+            user = notifications[0].recipient
+            subject, body = render("digest", {
+                "user": user,
+                "count": len(notifications),
+                "notifications": notifications[:max_items],
+                "more": max(len(notifications) - max_items, 0),
+            })
+            emails.append(OutboundEmail(to=user.email, subject=subject, body=body))
+            # Kept on UserCounters, which is only ever written field by field,
+            # so a profile save can't put an old mark back.
+            user.counters.digest_sent_through = notifications[-1].id
+            marks.append(user.counters)
+            if len(emails) >= batch_size:
+                queued += _save_digests(emails, marks)
+                emails, marks = [], []
+        queued += _save_digests(emails, marks)
+    return queued
+
+
+def _save_digests(emails, marks):
+    if emails:
+        OutboundEmail.objects.bulk_create(emails)
+        UserCounters.objects.bulk_update(marks, ["digest_sent_through"])
+    return len(emails)
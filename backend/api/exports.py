@@ -0,0 +1,121 @@
+# api/exports.py
+
+"""
+Streaming order exports (/api/orders/export/ and /api/orders/sales/export/).
+
+Rows are read with `values()` (one flat dict per order, with listing,
+buyer and payment method joined in the same query) through
+`iterator(chunk_size=EXPORT_CHUNK_SIZE)`. That is a server-side cursor on
+PostgreSQL and fetchmany() batches elsewhere. Each batch is encoded and
+handed to a StreamingHttpResponse before the next one is fetched. Memory
+therefore stays flat however many orders there are. The CSV header goes
+out before the query has returned anything. CSV text cells that a
+spreadsheet would evaluate as a formula are prefixed with `'`.
+"""
+
+import csv
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Export columns: Order's own fields, then the joined ones (as named in
+# OrderSerializer), in the order values() returns them.
+FIELDS = ["id", "created_at", "status", "total_price", "paid_at", "listing_id"]
+JOINED = {
+    "listing_title": F("listing__title"),
+    "buyer_email": F("buyer__email"),
+    "seller_email": F("listing__user__email"),
+    "payment_method_name": F("payment_method__name"),
+}
+COLUMNS = FIELDS + list(JOINED)
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+# Leading characters that make a CSV cell a formula in spreadsheet apps.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+_encoder = DjangoJSONEncoder()
+
+
+def export_rows(orders, chunk_size=EXPORT_CHUNK_SIZE):
+    """Batches of export rows ({column: value}) for `orders`, newest first."""
+    rows = (
+        orders.order_by("-created_at", "-id")
+        .values(*FIELDS, **JOINED)
+        .iterator(chunk_size=chunk_size)
+    )
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _plain(value):
+    # Same text as in the JSONL export: ISO dates, exact decimals.
+    if isinstance(value, (datetime, date, Decimal)):
+        return _encoder.default(value)
+    return value
+
+
+def _cell(value):
+    # Spreadsheets run text starting with = + - @ (or a tab or CR before
+    # one) as a formula; a leading ' makes them show it as text. Only user
+    # text is affected: numbers and dates are not str here.
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return _plain(value)
+
+
+class _Lines:
+    """File-like sink for csv.writer that keeps what it is given."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def take(self):
+        text, self.parts = "".join(self.parts), []
+        return text
+
+
+def csv_chunks(batches):
+    lines = _Lines()
+    writer = csv.writer(lines)
+    writer.writerow(COLUMNS)
+    yield lines.take()
+    for batch in batches:
+        writer.writerows([_cell(row[column]) for column in COLUMNS] for row in batch)
+        yield lines.take()
+
+
+def jsonl_chunks(batches):
+    for batch in batches:
+        yield "".join(json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in batch)
+
+
+def export_response(orders, fmt, name):
+    """A streaming `fmt` ("csv" or "jsonl") download of `orders`."""
+    batches = export_rows(orders)
+    chunks = csv_chunks(batches) if fmt == "csv" else jsonl_chunks(batches)
+    response = StreamingHttpResponse(chunks, content_type=FORMATS[fmt])
+    filename = f"{name}-{timezone.localdate():%Y%m%d}.{fmt}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    # Pass chunks on as they come instead of buffering the whole file (nginx).
+    response["X-Accel-Buffering"] = "no"
+    return response
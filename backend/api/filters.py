@@ -0,0 +1,123 @@
+# api/filters.py
+
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from .models import CommunityPosting, ListingTag
+
+
+def _int(value):
+    return int(value)
+
+
+def _decimal(value):
+    try:
+        parsed = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(value)
+    if not parsed.is_finite():   # NaN, Infinity
+        raise ValueError(value)
+    return parsed
+
+
+def _datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class QueryFilter:
+    """
+    One query parameter → one ORM filter.
+    `many=True` accepts a comma-separated list and applies `__in`.
+    """
+
+    def __init__(self, lookup, cast=str, many=False):
+        self.lookup = lookup
+        self.cast = cast
+        self.many = many
+
+    def parse(self, raw):
+        if self.many:
+            return [self.cast(v) for v in raw.split(",") if v.strip()]
+        return self.cast(raw)
+
+    def apply(self, queryset, value):
+        if self.many:
+            return queryset.filter(**{f"{self.lookup}__in": value})
+        return queryset.filter(**{self.lookup: value})
+
+
+class RelatedIdFilter(QueryFilter):
+    """
+    "Has any of these related rows", as `id IN (SELECT posting_id FROM
+    <join table> WHERE <lookup> IN (...))`. Unlike filtering across the
+    join directly this never duplicates postings, so no DISTINCT is needed,
+    and both sides are served by the join table's indexes.
+    """
+
+    def __init__(self, through, posting_column, lookup, cast=_int):
+        super().__init__(lookup, cast=cast, many=True)
+        self.through = through
+        self.posting_column = posting_column
+
+    def apply(self, queryset, value):
+        matches = self.through.objects.filter(**{f"{self.lookup}__in": value})
+        return queryset.filter(id__in=matches.values(self.posting_column))
+
+
+class DeclarativeFilterBackend(BaseFilterBackend):
+    """
+    Subclasses declare `filters = {"param": QueryFilter(...)}`. Unknown
+    parameters are ignored; malformed values are a 400.
+    """
+    filters = {}
+
+    def filter_queryset(self, request, queryset, view):
+        errors = {}
+        for param, query_filter in self.filters.items():
+            raw = request.query_params.get(param)
+            if raw in (None, ""):
+                continue
+            try:
+                value = query_filter.parse(raw)
+            except (TypeError, ValueError):
+                errors[param] = [f"Invalid value: {raw!r}"]
+                continue
+            queryset = query_filter.apply(queryset, value)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return queryset
+
+
+class PostingFilterBackend(DeclarativeFilterBackend):
+    """
+    Listing filters. Each one (alone or combined, with the default
+    -created_at ordering) is backed by an index on CommunityPosting or a
+    join table; see CommunityPosting.Meta.indexes.
+    """
+    filters = {
+        "category":        QueryFilter("category_id", cast=_int, many=True),
+        "price_min":       QueryFilter("price__gte", cast=_decimal),
+        "price_max":       QueryFilter("price__lte", cast=_decimal),
+        "location":        QueryFilter("location", cast=str.strip),
+        "created_after":   QueryFilter("created_at__gte", cast=_datetime),
+        "payment_methods": RelatedIdFilter(
+            CommunityPosting.payment_methods.through, "communityposting_id", "paymentmethod_id"
+        ),
+        "offerings":       RelatedIdFilter(
+            CommunityPosting.offerings.through, "communityposting_id", "offering_id"
+        ),
+        "tags":            RelatedIdFilter(ListingTag, "listing_id", "tag__name", cast=str.strip),
+    }
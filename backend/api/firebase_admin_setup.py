@@ -1,6 +1,23 @@
+# api/firebase_admin_setup.py
+
+import threading
+
 import firebase_admin
 from firebase_admin import credentials
+from django.conf import settings
+
+_lock = threading.Lock()
 
-cred = credentials.Certificate("firebase_key.json")  
-firebase_admin.initialize_app(cred)
 
+def get_app():
+    """
+    The firebase_admin app, initialized on first use rather than at import
+    time. ID-token verification does not need it (see api/firebase_keys.py);
+    only Admin SDK calls do.
+    """
+    with _lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            cred = credentials.Certificate(str(settings.FIREBASE_CREDENTIALS_FILE))
+            return firebase_admin.initialize_app(cred)
@@ -0,0 +1,211 @@
+# api/firebase_keys.py
+
+"""
+Local verification of Firebase ID tokens.
+
+Firebase signs ID tokens (RS256) with rotating Google keys published as
+X.509 certificates at FIREBASE_CERTS_URL. SigningKeyManager keeps those
+keys in memory, persists them to FIREBASE_KEY_CACHE_PATH together with the
+expiry Google sends in Cache-Control, and refreshes them from a background
+thread shortly before they expire. A freshly started worker therefore
+loads the keys from disk and verifies its first token without any network
+round trip.
+"""
+
+import functools
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.request
+
+import jwt
+from cryptography.x509 import load_pem_x509_certificate
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CERTS_URL = (
+    "https://www.googleapis.com/robot/v1/metadata/x509/"
+    "securetoken@system.gserviceaccount.com"
+)
+ISSUER_PREFIX = "https://securetoken.google.com/"
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class KeyFetchError(Exception):
+    pass
+
+
+def fetch_certs(url, timeout=10):
+    """Returns ({kid: pem}, expires_at) from Google's cert endpoint."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            certs = json.loads(response.read().decode())
+            cache_control = response.headers.get("Cache-Control", "")
+    except Exception as e:
+        raise KeyFetchError(f"Could not fetch signing keys: {e}") from e
+    match = _MAX_AGE_RE.search(cache_control)
+    max_age = int(match.group(1)) if match else 3600
+    return certs, time.time() + max_age
+
+
+class SigningKeyManager:
+    min_refetch_interval = 60
+
+    def __init__(self, cache_path, url=CERTS_URL, fetch=fetch_certs, refresh_margin=300):
+        self.cache_path = str(cache_path)
+        self.url = url
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    # ── key access ───────────────────────────────────────────────────────────
+
+    def get_key(self, kid):
+        if not self._fresh():
+            with self._lock:
+                if not self._fresh() and not self._load_from_disk():
+                    self._refresh_locked()
+        key = self._keys.get(kid)
+        if key is None and time.time() - self._fetched_at > self.min_refetch_interval:
+            # Google may have rotated keys before our copy expired; re-fetch,
+            # but not so often that junk `kid`s can hammer the endpoint.
+            with self._lock:
+                self._refresh_locked()
+            key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key id: {kid}")
+        return key
+
+    def refresh(self):
+        with self._lock:
+            self._refresh_locked()
+
+    def _fresh(self):
+        return bool(self._keys) and self._expires_at > time.time()
+
+    def _install(self, certs, expires_at):
+        self._keys = {
+            kid: load_pem_x509_certificate(pem.encode()).public_key()
+            for kid, pem in certs.items()
+        }
+        self._expires_at = expires_at
+
+    def _refresh_locked(self):
+        self._fetched_at = time.time()
+        certs, expires_at = self.fetch(self.url)
+        self._install(certs, expires_at)
+        self._persist(certs, expires_at)
+
+    # ── disk cache ───────────────────────────────────────────────────────────
+
+    def _load_from_disk(self):
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            if cached["expires_at"] <= time.time():
+                return False
+            self._install(cached["certs"], cached["expires_at"])
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def _persist(self, certs, expires_at):
+        directory = os.path.dirname(self.cache_path) or "."
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".firebase_certs")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"expires_at": expires_at, "certs": certs}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning("Could not persist Firebase signing keys: %s", e)
+
+    # ── background refresh ───────────────────────────────────────────────────
+
+    def start_background_refresh(self):
+        if self._refresher is not None:
+            return
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, name="firebase-key-refresh", daemon=True
+        )
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            wait = self._expires_at - self.refresh_margin - time.time()
+            time.sleep(max(wait, 60))
+            try:
+                self.refresh()
+            except KeyFetchError as e:
+                logger.warning("%s", e)
+
+    # ── verification ─────────────────────────────────────────────────────────
+
+    def verify(self, id_token, project_id, leeway=0):
+        """Same checks as firebase_admin.auth.verify_id_token, done locally."""
+        header = jwt.get_unverified_header(id_token)
+        if header.get("alg") != "RS256":
+            raise jwt.InvalidAlgorithmError("Firebase ID tokens must be signed with RS256")
+        kid = header.get("kid")
+        if not kid:
+            raise jwt.InvalidTokenError("Firebase ID token has no 'kid' header")
+
+        claims = jwt.decode(
+            id_token,
+            self.get_key(kid),
+            algorithms=["RS256"],
+            audience=project_id,
+            issuer=ISSUER_PREFIX + project_id,
+            leeway=leeway,
+            options={"require": ["exp", "iat", "sub"]},
+        )
+        subject = claims["sub"]
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise jwt.InvalidTokenError("Firebase ID token has an invalid 'sub' claim")
+        claims["uid"] = subject
+        return claims
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_key_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SigningKeyManager(
+                settings.FIREBASE_KEY_CACHE_PATH,
+                url=getattr(settings, "FIREBASE_CERTS_URL", CERTS_URL),
+            )
+            _manager.start_background_refresh()
+        return _manager
+
+
+@functools.lru_cache(maxsize=None)
+def _project_id_from_credentials(path):
+    with open(path) as f:
+        return json.load(f)["project_id"]
+
+
+def get_project_id():
+    return (
+        getattr(settings, "FIREBASE_PROJECT_ID", None)
+        or _project_id_from_credentials(str(settings.FIREBASE_CREDENTIALS_FILE))
+    )
+
+
+def verify_id_token(id_token):
+    """Drop-in for firebase_admin.auth.verify_id_token; see FIREBASE_TOKEN_VERIFIER."""
+    return get_key_manager().verify(
+        id_token, get_project_id(), leeway=getattr(settings, "FIREBASE_TOKEN_CLOCK_SKEW", 0)
+    )
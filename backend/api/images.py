@@ -0,0 +1,141 @@
+# api/images.py
+
+"""
+Off-request image processing for PostingImage uploads.
+
+Each upload gets WebP and JPEG renditions at fixed widths (never upscaled),
+re-encoded without EXIF, and any EXIF on the original (camera model, GPS
+position…) is stripped as well: the row moves to a stripped copy and the
+original file is deleted once nothing references it. Work runs on a small
+thread pool once the upload's transaction commits; results are recorded in
+PostingImage.renditions, which PostingImageSerializer turns into srcsets.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .models import PostingImage
+from .storage import release_image_files
+
+logger = logging.getLogger(__name__)
+
+RENDITION_WIDTHS = {
+    "thumbnail": 160,
+    "card": 480,
+    "full": 1280,
+}
+
+FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "IMAGE_PIPELINE_WORKERS", 2),
+            thread_name_prefix="image-pipeline",
+        )
+    return _executor
+
+
+def schedule(image_ids):
+    """Process the given PostingImages after the current transaction commits."""
+    image_ids = list(image_ids)
+    if not image_ids:
+        return
+
+    def submit():
+        if getattr(settings, "IMAGE_PIPELINE_EAGER", False):
+            for image_id in image_ids:
+                process_image(image_id)
+            return
+        executor = _get_executor()
+        for image_id in image_ids:
+            executor.submit(_run_in_worker, image_id)
+
+    transaction.on_commit(submit)
+
+
+def _run_in_worker(image_id):
+    try:
+        process_image(image_id)
+    except Exception:
+        logger.exception("Image processing failed for PostingImage %s", image_id)
+    finally:
+        # Worker threads get their own DB connection; don't leak it.
+        connection.close()
+
+
+def _encode(image, options):
+    out = BytesIO()
+    fmt = options["format"]
+    if fmt == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(out, **options)
+    return out.getvalue()
+
+
+def _rendition_name(original_name, label, ext):
+    # The media storage renames by content hash; this only fixes dir + extension.
+    stem = os.path.splitext(os.path.basename(original_name))[0]
+    return f"posting_images/renditions/{stem}-{label}.{ext}"
+
+
+def process_image(image_id):
+    try:
+        posting_image = PostingImage.objects.get(pk=image_id)
+    except PostingImage.DoesNotExist:
+        return None
+
+    field = posting_image.image
+    storage = field.storage
+    with storage.open(field.name, "rb") as f:
+        source = Image.open(f)
+        source.load()
+        has_exif = bool(source.info.get("exif")) or bool(source.getexif())
+        original_format = source.format
+        image = ImageOps.exif_transpose(source)
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    renditions = {}
+    for label, width in RENDITION_WIDTHS.items():
+        resized = image.copy()
+        if resized.width > width:
+            height = round(resized.height * width / resized.width)
+            resized = resized.resize((width, height), Image.LANCZOS)
+        entry = {"width": resized.width, "height": resized.height}
+        for ext, options in FORMATS.items():
+            name = _rendition_name(field.name, label, ext)
+            entry[ext] = storage.save(name, ContentFile(_encode(resized, options)))
+        renditions[label] = entry
+
+    original_name = field.name
+    if has_exif and original_format in ("JPEG", "PNG", "WEBP"):
+        # Store a copy of the original minus its metadata.
+        options = {"format": original_format}
+        if original_format in ("JPEG", "WEBP"):
+            options["quality"] = 95
+        stripped = _encode(image, options)
+        original_name = storage.save(original_name, ContentFile(stripped))
+
+    PostingImage.objects.filter(pk=image_id).update(image=original_name, renditions=renditions)
+    if original_name != field.name:
+        # The EXIF-laden file must not stay public: delete it as soon as no
+        # other row (an identical upload not processed yet) points at it.
+        exif_name = field.name
+        transaction.on_commit(lambda: release_image_files(exif_name, None, None))
+    return renditions
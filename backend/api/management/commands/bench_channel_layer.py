@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from channels.layers import InMemoryChannelLayer
+
+from api.channel_layers import FastInMemoryChannelLayer, group_send_many
+
+
+def _redis_layers(url):
+    try:
+        from channels_redis.core import RedisChannelLayer
+        from api.channel_layers import BatchedRedisChannelLayer
+    except ImportError:
+        raise CommandError("channels_redis is not installed.")
+    config = {"hosts": [url], "prefix": "bench"}
+    return {
+        "redis": lambda capacity: RedisChannelLayer(capacity=capacity, **config),
+        "redis-batched": lambda capacity: BatchedRedisChannelLayer(capacity=capacity, **config),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure chat fan-out throughput (messages/sec) per channel layer: each message "
+        "goes to a listing group and the owner's user group, like MessageConsumer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=2000)
+        parser.add_argument("--subscribers", type=int, default=20,
+                            help="Channels in the listing group.")
+        parser.add_argument("--redis", action="store_true",
+                            help="Also run the Redis layers (needs REDIS_URL or --redis-url).")
+        parser.add_argument("--redis-url", default=None)
+
+    def handle(self, *args, **options):
+        layers = {
+            "memory": lambda capacity: InMemoryChannelLayer(capacity=capacity),
+            "memory-fast": lambda capacity: FastInMemoryChannelLayer(capacity=capacity),
+        }
+        if options["redis"]:
+            url = options["redis_url"] or getattr(settings, "REDIS_URL", None) or "redis://127.0.0.1:6379"
+            layers.update(_redis_layers(url))
+
+        messages, subscribers = options["messages"], options["subscribers"]
+        self.stdout.write(f"{messages} messages → {subscribers} listing subscribers + owner")
+        for name, factory in layers.items():
+            # Room for every message, so nothing is dropped while we only send.
+            layer = factory(messages + 1)
+            rate = asyncio.run(self._run(layer, messages, subscribers))
+            self.stdout.write(f"{name:>14}: {rate:10.0f} msg/s")
+
+    async def _run(self, layer, messages, subscribers):
+        listing_group, owner_group = "message_bench", "user_bench"
+        channels = [await layer.new_channel() for _ in range(subscribers)]
+        for channel in channels:
+            await layer.group_add(listing_group, channel)
+        # The owner is in both groups, as when they have the chat open.
+        await layer.group_add(owner_group, channels[0])
+
+        try:
+            start = time.perf_counter()
+            for i in range(messages):
+                payload = {
+                    "type": "chat_message",
+                    "message": f"message {i}",
+                    "sender": "buyer@example.com",
+                    "listing_id": "1",
+                    "timestamp": "2026-01-01T00:00:00+00:00",
+                }
+                await group_send_many(layer, [listing_group, owner_group], payload)
+            elapsed = time.perf_counter() - start
+        finally:
+            await layer.flush()
+        return messages / elapsed
@@ -0,0 +1,75 @@
+import asyncio
+import statistics
+import time
+
+from channels.db import database_sync_to_async
+from django.core.management.base import BaseCommand
+
+from api.models import Category, CommunityPosting, CommunityUser, Message
+from api.write_behind import MessageWriter
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare chat persistence write-through (one INSERT + notification per message) "
+        "with write-behind batching: per-message latency until broadcast, and throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000)
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        owner = CommunityUser.objects.create(username="bench-owner", email="bench-owner@example.com")
+        buyer = CommunityUser.objects.create(username="bench-buyer", email="bench-buyer@example.com")
+        category = Category.objects.create(name="bench")
+        posting = CommunityPosting.objects.create(
+            user=owner, category=category, title="bench", description="bench", location="bench"
+        )
+        try:
+            count = options["messages"]
+            for name, run in (
+                ("write-through", self._write_through),
+                ("write-behind", self._write_behind),
+            ):
+                latencies, elapsed = asyncio.run(run(posting, buyer, count, options))
+                latencies.sort()
+                self.stdout.write(
+                    f"{name:>13}: {count / elapsed:8.0f} msg/s  "
+                    f"p50 {statistics.median(latencies) * 1000:7.3f} ms  "
+                    f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.3f} ms"
+                )
+        finally:
+            # Cascades to the benchmark's messages and notifications.
+            CommunityUser.objects.filter(id__in=[owner.id, buyer.id]).delete()
+            category.delete()
+
+    def _message(self, posting, buyer, i):
+        return Message(sender=buyer, recipient_id=posting.user_id, listing=posting, content=f"message {i}")
+
+    async def _write_through(self, posting, buyer, count, options):
+        latencies = []
+        start = time.perf_counter()
+        for i in range(count):
+            t = time.perf_counter()
+            await database_sync_to_async(self._message(posting, buyer, i).save)()
+            latencies.append(time.perf_counter() - t)
+        return latencies, time.perf_counter() - start
+
+    async def _write_behind(self, posting, buyer, count, options):
+        writer = MessageWriter(batch_size=options["batch_size"], max_pending=count + 1)
+        writer.start()
+        latencies = []
+        start = time.perf_counter()
+        for i in range(count):
+            t = time.perf_counter()
+            if not writer.submit(self._message(posting, buyer, i)):
+                raise RuntimeError("write-behind queue full")
+            latencies.append(time.perf_counter() - t)
+            if i % 50 == 0:
+                await asyncio.sleep(0)
+        # Throughput includes getting everything onto disk.
+        await database_sync_to_async(writer.flush, thread_sensitive=False)()
+        elapsed = time.perf_counter() - start
+        writer.stop()
+        return latencies, elapsed
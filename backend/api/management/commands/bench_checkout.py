@@ -0,0 +1,67 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.models import Category, CommunityPosting, CommunityUser, PaymentMethod
+from api.stripe_stub import start_in_thread
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test checkout offline: create an order and its PaymentIntent (twice, as a "
+        "client retry would) against the local Stripe stub, and report latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checkouts", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=4)
+
+    def handle(self, *args, **options):
+        server, base_url = start_in_thread()
+        seller = CommunityUser.objects.create(username="bench-seller", email="bench-seller@example.com")
+        buyer = CommunityUser.objects.create(username="bench-buyer", email="bench-buyer@example.com")
+        category = Category.objects.create(name="bench")
+        card = PaymentMethod.objects.create(name="bench card")
+        posting = CommunityPosting.objects.create(
+            user=seller, category=category, title="bench", description="bench", location="bench", price=25
+        )
+
+        def checkout(_):
+            client = APIClient(SERVER_NAME="localhost")
+            client.force_authenticate(buyer)
+            start = time.perf_counter()
+            order = client.post(
+                "/api/orders/", {"listing": posting.id, "payment_method": card.id}, format="json"
+            ).data
+            secrets = {
+                client.post("/api/create-payment-intent/", {"order_id": order["id"]}, format="json")
+                    .data["client_secret"]
+                for _ in range(2)
+            }
+            connection.close()
+            assert len(secrets) == 1, "retry created a second PaymentIntent"
+            return time.perf_counter() - start
+
+        try:
+            with override_settings(STRIPE_API_BASE=base_url):
+                start = time.perf_counter()
+                with ThreadPoolExecutor(options["concurrency"]) as pool:
+                    latencies = sorted(pool.map(checkout, range(options["checkouts"])))
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{options['checkouts']} checkouts in {elapsed:.2f}s "
+                f"({options['checkouts'] / elapsed:.0f}/s), "
+                f"p50 {statistics.median(latencies) * 1000:.1f} ms, "
+                f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms; "
+                f"Stripe objects created: {server.stub.created}"
+            )
+        finally:
+            server.shutdown()
+            CommunityUser.objects.filter(id__in=[seller.id, buyer.id]).delete()
+            category.delete()
+            card.delete()
@@ -0,0 +1,103 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.crypto import get_random_string
+from django.utils import timezone
+
+from api import revenue
+from api.models import Category, CommunityPosting, CommunityUser, Offering, Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic paid orders for one seller and time the revenue series: "
+        "database GROUP BY against streaming rows into Python and NumPy buckets. "
+        "Runs in a transaction that is always rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=1_000_000)
+        parser.add_argument("--days", type=int, default=730)
+        parser.add_argument("--listings", type=int, default=50)
+        parser.add_argument("--chunk-size", type=int, default=revenue.STREAM_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        # Everything the bench writes is rolled back at the end, even when it
+        # succeeds, so it never leaves rows behind in the configured database.
+        with transaction.atomic():
+            try:
+                self._bench(options)
+            finally:
+                transaction.set_rollback(True)
+
+    def _bench(self, options):
+        prefix = f"bench-{get_random_string(8).lower()}"
+        seller = CommunityUser.objects.create(username=f"{prefix}-seller", email=f"{prefix}-seller@example.com")
+        buyer = CommunityUser.objects.create(username=f"{prefix}-buyer", email=f"{prefix}-buyer@example.com")
+        category = Category.objects.create(name=prefix)
+        offering = Offering.objects.create(name=f"{prefix} add-on", extra_cost=Decimal("2.50"))
+        listings = CommunityPosting.objects.bulk_create([
+            CommunityPosting(user=seller, category=category, title=f"bench {i}",
+                             description="bench", location="bench")
+            for i in range(options["listings"])
+        ])
+        start = time.perf_counter()
+        self._seed(listings, buyer, offering, options)
+        self.stdout.write(f"seeded {options['orders']} orders in {time.perf_counter() - start:.1f}s")
+
+        orders = revenue.seller_orders(seller)
+        runs = [
+            ("database", lambda bucket: revenue.revenue_by(orders, bucket)),
+            ("stream-python", lambda bucket: revenue.stream_revenue(
+                orders, bucket, options["chunk_size"], use_numpy=False)),
+        ]
+        if revenue.np is not None:
+            runs.append(("stream-numpy", lambda bucket: revenue.stream_revenue(
+                orders, bucket, options["chunk_size"])))
+        else:
+            self.stdout.write("numpy is not installed; skipping stream-numpy")
+
+        for bucket in revenue.BUCKETS:
+            results = {}
+            for name, run in runs:
+                start = time.perf_counter()
+                results[name] = run(bucket)
+                elapsed = time.perf_counter() - start
+                total = sum(row["revenue"] for row in results[name])
+                self.stdout.write(
+                    f"{bucket:>5} {name:>13}: {elapsed:6.2f}s  "
+                    f"{len(results[name])} periods, revenue {total}"
+                )
+            exact = results["stream-python"]
+            for name, rows in results.items():
+                if rows != exact:
+                    self.stdout.write(f"      {name} differs from the exact cent totals")
+        start = time.perf_counter()
+        revenue.summary(orders), revenue.top_listings(orders), revenue.offering_attach(orders)
+        self.stdout.write(f"summary + top listings + attach rate: {time.perf_counter() - start:.2f}s")
+
+    def _seed(self, listings, buyer, offering, options):
+        """bulk_create day by day: created_at is auto_now_add, so each day's rows are re-dated."""
+        rng = random.Random(0)
+        today = timezone.now()
+        per_day, extra = divmod(options["orders"], options["days"])
+        through = Order.offerings.through
+        for day in range(options["days"]):
+            count = per_day + (day < extra)
+            if not count:
+                continue
+            batch = Order.objects.bulk_create([
+                Order(buyer=buyer, listing=rng.choice(listings), status=Order.STATUS_PAID,
+                      total_price=Decimal(rng.randrange(100, 50000)).scaleb(-2))
+                for _ in range(count)
+            ], batch_size=5000)
+            ids = [order.pk for order in batch]
+            Order.objects.filter(pk__in=ids).update(created_at=today - timedelta(days=day))
+            through.objects.bulk_create(
+                [through(order_id=pk, offering_id=offering.pk) for pk in ids if rng.random() < 0.3],
+                batch_size=5000,
+            )
@@ -0,0 +1,44 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.storage import referenced_names
+
+MEDIA_DIRS = ("posting_images", "profile_pictures")
+
+
+class Command(BaseCommand):
+    help = "Delete media files no PostingImage or CommunityUser references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age", type=int, default=3600,
+            help="Only delete files older than this many seconds (skips in-flight uploads).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="List files without deleting them.")
+
+    def handle(self, *args, **options):
+        root = str(settings.MEDIA_ROOT)
+        cutoff = time.time() - options["min_age"]
+        referenced = referenced_names()
+
+        removed = freed = 0
+        for media_dir in MEDIA_DIRS:
+            for dirpath, _, filenames in os.walk(os.path.join(root, media_dir)):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, root).replace(os.sep, "/")
+                    if name in referenced or os.path.getmtime(path) > cutoff:
+                        continue
+                    size = os.path.getsize(path)
+                    if options["dry_run"]:
+                        self.stdout.write(name)
+                    else:
+                        os.remove(path)
+                    removed += 1
+                    freed += size
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} files ({freed} bytes)."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.images import process_image
+from api.models import PostingImage
+
+
+class Command(BaseCommand):
+    help = "Build renditions for PostingImages that don't have any yet (or --all)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Reprocess every image.")
+
+    def handle(self, *args, **options):
+        qs = PostingImage.objects.order_by("id")
+        if not options["all"]:
+            qs = qs.filter(renditions={})
+        done = 0
+        for image_id in qs.values_list("id", flat=True).iterator():
+            try:
+                process_image(image_id)
+                done += 1
+            except Exception as e:
+                self.stderr.write(f"PostingImage {image_id}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} images."))
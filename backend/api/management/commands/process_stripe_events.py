@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.stripe_events import process_pending
+
+
+class Command(BaseCommand):
+    help = "Apply stored Stripe webhook events to orders (runs until interrupted unless --once)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process what is pending now, then exit.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Events per transaction.")
+        parser.add_argument(
+            "--interval", type=float, default=1.0,
+            help="Seconds to sleep when nothing is pending.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            handled = process_pending(options["batch_size"])
+            total += handled
+            if handled:
+                self.stdout.write(f"Processed {handled} events.")
+            elif options["once"]:
+                break
+            else:
+                time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} events."))
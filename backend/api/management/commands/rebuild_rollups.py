@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily analytics rollups from postings and orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", help="Only these user ids.")
+
+    def handle(self, *args, **options):
+        days = rebuild(options["user"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {days} user-days."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.platform_stats import refresh
+
+
+class Command(BaseCommand):
+    help = "Bring the platform-wide aggregates up to date (only the days that changed, unless --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recompute every day from scratch.")
+
+    def handle(self, *args, **options):
+        days = refresh(full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {days} days."))
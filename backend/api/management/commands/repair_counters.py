@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.counters import repair
+from api.models import CommunityUser, UserCounters
+
+
+class Command(BaseCommand):
+    help = "Recount every user's UserCounters (unread messages/notifications, orders today)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", help="Only these user ids.")
+
+    def handle(self, *args, **options):
+        user_ids = options["user"] or CommunityUser.objects.order_by("id").values_list("id", flat=True)
+        fixed = checked = 0
+        for user_id in list(user_ids):
+            before = UserCounters.objects.filter(pk=user_id).values_list(
+                "unread_messages", "unread_notifications", "new_orders"
+            ).first()
+            after = repair(user_id)
+            checked += 1
+            if before != (after.unread_messages, after.unread_notifications, after.new_orders):
+                fixed += 1
+                self.stdout.write(f"User {user_id}: {before} → "
+                                  f"{(after.unread_messages, after.unread_notifications, after.new_orders)}")
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} users, fixed {fixed}."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.emails import queue_digests
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue one email per user summarizing their unread notifications since the "
+        "last digest (run from cron; `send_outbox` delivers them)."
+    )
+
+    def handle(self, *args, **options):
+        queued = queue_digests()
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} digests."))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.outbox import send_due
+
+
+class Command(BaseCommand):
+    help = "Deliver queued OutboundEmail rows (runs until interrupted unless --once)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Send what is due now, then exit.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Emails per SMTP connection.")
+        parser.add_argument(
+            "--interval", type=float, default=5.0,
+            help="Seconds to sleep when nothing is due.",
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_due(options["batch_size"])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}.")
+            elif options["once"]:
+                break
+            else:
+                time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent}, failed {total_failed}."))
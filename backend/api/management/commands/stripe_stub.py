@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.stripe_stub import StripeStub, make_server
+
+
+class Command(BaseCommand):
+    help = "Serve the local Stripe stand-in (api.stripe_stub) for offline checkout and load tests."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=12111)
+        parser.add_argument(
+            "--webhook-url", default="http://127.0.0.1:8000/api/stripe/webhook/",
+            help="Where confirmed PaymentIntents send payment_intent.succeeded.",
+        )
+        parser.add_argument(
+            "--webhook-secret", default=settings.STRIPE_WEBHOOK_SECRET,
+            help="Signing secret (defaults to STRIPE_WEBHOOK_SECRET).",
+        )
+
+    def handle(self, *args, **options):
+        stub = StripeStub(options["webhook_url"], options["webhook_secret"])
+        server = make_server(options["host"], options["port"], stub)
+        self.stdout.write(self.style.SUCCESS(
+            f"Stripe stub on http://{options['host']}:{options['port']} "
+            f"(set STRIPE_API_BASE to this URL). Ctrl-C to stop."
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
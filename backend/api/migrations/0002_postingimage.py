@@ -1,23 +0,0 @@
-# Generated by Django 5.2 on 2025-04-15 05:22
-
-import django.db.models.deletion
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('api', '0001_initial'),
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='PostingImage',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('image', models.ImageField(upload_to='posting_images/')),
-                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
-                ('posting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='api.communityposting')),
-            ],
-        ),
-    ]
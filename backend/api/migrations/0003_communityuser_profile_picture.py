@@ -1,6 +1,6 @@
 # Generated by Django 5.2 on 2025-04-15 11:23
 
-from django.db import migrations, models
+from django.db import migrations
 
 
 class Migration(migrations.Migration):
@@ -9,10 +9,7 @@ class Migration(migrations.Migration):
         ('api', '0002_alter_communityuser_is_seller'),
     ]
 
+    # profile_picture is already created by the regenerated 0001_initial;
+    # this migration is kept (empty) because existing databases record it.
     operations = [
-        migrations.AddField(
-            model_name='communityuser',
-            name='profile_picture',
-            field=models.ImageField(blank=True, null=True, upload_to='profile_pictures/'),
-        ),
     ]
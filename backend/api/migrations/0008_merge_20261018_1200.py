@@ -0,0 +1,14 @@
+# Generated by Django 5.2 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_communityuser_profile_picture'),
+        ('api', '0007_alter_communityposting_offerings_and_more'),
+    ]
+
+    operations = [
+    ]
@@ -0,0 +1,40 @@
+# Full-text index for CommunityPosting (see api/search.py).
+# Existing rows are indexed with `manage.py rebuild_search_index`.
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE api_postingsearch USING fts5("
+            "title, description, location, tags, category, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE api_postingsearch ("
+            "posting_id bigint PRIMARY KEY REFERENCES api_communityposting (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX api_postingsearch_document_gin ON api_postingsearch USING GIN (document)"
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS api_postingsearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_merge_20261018_1200'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_postingsearch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communityposting',
+            index=models.Index(fields=['-created_at', '-id'], name='posting_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communityposting',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='posting_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communityposting',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='posting_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communityposting',
+            index=models.Index(fields=['location', '-created_at', '-id'], name='posting_location_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communityposting',
+            index=models.Index(fields=['price'], name='posting_price_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_communityposting_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postingimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
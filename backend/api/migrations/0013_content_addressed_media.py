@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:21
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_postingimage_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='communityuser',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=api.storage.get_media_storage, upload_to='profile_pictures/'),
+        ),
+        migrations.AlterField(
+            model_name='postingimage',
+            name='image',
+            field=models.ImageField(storage=api.storage.get_media_storage, upload_to='posting_images/'),
+        ),
+    ]
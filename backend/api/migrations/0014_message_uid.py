@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:10
+
+import uuid
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def assign_uids(apps, schema_editor):
+    Message = apps.get_model("api", "Message")
+    messages = list(Message.objects.only("id"))
+    for message in messages:
+        message.uid = uuid.uuid4()
+    Message.objects.bulk_update(messages, ["uid"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='uid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(assign_uids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='message',
+            name='uid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def create_counters(apps, schema_editor):
+    User = apps.get_model("api", "CommunityUser")
+    UserCounters = apps.get_model("api", "UserCounters")
+    today = timezone.localdate()
+    users = User.objects.annotate(
+        unread_messages=Count("received_messages", filter=Q(received_messages__read=False), distinct=True),
+        unread_notifications=Count("notifications", filter=Q(notifications__unread=True), distinct=True),
+        new_orders=Count(
+            "postings__orders", filter=Q(postings__orders__created_at__date=today), distinct=True
+        ),
+    ).values_list("id", "unread_messages", "unread_notifications", "new_orders")
+    UserCounters.objects.bulk_create(
+        [
+            UserCounters(
+                user_id=user_id,
+                unread_messages=messages,
+                unread_notifications=notifications,
+                new_orders=orders,
+                new_orders_date=today,
+            )
+            for user_id, messages, notifications, orders in users.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_message_uid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_messages', models.IntegerField(default=0)),
+                ('unread_notifications', models.IntegerField(default=0)),
+                ('new_orders', models.IntegerField(default=0)),
+                ('new_orders_date', models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['recipient', 'read'], name='message_recipient_read_idx'),
+        ),
+        migrations.RunPython(create_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_conversations(apps, schema_editor):
+    Conversation = apps.get_model("api", "Conversation")
+    Message = apps.get_model("api", "Message")
+
+    conversations = {}
+    pending = []
+    rows = (
+        Message.objects.exclude(recipient=None)
+            .order_by("created_at", "id")
+            .values_list("id", "listing_id", "listing__user_id", "sender_id", "recipient_id", "created_at", "read")
+    )
+    for message_id, listing_id, seller_id, sender_id, recipient_id, created_at, read in rows.iterator():
+        buyer_id = sender_id if sender_id != seller_id else recipient_id
+        if buyer_id == seller_id:
+            continue
+        key = (listing_id, buyer_id, seller_id)
+        conversation = conversations.get(key)
+        if conversation is None:
+            conversation = conversations[key] = Conversation(
+                listing_id=listing_id, buyer_id=buyer_id, seller_id=seller_id
+            )
+        conversation.last_message_id = message_id
+        conversation.last_message_at = created_at
+        if not read:
+            if recipient_id == seller_id:
+                conversation.seller_unread += 1
+            else:
+                conversation.buyer_unread += 1
+        pending.append((message_id, key))
+
+    Conversation.objects.bulk_create(conversations.values(), batch_size=1000)
+    messages = [Message(id=message_id, conversation_id=conversations[key].id) for message_id, key in pending]
+    Message.objects.bulk_update(messages, ["conversation"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_usercounters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('buyer_unread', models.IntegerField(default=0)),
+                ('seller_unread', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buying_conversations', to=settings.AUTH_USER_MODEL)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.message')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to='api.communityposting')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='selling_conversations', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='api.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', '-created_at', '-id'], name='message_conversation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['buyer', '-last_message_at', '-id'], name='conversation_buyer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['seller', '-last_message_at', '-id'], name='conversation_seller_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('listing', 'buyer', 'seller'), name='conversation_participants_uniq'),
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:48
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def start_after_existing(apps, schema_editor):
+    # Don't mail existing users a digest of their whole history.
+    Notification = apps.get_model("api", "Notification")
+    UserCounters = apps.get_model("api", "UserCounters")
+    latest = Notification.objects.aggregate(latest=Max("id"))["latest"] or 0
+    UserCounters.objects.update(digest_sent_through=latest)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercounters',
+            name='digest_sent_through',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(start_after_existing, migrations.RunPython.noop),
+    ]
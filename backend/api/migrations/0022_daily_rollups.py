@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill(apps, schema_editor):
+    CommunityPosting = apps.get_model("api", "CommunityPosting")
+    Order = apps.get_model("api", "Order")
+    UserDailyActivity = apps.get_model("api", "UserDailyActivity")
+    UserDailyCategoryOrders = apps.get_model("api", "UserDailyCategoryOrders")
+
+    activity = {}
+    posts = (
+        CommunityPosting.objects.order_by().annotate(day=TruncDate("created_at"))
+            .values_list("user_id", "day").annotate(n=Count("id"))
+    )
+    for user_id, day, n in posts:
+        activity.setdefault((user_id, day), {"posts": 0, "orders": 0})["posts"] = n
+    orders = Order.objects.order_by().annotate(day=TruncDate("created_at"))
+    for user_id, day, n in orders.values_list("buyer_id", "day").annotate(n=Count("id")):
+        activity.setdefault((user_id, day), {"posts": 0, "orders": 0})["orders"] = n
+
+    UserDailyActivity.objects.bulk_create(
+        [UserDailyActivity(user_id=user_id, day=day, **counts) for (user_id, day), counts in activity.items()],
+        batch_size=1000,
+    )
+    UserDailyCategoryOrders.objects.bulk_create(
+        [
+            UserDailyCategoryOrders(user_id=user_id, day=day, category_id=category_id, orders=n)
+            for user_id, day, category_id, n in (
+                orders.values_list("buyer_id", "day", "listing__category_id").annotate(n=Count("id"))
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_stripeevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('posts', models.IntegerField(default=0)),
+                ('orders', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='user_daily_activity_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserDailyCategoryOrders',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'category'), name='user_daily_category_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
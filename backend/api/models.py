@@ -1,8 +1,11 @@
 # api/models.py
 
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
 from django.utils.crypto import get_random_string
 
 # for notifications
@@ -11,12 +14,16 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from .storage import get_media_storage
+
 # 🔐 Custom User Model
 class CommunityUser(AbstractUser):
     is_buyer = models.BooleanField(default=True)
     is_seller = models.BooleanField(default=True)
     is_admin = models.BooleanField(default=False)
-    profile_picture = models.ImageField(upload_to="profile_pictures/", null=True, blank=True)
+    profile_picture = models.ImageField(
+        upload_to="profile_pictures/", storage=get_media_storage, null=True, blank=True
+    )
 
     company_name = models.CharField(max_length=255, blank=True, null=True)
     display_as_company = models.BooleanField(default=False)
@@ -59,6 +66,22 @@ class Offering(models.Model):
 
 
 # 📦 Community Posting
+class CommunityPostingQuerySet(models.QuerySet):
+    def for_feed(self):
+        """
+        Loads everything CommunityPostingSerializer reads in a fixed number
+        of queries: one for the postings (+ user & category) and one per
+        related collection, no matter how many postings are on the page.
+        """
+        return self.select_related("user", "category").prefetch_related(
+            models.Prefetch("images", queryset=PostingImage.objects.only("id", "image", "renditions", "posting_id")),
+            models.Prefetch("tags", queryset=ListingTag.objects.select_related("tag")),
+            models.Prefetch("favorited_by", queryset=Favorite.objects.only("id", "listing_id")),
+            "payment_methods",
+            "offerings",
+        )
+
+
 class CommunityPosting(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="postings")
     title = models.CharField(max_length=255)
@@ -81,6 +104,20 @@ class CommunityPosting(models.Model):
         help_text="Any add-ons or extras for this listing"
     )
 
+    objects = CommunityPostingQuerySet.as_manager()
+
+    class Meta:
+        # One index per access path used by api.filters.PostingFilterBackend,
+        # each ending in the feed's -created_at so filtered pages come back
+        # already sorted.
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="posting_created_idx"),
+            models.Index(fields=["category", "-created_at", "-id"], name="posting_category_created_idx"),
+            models.Index(fields=["user", "-created_at", "-id"], name="posting_user_created_idx"),
+            models.Index(fields=["location", "-created_at", "-id"], name="posting_location_created_idx"),
+            models.Index(fields=["price"], name="posting_price_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -88,8 +125,12 @@ class CommunityPosting(models.Model):
 # 🖼️ Posting Images
 class PostingImage(models.Model):
     posting = models.ForeignKey(CommunityPosting, on_delete=models.CASCADE, related_name="images")
-    image = models.ImageField(upload_to="posting_images/")
+    image = models.ImageField(upload_to="posting_images/", storage=get_media_storage)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Filled in by api.images: {"thumbnail": {"width", "height", "webp", "jpeg"}, "card": …, "full": …}
+    renditions = models.JSONField(default=dict, blank=True)
+    # sha256 of the uploaded bytes; identical uploads share one stored file
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
 
     def __str__(self):
         return f"Image for {self.posting.title}"
@@ -128,6 +169,43 @@ class ListingTag(models.Model):
         return f"{self.listing.title} - {self.tag.name}"
 
 
+# 🧵 Conversations: one per (listing, buyer, seller), maintained by api.conversations
+class Conversation(models.Model):
+    listing = models.ForeignKey(CommunityPosting, on_delete=models.CASCADE, related_name="conversations")
+    buyer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="buying_conversations")
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="selling_conversations")
+    last_message = models.ForeignKey(
+        "Message", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    last_message_at = models.DateTimeField(default=timezone.now)
+    # Unread messages addressed to each side
+    buyer_unread = models.IntegerField(default=0)
+    seller_unread = models.IntegerField(default=0)
+    # Per-side soft delete: messages up to this point are hidden from that side
+    buyer_cleared_at = models.DateTimeField(null=True, blank=True)
+    seller_cleared_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["listing", "buyer", "seller"], name="conversation_participants_uniq"),
+        ]
+        indexes = [
+            # each side's inbox, newest activity first
+            models.Index(fields=["buyer", "-last_message_at", "-id"], name="conversation_buyer_idx"),
+            models.Index(fields=["seller", "-last_message_at", "-id"], name="conversation_seller_idx"),
+        ]
+
+    def __str__(self):
+        return f"Conversation about {self.listing_id} between {self.buyer_id} and {self.seller_id}"
+
+    def unread_for(self, user):
+        return self.seller_unread if user.id == self.seller_id else self.buyer_unread
+
+    def cleared_at_for(self, user):
+        return self.seller_cleared_at if user.id == self.seller_id else self.buyer_cleared_at
+
+
 # 💬 Messages
 class Message(models.Model):
     listing = models.ForeignKey(CommunityPosting, on_delete=models.CASCADE, related_name="messages")
@@ -140,12 +218,26 @@ class Message(models.Model):
         blank=True,
     )
     content = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Assigned by the server when the message is accepted, before it is
+    # written (see api.write_behind), so clients can rely on both right away.
+    uid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     parent_message = models.ForeignKey("self", null=True, blank=True, on_delete=models.CASCADE, related_name="replies")
+    conversation = models.ForeignKey(
+        Conversation, on_delete=models.CASCADE, null=True, blank=True, related_name="messages"
+    )
     read = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # unread counts / repair_counters
+            models.Index(fields=["recipient", "read"], name="message_recipient_read_idx"),
+            # conversation history, newest first
+            models.Index(fields=["conversation", "-created_at", "-id"], name="message_conversation_idx"),
+            # api.platform_stats' refresh window
+            models.Index(fields=["created_at"], name="message_created_idx"),
+        ]
 
     def __str__(self):
         rec_email = self.recipient.email if self.recipient else "N/A"
@@ -185,9 +277,18 @@ class Order(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
     paid_at = models.DateTimeField(null=True, blank=True)
+    # Stripe objects created for this order (api.payments)
+    stripe_payment_intent_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    stripe_checkout_session_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # The admin changelist's ordering and api.platform_stats' refresh window
+            models.Index(fields=["-created_at", "-id"], name="order_created_idx"),
+            # Late payments (api.platform_stats.dirty_since)
+            models.Index(fields=["paid_at"], name="order_paid_idx"),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} by {self.buyer.username} ({self.status})"
@@ -223,23 +324,162 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            # Finding a target's notifications (api.conversations.delete_messages)
+            models.Index(fields=["target_content_type", "target_object_id"], name="notification_target_idx"),
+        ]
 
     def __str__(self):
         return f"Notification for {self.recipient} – {self.verb}"
 
 
+# 🔢 Per-user unread counters (maintained by api.counters)
+class UserCounters(models.Model):
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="counters"
+    )
+    unread_messages = models.IntegerField(default=0)
+    unread_notifications = models.IntegerField(default=0)
+    # Orders on the user's listings placed on new_orders_date
+    new_orders = models.IntegerField(default=0)
+    new_orders_date = models.DateField(null=True, blank=True)
+    # Highest Notification id already covered by an email digest (api.emails)
+    digest_sent_through = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Counters for {self.user}"
+
+
+# 📊 Daily analytics rollups (maintained by api.rollups)
+class UserDailyActivity(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    day = models.DateField()
+    posts = models.IntegerField(default=0)
+    # Orders the user placed as a buyer (what the "sales" endpoints count)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="user_daily_activity_uniq"),
+        ]
+
+
+class UserDailyCategoryOrders(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    day = models.DateField()
+    # Kept when the category is deleted: it then reads as no category, as
+    # it does for the postings themselves (SET_NULL).
+    category = models.ForeignKey(
+        Category, null=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+"
+    )
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day", "category"], name="user_daily_category_uniq"),
+        ]
+
+
+# 📈 Platform-wide aggregates (refreshed by api.platform_stats)
+class PlatformDailyStats(models.Model):
+    day = models.DateField(unique=True)
+    new_users = models.IntegerField(default=0)
+    new_listings = models.IntegerField(default=0)
+    # Distinct users who posted, ordered or sent a message that day
+    active_users = models.IntegerField(default=0)
+    refreshed_at = models.DateTimeField()
+
+
+class PlatformDailyOrders(models.Model):
+    """Orders placed per day and current status; GMV is `amount` of the PAID rows."""
+    day = models.DateField()
+    status = models.CharField(max_length=10, choices=Order.STATUS_CHOICES)
+    orders = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "status"], name="platform_daily_orders_uniq"),
+        ]
+
+
+class PlatformCategoryListings(models.Model):
+    category = models.OneToOneField(
+        Category, null=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+"
+    )
+    listings = models.IntegerField(default=0)
+
+
+# ─── Outbound email queue (sent by api.outbox) ──────────────────────────────
+
+class OutboundEmail(models.Model):
+    STATUS_QUEUED = "QUEUED"
+    STATUS_SENT = "SENT"
+    STATUS_DEAD = "DEAD"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_DEAD, "Dead"),
+    ]
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The sender's "what is due" scan
+            models.Index(fields=["status", "next_attempt_at"], name="outbound_email_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {self.to} ({self.status})"
+
+
+# ─── Stripe webhook events (processed by api.stripe_events) ──────────────────
+
+class StripeEvent(models.Model):
+    """Append-only log of verified webhook deliveries; event_id dedups retries."""
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # The processor's "what is pending" scan
+            models.Index(fields=["processed_at", "id"], name="stripe_event_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.type} ({self.event_id})"
+
+
 # ─── Signal handlers to auto-create Notifications ──────────────────────────
 
+def message_notification(message):
+    """The (unsaved) Notification a new Message gives its recipient."""
+    return Notification(
+        recipient_id=message.recipient_id,
+        actor_id=message.sender_id,
+        verb="sent you a message",
+        target=message
+    )
+
+
 @receiver(post_save, sender=Message)
 def notify_on_message(sender, instance, created, **kwargs):
-    if not created or not instance.recipient:
+    if not created or not instance.recipient_id:
         return
-    Notification.objects.create(
-        recipient=instance.recipient,
-        actor=instance.sender,
-        verb="sent you a message",
-        target=instance
-    )
+    message_notification(instance).save()
 
 
 @receiver(post_save, sender=Order)
@@ -0,0 +1,94 @@
+# api/notifications.py
+
+"""
+Real-time notification push.
+
+Every Notification is pushed to its recipient's `notifications_{id}` group
+once its transaction commits, together with the recipient's counters
+(api.counters). Rows
+saved one at a time are handled by the post_save receiver below; bulk
+inserts (api.write_behind) call publish() themselves. NotificationConsumer
+forwards the pushes to the browser, and replays missed rows on reconnect.
+"""
+
+import logging
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .counters import get_counters
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def notification_group(user_id):
+    return f"notifications_{user_id}"
+
+
+def serialize(notifications):
+    from .serializers import NotificationSerializer
+
+    # Plain dicts, so every channel layer can serialize them.
+    return [dict(data) for data in NotificationSerializer(notifications, many=True).data]
+
+
+def push_event(user_id, notifications):
+    """The frame NotificationConsumer sends for `notifications` (may be empty)."""
+    return {
+        "type": "notifications",
+        "notifications": serialize(notifications),
+        "counters": get_counters(user_id),
+    }
+
+
+def publish(notifications):
+    """Push `notifications` to their recipients after the current transaction commits."""
+    ids = [notification.pk for notification in notifications]
+    if ids:
+        transaction.on_commit(lambda: _push(ids))
+
+
+def _push(ids):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    by_recipient = defaultdict(list)
+    for notification in (
+        Notification.objects.filter(id__in=ids)
+            .select_related("actor", "target_content_type")
+            .order_by("id")
+    ):
+        by_recipient[notification.recipient_id].append(notification)
+
+    for recipient_id, notifications in by_recipient.items():
+        _send(layer, recipient_id, notifications)
+
+
+def publish_counters(user_id):
+    """Push fresh unread counters (e.g. after messages were marked read)."""
+    def push():
+        layer = get_channel_layer()
+        if layer is not None:
+            _send(layer, user_id, [])
+    transaction.on_commit(push)
+
+
+def _send(layer, user_id, notifications):
+    event = push_event(user_id, notifications)
+    event["type"] = "notifications.push"
+    try:
+        async_to_sync(layer.group_send)(notification_group(user_id), event)
+    except Exception:
+        # Clients catch up from last_id when they reconnect.
+        logger.exception("Could not push notifications to user %s", user_id)
+
+
+@receiver(post_save, sender=Notification)
+def publish_on_create(sender, instance, created, **kwargs):
+    if created:
+        publish([instance])
@@ -0,0 +1,94 @@
+# api/outbox.py
+
+"""
+Outbound email queue. Request handlers only insert an OutboundEmail row
+(`enqueue`), inside their own transaction, so a rolled-back order never
+sends mail and checkout never waits on SMTP. The `send_outbox` command
+delivers due rows in batches, each over a single EMAIL_BACKEND connection.
+
+A failed email is retried after OUTBOX_RETRY_DELAY × 2^(attempts - 1)
+seconds (capped at OUTBOX_MAX_RETRY_DELAY). After OUTBOX_MAX_ATTEMPTS tries
+it is marked DEAD, keeping its last error for the admin.
+
+Point EMAIL_BACKEND at Django's locmem or filebased backend to run the
+whole flow offline.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(to, subject, body):
+    """Queue one email; it is sent once the current transaction commits."""
+    return OutboundEmail.objects.create(to=to, subject=subject, body=body)
+
+
+def retry_delay(attempts):
+    base = getattr(settings, "OUTBOX_RETRY_DELAY", 60)
+    cap = getattr(settings, "OUTBOX_MAX_RETRY_DELAY", 6 * 3600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def send_due(batch_size=None):
+    """Send one batch of due emails over one connection; returns (sent, failed)."""
+    batch_size = batch_size or getattr(settings, "OUTBOX_BATCH_SIZE", 100)
+    now = timezone.now()
+    with transaction.atomic():
+        due = (
+            OutboundEmail.objects
+                .filter(status=OutboundEmail.STATUS_QUEUED, next_attempt_at__lte=now)
+                .order_by("next_attempt_at", "id")
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            # Concurrent senders each claim different rows.
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due[:batch_size])
+        if not batch:
+            return 0, 0
+
+        sent, failed = [], []
+        mail = get_connection(fail_silently=False)
+        try:
+            mail.open()
+        except Exception as exc:
+            failed = [(email, exc) for email in batch]
+        else:
+            try:
+                for email in batch:
+                    message = EmailMessage(email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.to])
+                    try:
+                        mail.send_messages([message])
+                    except Exception as exc:
+                        failed.append((email, exc))
+                    else:
+                        sent.append(email.pk)
+            finally:
+                mail.close()
+
+        OutboundEmail.objects.filter(pk__in=sent).update(
+            status=OutboundEmail.STATUS_SENT, sent_at=timezone.now(), attempts=F("attempts") + 1,
+        )
+        for email, exc in failed:
+            _record_failure(email, exc, now)
+    return len(sent), len(failed)
+
+
+def _record_failure(email, exc, now):
+    email.attempts += 1
+    email.last_error = f"{type(exc).__name__}: {exc}"
+    if email.attempts >= getattr(settings, "OUTBOX_MAX_ATTEMPTS", 8):
+        email.status = OutboundEmail.STATUS_DEAD
+        logger.error("Giving up on email %s to %s: %s", email.pk, email.to, email.last_error)
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+    email.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
@@ -0,0 +1,166 @@
+# api/pagination.py
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import AutoField, Max, Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a composite, unique ordering such as
+    (created_at, id). The cursor stores the last row's full key, so each
+    page is a plain `WHERE (created_at, id) < (...) ORDER BY ... LIMIT n`
+    index range scan – page 1000 costs the same as page 1, and rows that
+    share a timestamp are never skipped or repeated.
+    """
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    position_separator = "|"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, self.cursor.position
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self._after_position(queryset.model, ordering, current_position))
+
+        # Fetch one extra row to find out whether another page follows.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+
+        has_following_page = len(results) > len(self.page)
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following_page
+        else:
+            self.has_next = has_following_page
+            self.has_previous = current_position is not None
+        self.next_position = self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    # Keys are unique, so a cursor is always "strictly beyond the edge row
+    # of this page" – DRF's offset bookkeeping for duplicate keys is not needed.
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else self.next_position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else self.previous_position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip("-")
+            attr = instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name)
+            values.append(attr.isoformat() if hasattr(attr, "isoformat") else str(attr))
+        return self.position_separator.join(values)
+
+    def _after_position(self, model, ordering, position):
+        """
+        Builds the lexicographic "row comes after `position`" condition,
+        e.g. for (-created_at, -id):
+            created_at < ts OR (created_at = ts AND id < pk)
+        """
+        raw_values = position.split(self.position_separator)
+        if len(raw_values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        keys = []
+        for order, raw in zip(ordering, raw_values):
+            field_name = order.lstrip("-")
+            try:
+                value = model._meta.get_field(field_name).to_python(raw)
+            except (ValidationError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            keys.append((field_name, "lt" if order.startswith("-") else "gt", value))
+
+        condition = Q()
+        equal_prefix = Q()
+        for field_name, lookup, value in keys:
+            condition |= equal_prefix & Q(**{f"{field_name}__{lookup}": value})
+            equal_prefix &= Q(**{field_name: value})
+        return condition
+
+
+class NotificationPagination(KeysetPagination):
+    ordering = ("-timestamp", "-id")
+
+
+class ConversationPagination(KeysetPagination):
+    ordering = ("-last_message_at", "-id")
+
+
+# ─── Admin changelists ──────────────────────────────────────────────────────
+
+def estimated_count(model, using="default"):
+    """
+    Roughly how many rows `model`'s table has, without reading it: the
+    planner's statistics on PostgreSQL and MySQL, else the highest integer
+    primary key (one index lookup; deleted rows are still counted).
+    None when no estimate is available.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                           [connection.ops.quote_name(table)])
+        elif connection.vendor == "mysql":
+            cursor.execute("SELECT table_rows FROM information_schema.tables "
+                           "WHERE table_schema = DATABASE() AND table_name = %s", [table])
+        elif isinstance(model._meta.pk, AutoField):
+            return model._default_manager.using(using).aggregate(n=Max("pk"))["n"]
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 for a table that was never analyzed
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over large tables. Unfiltered, the count
+    is estimated_count() once that reaches ADMIN_ESTIMATED_COUNT_THRESHOLD,
+    instead of a COUNT(*) over the whole table on every page load. Filtered
+    or searched lists are usually much smaller and are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= getattr(settings, "ADMIN_ESTIMATED_COUNT_THRESHOLD", 100000):
+                return estimate
+        return super().count
@@ -0,0 +1,136 @@
+# api/payments.py
+
+"""
+Stripe calls for checkout.
+
+* One StripeClient per process, on a shared requests.Session, so HTTP
+  connections (and their TLS handshakes) are reused. Every call is bounded
+  by STRIPE_TIMEOUT.
+* Stripe objects are created with an idempotency key derived from the order
+  ("order-<id>-payment-intent"), and their ids are stored on the Order. A
+  retried request, from the browser or from the library's own
+  STRIPE_MAX_NETWORK_RETRIES, gets the same PaymentIntent/Session back
+  instead of a second one.
+* STRIPE_API_BASE points the client elsewhere, e.g. at api.stripe_stub.
+"""
+
+import threading
+from decimal import Decimal
+
+import requests
+import stripe
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .models import Order
+
+
+class PaymentError(Exception):
+    """Stripe refused or could not be reached; the message is safe to show."""
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            base = getattr(settings, "STRIPE_API_BASE", None)
+            _client = stripe.StripeClient(
+                settings.STRIPE_SECRET_KEY,
+                base_addresses={"api": base} if base else None,
+                http_client=stripe.RequestsClient(
+                    timeout=getattr(settings, "STRIPE_TIMEOUT", 10), session=requests.Session()
+                ),
+                max_network_retries=getattr(settings, "STRIPE_MAX_NETWORK_RETRIES", 2),
+            )
+        return _client
+
+
+@receiver(setting_changed)
+def reset_client(setting, **kwargs):
+    global _client
+    if setting.startswith("STRIPE_"):
+        _client = None
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal(1)))
+
+
+def idempotency_key(order, kind):
+    return f"order-{order.pk}-{kind}"
+
+
+def _call(method, *args, **kwargs):
+    try:
+        return method(*args, **kwargs)
+    except stripe.StripeError as exc:
+        raise PaymentError(exc.user_message or "Payment provider error") from exc
+
+
+def _remember(order, field, value):
+    # Only the first writer wins; concurrent retries got the same id anyway.
+    Order.objects.filter(pk=order.pk, **{f"{field}__isnull": True}).update(**{field: value})
+    setattr(order, field, value)
+
+
+def payment_intent_for(order):
+    """The order's PaymentIntent, created on first use (for its total_price)."""
+    client = get_client()
+    if order.stripe_payment_intent_id:
+        return _call(client.v1.payment_intents.retrieve, order.stripe_payment_intent_id)
+    intent = _call(
+        client.v1.payment_intents.create,
+        params={
+            "amount": to_cents(order.total_price),
+            "currency": "usd",
+            "automatic_payment_methods": {"enabled": True},
+            "metadata": {"order_id": str(order.pk)},
+        },
+        options={"idempotency_key": idempotency_key(order, "payment-intent")},
+    )
+    _remember(order, "stripe_payment_intent_id", intent.id)
+    return intent
+
+
+def checkout_session_for(listing, success_url, cancel_url, order=None, key=None):
+    """
+    A Checkout Session for `listing`. With an order, the session charges the
+    order's total and is created once per order. Without one, `key` (the
+    client's Idempotency-Key) guards against duplicates.
+    """
+    client = get_client()
+    if order is not None and order.stripe_checkout_session_id:
+        return _call(client.v1.checkout.sessions.retrieve, order.stripe_checkout_session_id)
+    amount = order.total_price if order is not None else listing.price
+    params = {
+        "mode": "payment",
+        "payment_method_types": ["card"],
+        "line_items": [{
+            "price_data": {
+                "currency": "usd",
+                "unit_amount": to_cents(amount),
+                "product_data": {"name": listing.title, "description": listing.description},
+            },
+            "quantity": 1,
+        }],
+        "billing_address_collection": "required",
+        "success_url": success_url,
+        "cancel_url": cancel_url,
+    }
+    if order is not None:
+        params["metadata"] = {"order_id": str(order.pk)}
+        key = idempotency_key(order, "checkout-session")
+    elif key:
+        key = f"listing-{listing.pk}-checkout-session-{key}"
+    session = _call(
+        client.v1.checkout.sessions.create, params=params,
+        options={"idempotency_key": key} if key else None,
+    )
+    if order is not None:
+        _remember(order, "stripe_checkout_session_id", session.id)
+    return session
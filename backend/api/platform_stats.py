@@ -0,0 +1,153 @@
+# api/platform_stats.py
+
+"""
+Platform-wide aggregates for staff: GMV and orders per day and status, new
+and active users, new listings per day, and listings per category. They
+live in the Platform* tables and `refresh()` (the `refresh_platform_stats`
+command, e.g. every few minutes from cron) keeps them current, so the
+/api/analytics/platform/ endpoint and the admin read a few hundred rows
+instead of scanning orders, postings and messages.
+
+A refresh is incremental. It recomputes only the days from
+PLATFORM_STATS_LOOKBACK_DAYS before the previous refresh onwards, plus
+the days of any order paid since then (a late payment moves an older
+order from PENDING to PAID). Changes older than that window, such as an
+order canceled by hand months later, wait for `refresh(full=True)`. The
+first refresh is always full. Listings per category are recounted every
+time: postings can be deleted or moved at any age, and the recount is one
+GROUP BY over the category index. Days are in the current time zone, as
+in api.rollups.
+"""
+
+from collections import Counter
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    CommunityPosting, Message, Order, PlatformCategoryListings, PlatformDailyOrders,
+    PlatformDailyStats,
+)
+
+User = get_user_model()
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def dirty_since():
+    """First day a refresh has to recompute, or None when it has to be full."""
+    last = PlatformDailyStats.objects.aggregate(last=Max("refreshed_at"))["last"]
+    if last is None:
+        return None
+    lookback = getattr(settings, "PLATFORM_STATS_LOOKBACK_DAYS", 2)
+    since = timezone.localdate(last) - timedelta(days=lookback)
+    late = Order.objects.filter(paid_at__gte=last).aggregate(first=Min("created_at"))["first"]
+    if late is not None:
+        since = min(since, timezone.localdate(late))
+    return since
+
+
+def refresh(full=False):
+    """Recompute the dirty days (every day if `full`); returns how many."""
+    now = timezone.now()
+    since = None if full else dirty_since()
+
+    def recent(queryset, field="created_at"):
+        queryset = queryset.order_by()
+        if since is not None:
+            queryset = queryset.filter(**{f"{field}__gte": _start_of(since)})
+        return queryset.annotate(day=TruncDate(field))
+
+    orders = list(
+        recent(Order.objects).values_list("day", "status").annotate(n=Count("id"), amount=Sum("total_price"))
+    )
+    new_users = dict(recent(User.objects, "date_joined").values_list("day").annotate(n=Count("id")))
+    new_listings = dict(recent(CommunityPosting.objects).values_list("day").annotate(n=Count("id")))
+    # UNION drops the duplicates: each (day, user) is counted once.
+    active_users = Counter(day for day, _ in (
+        recent(CommunityPosting.objects).values_list("day", "user_id")
+        .union(
+            recent(Order.objects).values_list("day", "buyer_id"),
+            recent(Message.objects).values_list("day", "sender_id"),
+        )
+    ))
+
+    today = timezone.localdate(now)
+    first = since
+    if first is None:
+        first = min([day for day, *_ in orders] + list(new_users) + list(new_listings) + [today])
+    days = [first + timedelta(days=i) for i in range((today - first).days + 1)]
+
+    with transaction.atomic():
+        stale_days = PlatformDailyStats.objects.all()
+        stale_orders = PlatformDailyOrders.objects.all()
+        if since is not None:
+            stale_days = stale_days.filter(day__gte=since)
+            stale_orders = stale_orders.filter(day__gte=since)
+        stale_days.delete()
+        stale_orders.delete()
+        # One row per day, even an idle one: the newest refreshed_at is the
+        # watermark the next refresh starts from.
+        PlatformDailyStats.objects.bulk_create([
+            PlatformDailyStats(
+                day=day, new_users=new_users.get(day, 0), new_listings=new_listings.get(day, 0),
+                active_users=active_users.get(day, 0), refreshed_at=now,
+            )
+            for day in days
+        ], batch_size=1000)
+        PlatformDailyOrders.objects.bulk_create([
+            PlatformDailyOrders(day=day, status=status, orders=n, amount=amount)
+            for day, status, n, amount in orders
+        ], batch_size=1000)
+
+        PlatformCategoryListings.objects.all().delete()
+        PlatformCategoryListings.objects.bulk_create([
+            PlatformCategoryListings(category_id=category_id, listings=n)
+            for category_id, n in CommunityPosting.objects.order_by().values_list("category").annotate(
+                n=Count("id")
+            )
+        ])
+    return len(days)
+
+
+def overview(start=None, end=None):
+    """The platform dashboard from the aggregate tables (start/end: dates, inclusive)."""
+    days = PlatformDailyStats.objects.order_by("day")
+    orders = PlatformDailyOrders.objects.order_by()
+    if start:
+        days, orders = days.filter(day__gte=start), orders.filter(day__gte=start)
+    if end:
+        days, orders = days.filter(day__lte=end), orders.filter(day__lte=end)
+
+    gmv = {}
+    by_status = {
+        status: {"status": status, "orders": 0, "amount": Decimal(0)} for status, _ in Order.STATUS_CHOICES
+    }
+    for day, status, n, amount in orders.values_list("day", "status", "orders", "amount"):
+        totals = by_status[status]
+        totals["orders"] += n
+        totals["amount"] += amount
+        if status == Order.STATUS_PAID:
+            gmv[day] = amount
+    return {
+        "days": [
+            {"day": row.day, "gmv": gmv.get(row.day, Decimal(0)), "newUsers": row.new_users,
+             "newListings": row.new_listings, "activeUsers": row.active_users}
+            for row in days
+        ],
+        "ordersByStatus": list(by_status.values()),
+        "listingsByCategory": [
+            {"category": row["category__name"], "value": row["listings"]}
+            for row in PlatformCategoryListings.objects.filter(listings__gt=0)
+            .values("category__name", "listings").order_by("-listings")
+        ],
+        "refreshedAt": PlatformDailyStats.objects.aggregate(last=Max("refreshed_at"))["last"],
+    }
@@ -0,0 +1,180 @@
+# api/revenue.py
+
+"""
+Seller revenue analytics: paid orders on the seller's listings, bucketed by
+the day (or month) they were placed, in the current time zone.
+
+Everything the /api/analytics/seller/revenue/ endpoint shows is aggregated
+in the database (`summary`, `revenue_by`, `top_listings`,
+`offering_attach`), a handful of GROUP BY queries however many orders there
+are.
+
+`stream_revenue` computes the same series outside the database for large
+exports and for checking the database's sums. It streams (period, cents)
+rows through a server-side cursor in chunks, so memory stays flat, and
+adds up integer cents. That makes the totals exact on every backend:
+SQLite sums decimal columns as floating point. With NumPy installed, each
+chunk is bucketed with vectorized operations. Without it, a plain loop
+does the same job.
+"""
+
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.db.models import BigIntegerField, Count, DateField, Exists, F, OuterRef, Sum
+from django.db.models.functions import Cast, Coalesce, Round, TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import Order
+
+try:
+    import numpy as np
+except ImportError:  # numpy only speeds up stream_revenue
+    np = None
+
+BUCKETS = {"day": TruncDate, "month": TruncMonth}
+STREAM_CHUNK_SIZE = 20000
+CENT = Decimal("0.01")
+
+
+def seller_orders(seller, start=None, end=None):
+    """Paid orders on `seller`'s listings placed between the `start` and `end` dates (inclusive)."""
+    return placed_between(
+        Order.objects.filter(listing__user=seller, status=Order.STATUS_PAID).order_by(), start, end
+    )
+
+
+def placed_between(orders, start=None, end=None):
+    """`orders` placed from the `start` through the `end` date (either may be None)."""
+    # Compare created_at itself to whole-day bounds rather than wrapping
+    # every row's created_at in a date cast.
+    if start:
+        orders = orders.filter(created_at__gte=_start_of(start))
+    if end:
+        orders = orders.filter(created_at__lt=_start_of(end + timedelta(days=1)))
+    return orders
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def _period(bucket):
+    """created_at truncated to the day or month, as a date."""
+    return BUCKETS[bucket]("created_at", output_field=DateField())
+
+
+def _has_offerings():
+    return Exists(Order.offerings.through.objects.filter(order_id=OuterRef("pk")))
+
+
+def summary(orders):
+    """Revenue, order count, average order value and offering attach rate."""
+    totals = orders.aggregate(
+        revenue=Coalesce(Sum("total_price"), Decimal(0)),
+        orders=Count("id"),
+        with_offerings=Count("id", filter=_has_offerings()),
+    )
+    count = totals["orders"]
+    return {
+        "revenue": totals["revenue"],
+        "orders": count,
+        "averageOrderValue": (totals["revenue"] / count).quantize(CENT) if count else Decimal(0),
+        "attachRate": round(totals["with_offerings"] / count, 4) if count else 0.0,
+    }
+
+
+def revenue_by(orders, bucket="day"):
+    """[{period, revenue, orders}] per day or month, oldest first."""
+    return list(
+        orders.annotate(period=_period(bucket))
+        .values("period")
+        .annotate(revenue=Sum("total_price"), orders=Count("id"))
+        .order_by("period")
+    )
+
+
+def top_listings(orders, limit=10):
+    """The `limit` listings that brought in the most revenue."""
+    return [
+        {"listing": row["listing_id"], "title": row["listing__title"],
+         "revenue": row["revenue"], "orders": row["orders"]}
+        for row in orders.values("listing_id", "listing__title")
+        .annotate(revenue=Sum("total_price"), orders=Count("id"))
+        .order_by("-revenue", "listing_id")[:limit]
+    ]
+
+
+def offering_attach(orders):
+    """Per offering: how many of `orders` include it, and what share that is."""
+    count = orders.count()
+    if not count:
+        return []
+    rows = (
+        Order.offerings.through.objects.filter(order__in=orders.values("pk"))
+        .values("offering_id", "offering__name")
+        .annotate(orders=Count("order_id", distinct=True))
+        .order_by("-orders", "offering_id")
+    )
+    return [
+        {"offering": row["offering_id"], "name": row["offering__name"],
+         "orders": row["orders"], "attachRate": round(row["orders"] / count, 4)}
+        for row in rows
+    ]
+
+
+# ─── Streaming aggregation ──────────────────────────────────────────────────
+
+def stream_revenue(orders, bucket="day", chunk_size=STREAM_CHUNK_SIZE, use_numpy=True):
+    """
+    revenue_by() computed from streamed rows in exact integer cents.
+    `use_numpy=False` forces the pure-Python loop (e.g. to compare the two).
+    """
+    rows = (
+        orders.order_by()
+        .annotate(
+            period=_period(bucket),
+            # Each price is rounded to whole cents in the database, where it
+            # is still exact (or a float off by far less than half a cent).
+            cents=Cast(Round(F("total_price") * 100), BigIntegerField()),
+        )
+        .values_list("period", "cents")
+        .iterator(chunk_size=chunk_size)
+    )
+    add_chunk = _add_chunk_numpy if use_numpy and np is not None else _add_chunk_python
+    totals = {}   # period ordinal → [cents, orders]
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            add_chunk(totals, chunk)
+            chunk = []
+    if chunk:
+        add_chunk(totals, chunk)
+    return [
+        {"period": date.fromordinal(ordinal),
+         "revenue": Decimal(cents).scaleb(-2), "orders": count}
+        for ordinal, (cents, count) in sorted(totals.items())
+    ]
+
+
+def _add_chunk_python(totals, chunk):
+    for period, cents in chunk:
+        entry = totals.setdefault(period.toordinal(), [0, 0])
+        entry[0] += cents
+        entry[1] += 1
+
+
+def _add_chunk_numpy(totals, chunk):
+    size = len(chunk)
+    keys = np.fromiter((period.toordinal() for period, _ in chunk), dtype=np.int64, count=size)
+    cents = np.fromiter((c for _, c in chunk), dtype=np.int64, count=size)
+    periods, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(periods))
+    # int64 sums: bincount(weights=) would go through float64.
+    sums = np.zeros(len(periods), dtype=np.int64)
+    np.add.at(sums, inverse, cents)
+    for ordinal, cents_sum, count in zip(periods.tolist(), sums.tolist(), counts.tolist()):
+        entry = totals.setdefault(ordinal, [0, 0])
+        entry[0] += cents_sum
+        entry[1] += count
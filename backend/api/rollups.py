@@ -0,0 +1,120 @@
+# api/rollups.py
+
+"""
+Daily analytics rollups behind the /api/analytics/user/ endpoints.
+
+UserDailyActivity counts postings created and orders placed per (user, day).
+UserDailyCategoryOrders counts those orders per (user, day, listing
+category). The signal handlers below keep both current with one upsert per
+change. A dashboard therefore reads at most a few hundred rows per year of
+history, however many postings and orders sit behind them. Days are in the
+current time zone, like the TruncMonth queries they replace.
+
+`rebuild()` (the `rebuild_rollups` command) recomputes the rows from the
+source tables, e.g. after bulk imports that skipped signals.
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CommunityPosting, Order, UserDailyActivity, UserDailyCategoryOrders
+
+
+def bump(model, keys, create=True, **deltas):
+    """Add `deltas` to the `keys` row of `model`, creating it if needed (and `create`)."""
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**keys).update(**updates) or not create:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+    except IntegrityError:
+        # Someone else created it meanwhile.
+        model.objects.filter(**keys).update(**updates)
+
+
+def rebuild(user_ids=None):
+    """Recompute the rollups (of `user_ids`, or everyone's)."""
+    postings = CommunityPosting.objects.order_by()
+    orders = Order.objects.order_by()
+    activity_rows = UserDailyActivity.objects.all()
+    category_rows = UserDailyCategoryOrders.objects.all()
+    if user_ids is not None:
+        postings = postings.filter(user_id__in=user_ids)
+        orders = orders.filter(buyer_id__in=user_ids)
+        activity_rows = activity_rows.filter(user_id__in=user_ids)
+        category_rows = category_rows.filter(user_id__in=user_ids)
+
+    activity = defaultdict(lambda: {"posts": 0, "orders": 0})
+    for user_id, day, n in (
+        postings.annotate(day=TruncDate("created_at")).values_list("user_id", "day").annotate(n=Count("id"))
+    ):
+        activity[user_id, day]["posts"] = n
+    by_day = orders.annotate(day=TruncDate("created_at"))
+    for user_id, day, n in by_day.values_list("buyer_id", "day").annotate(n=Count("id")):
+        activity[user_id, day]["orders"] = n
+
+    with transaction.atomic():
+        activity_rows.delete()
+        category_rows.delete()
+        UserDailyActivity.objects.bulk_create(
+            [UserDailyActivity(user_id=user_id, day=day, **counts) for (user_id, day), counts in activity.items()],
+            batch_size=1000,
+        )
+        UserDailyCategoryOrders.objects.bulk_create(
+            [
+                UserDailyCategoryOrders(user_id=user_id, day=day, category_id=category_id, orders=n)
+                for user_id, day, category_id, n in (
+                    by_day.values_list("buyer_id", "day", "listing__category_id").annotate(n=Count("id"))
+                )
+            ],
+            batch_size=1000,
+        )
+    return len(activity)
+
+
+# ─── Signal handlers ────────────────────────────────────────────────────────
+
+@receiver(post_save, sender=CommunityPosting)
+def count_posting(sender, instance, created, **kwargs):
+    if created and not kwargs.get("raw"):
+        bump(UserDailyActivity, {"user_id": instance.user_id, "day": timezone.localdate(instance.created_at)},
+             posts=1)
+
+
+# Deletes only decrement existing rows. A missing row was never counted, or
+# was already removed along with its user (this runs inside that cascade),
+# and re-creating it would leave a row pointing at the deleted user.
+
+@receiver(post_delete, sender=CommunityPosting)
+def uncount_posting(sender, instance, **kwargs):
+    bump(UserDailyActivity, {"user_id": instance.user_id, "day": timezone.localdate(instance.created_at)},
+         create=False, posts=-1)
+
+
+def _count_order(order, delta):
+    day = timezone.localdate(order.created_at)
+    category_id = (
+        CommunityPosting.objects.filter(pk=order.listing_id).values_list("category_id", flat=True).first()
+    )
+    create = delta > 0
+    bump(UserDailyActivity, {"user_id": order.buyer_id, "day": day}, create=create, orders=delta)
+    bump(UserDailyCategoryOrders, {"user_id": order.buyer_id, "day": day, "category_id": category_id},
+         create=create, orders=delta)
+
+
+@receiver(post_save, sender=Order)
+def count_order(sender, instance, created, **kwargs):
+    if created and not kwargs.get("raw"):
+        _count_order(instance, 1)
+
+
+@receiver(post_delete, sender=Order)
+def uncount_order(sender, instance, **kwargs):
+    _count_order(instance, -1)
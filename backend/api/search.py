@@ -0,0 +1,280 @@
+# api/search.py
+
+"""
+Full-text search over CommunityPosting.
+
+The index lives in a side table named `api_postingsearch`, created by
+migration 0009 for whichever backend is in use:
+
+  * SQLite   – an FTS5 virtual table (rowid = posting id), ranked with bm25()
+  * Postgres – a weighted tsvector column with a GIN index, ranked with
+               ts_rank_cd() (Postgres has no built-in BM25)
+
+Other backends fall back to an unranked icontains scan so the endpoint
+keeps working, just slowly. Rows are kept in sync by the signal handlers
+at the bottom of this module (registered from ApiConfig.ready) and can be
+rebuilt with `manage.py rebuild_search_index`.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.db.models import Count, Prefetch, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Category, CommunityPosting, ListingTag
+
+INDEX_TABLE = "api_postingsearch"
+
+# bm25() column weights, in index column order:
+# title, description, location, tags, category
+SQLITE_WEIGHTS = (10.0, 2.0, 3.0, 5.0, 3.0)
+
+FACET_LIMIT = 20
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SearchResult:
+    ids: list
+    count: int
+    facets: dict = field(default_factory=dict)
+
+
+def tokenize(query):
+    return _TOKEN_RE.findall((query or "").lower())
+
+
+def _document(posting):
+    tags = " ".join(lt.tag.name for lt in posting.tags.all())
+    category = posting.category.name if posting.category else ""
+    return posting.title, posting.description, posting.location, tags, category
+
+
+# ─── Index maintenance ───────────────────────────────────────────────────────
+
+def index_postings(ids):
+    """(Re)index the given postings; ids that no longer exist are dropped."""
+    ids = list(ids)
+    if not ids or connection.vendor not in ("sqlite", "postgresql"):
+        return
+    postings = (
+        CommunityPosting.objects
+            .filter(id__in=ids)
+            .select_related("category")
+            .prefetch_related(Prefetch("tags", queryset=ListingTag.objects.select_related("tag")))
+    )
+    rows = [(p.id, *_document(p)) for p in postings]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        remove_postings(ids, cursor=cursor)
+        if not rows:
+            return
+        if connection.vendor == "sqlite":
+            cursor.executemany(
+                f"INSERT INTO {INDEX_TABLE} (rowid, title, description, location, tags, category) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {INDEX_TABLE} (posting_id, document) VALUES (%s, "
+                "setweight(to_tsvector('english', %s), 'A') || "
+                "setweight(to_tsvector('english', %s), 'C') || "
+                "setweight(to_tsvector('english', %s), 'B') || "
+                "setweight(to_tsvector('english', %s), 'B') || "
+                "setweight(to_tsvector('english', %s), 'B'))",
+                rows,
+            )
+
+
+def remove_postings(ids, cursor=None):
+    ids = list(ids)
+    if not ids or connection.vendor not in ("sqlite", "postgresql"):
+        return
+    key = "rowid" if connection.vendor == "sqlite" else "posting_id"
+    placeholders = ", ".join(["%s"] * len(ids))
+    sql = f"DELETE FROM {INDEX_TABLE} WHERE {key} IN ({placeholders})"
+    if cursor is not None:
+        cursor.execute(sql, ids)
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(sql, ids)
+
+
+def rebuild_index(batch_size=1000):
+    """Drop every index row and re-add all postings, in id order."""
+    if connection.vendor not in ("sqlite", "postgresql"):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+    total = 0
+    last_id = 0
+    while True:
+        ids = list(
+            CommunityPosting.objects
+                .filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        index_postings(ids)
+        total += len(ids)
+        last_id = ids[-1]
+
+
+# ─── Querying ────────────────────────────────────────────────────────────────
+
+def _match(tokens):
+    """
+    Returns (key_sql, match_sql, rank_sql, params) for an index table
+    aliased as `s`: the posting id column, the WHERE condition, and an
+    ascending ORDER BY expression (best match first). `params` fill the
+    %s in match_sql; on Postgres rank_sql needs them a second time.
+    Every term is prefix-matched so partial words ("bik") still hit.
+    """
+    if connection.vendor == "sqlite":
+        expression = " ".join(f'"{t}"*' for t in tokens)
+        weights = ", ".join(str(w) for w in SQLITE_WEIGHTS)
+        return (
+            "s.rowid",
+            f"{INDEX_TABLE} MATCH %s",
+            f"bm25({INDEX_TABLE}, {weights})",
+            [expression],
+        )
+    expression = " & ".join(f"{t}:*" for t in tokens)
+    return (
+        "s.posting_id",
+        "s.document @@ to_tsquery('english', %s)",
+        "-ts_rank_cd(s.document, to_tsquery('english', %s))",
+        [expression],
+    )
+
+
+def _filters(category=None, tag=None):
+    clauses, params = [], []
+    if category:
+        clauses.append("p.category_id = %s")
+        params.append(category)
+    if tag:
+        clauses.append(
+            "EXISTS (SELECT 1 FROM api_listingtag lt JOIN api_tag t ON t.id = lt.tag_id "
+            "WHERE lt.listing_id = p.id AND t.name = %s)"
+        )
+        params.append(tag)
+    return clauses, params
+
+
+def search_postings(query, category=None, tag=None, limit=20, offset=0):
+    """
+    Ranked search. Returns the ids for the requested window (best first),
+    the total number of matches, and tag/category facet counts over the
+    whole (filtered) match set.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return SearchResult(ids=[], count=0, facets={"tags": [], "categories": []})
+
+    if connection.vendor not in ("sqlite", "postgresql"):
+        return _fallback_search(tokens, category, tag, limit, offset)
+
+    key_sql, match_sql, rank_sql, match_params = _match(tokens)
+    filter_clauses, filter_params = _filters(category, tag)
+    where = " AND ".join([match_sql, *filter_clauses])
+    base = (
+        f"FROM {INDEX_TABLE} s JOIN api_communityposting p ON p.id = {key_sql} "
+        f"WHERE {where}"
+    )
+    base_params = match_params + filter_params
+    rank_params = match_params if connection.vendor == "postgresql" else []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT p.id {base} ORDER BY {rank_sql}, p.id DESC LIMIT %s OFFSET %s",
+            base_params + rank_params + [limit, offset],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"SELECT COUNT(*) {base}", base_params)
+        count = cursor.fetchone()[0]
+
+    matched = CommunityPosting.objects.filter(id__in=RawSQL(f"SELECT p.id {base}", base_params))
+    return SearchResult(ids=ids, count=count, facets=_facets(matched))
+
+
+def _facets(matched):
+    tags = (
+        ListingTag.objects
+            .filter(listing__in=matched)
+            .values("tag__name")
+            .annotate(count=Count("id"))
+            .order_by("-count", "tag__name")[:FACET_LIMIT]
+    )
+    categories = (
+        matched
+            .exclude(category=None)
+            .values("category_id", "category__name")
+            .annotate(count=Count("id"))
+            .order_by("-count", "category__name")[:FACET_LIMIT]
+    )
+    return {
+        "tags": [{"name": row["tag__name"], "count": row["count"]} for row in tags],
+        "categories": [
+            {"id": row["category_id"], "name": row["category__name"], "count": row["count"]}
+            for row in categories
+        ],
+    }
+
+
+def _fallback_search(tokens, category, tag, limit, offset):
+    qs = CommunityPosting.objects.all()
+    for token in tokens:
+        qs = qs.filter(
+            Q(title__icontains=token)
+            | Q(description__icontains=token)
+            | Q(location__icontains=token)
+            | Q(tags__tag__name__icontains=token)
+        )
+    if category:
+        qs = qs.filter(category_id=category)
+    if tag:
+        qs = qs.filter(tags__tag__name=tag)
+    qs = qs.distinct()
+    ids = list(qs.order_by("-created_at", "-id").values_list("id", flat=True)[offset:offset + limit])
+    matched = CommunityPosting.objects.filter(id__in=qs.values("id"))
+    return SearchResult(ids=ids, count=qs.count(), facets=_facets(matched))
+
+
+# ─── Signal handlers keeping the index in sync ───────────────────────────────
+
+def _reindex_on_commit(ids):
+    ids = list(ids)
+    transaction.on_commit(lambda: index_postings(ids))
+
+
+@receiver(post_save, sender=CommunityPosting)
+def index_posting_on_save(sender, instance, **kwargs):
+    _reindex_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=CommunityPosting)
+def remove_posting_on_delete(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: remove_postings([pk]))
+
+
+@receiver(post_save, sender=ListingTag)
+@receiver(post_delete, sender=ListingTag)
+def reindex_posting_on_tag_change(sender, instance, **kwargs):
+    _reindex_on_commit([instance.listing_id])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_postings(sender, instance, created, **kwargs):
+    if created:
+        return
+    _reindex_on_commit(instance.communityposting_set.values_list("id", flat=True))
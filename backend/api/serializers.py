@@ -4,6 +4,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
 from .models import (
+    Conversation,
     CommunityPosting,
     Category,
     PostingImage,
@@ -29,9 +30,34 @@ class CategorySerializer(serializers.ModelSerializer):
 
 # 🖼️ Posting Image Serializer
 class PostingImageSerializer(serializers.ModelSerializer):
+    """
+    `srcset` (JPEG) and `srcset_webp` list the processed renditions for
+    <img srcset> / <picture>; both are empty until api.images has run.
+    """
+    srcset       = serializers.SerializerMethodField()
+    srcset_webp  = serializers.SerializerMethodField()
+
     class Meta:
         model = PostingImage
-        fields = ["id", "image"]
+        fields = ["id", "image", "renditions", "srcset", "srcset_webp"]
+        read_only_fields = ["renditions"]
+
+    def _srcset(self, obj, fmt):
+        storage = obj.image.storage
+        request = self.context.get("request")
+        entries = []
+        for rendition in sorted(obj.renditions.values(), key=lambda r: r["width"]):
+            url = storage.url(rendition[fmt])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            entries.append(f"{url} {rendition['width']}w")
+        return ", ".join(entries)
+
+    def get_srcset(self, obj):
+        return self._srcset(obj, "jpeg")
+
+    def get_srcset_webp(self, obj):
+        return self._srcset(obj, "webp")
 
 
 # 🔖 Tag Serializer
@@ -151,6 +177,46 @@ class MessageSerializer(serializers.ModelSerializer):
         ]
 
 
+# 🧵 Conversation Serializer (one inbox row)
+class ConversationSerializer(serializers.ModelSerializer):
+    listing_title = serializers.CharField(source="listing.title", read_only=True)
+    buyer         = serializers.ReadOnlyField(source="buyer.email")
+    buyer_id      = serializers.ReadOnlyField()
+    seller        = serializers.ReadOnlyField(source="seller.email")
+    seller_id     = serializers.ReadOnlyField()
+    last_message  = serializers.SerializerMethodField()
+    unread        = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversation
+        fields = [
+            "id",
+            "listing",
+            "listing_title",
+            "buyer",
+            "buyer_id",
+            "seller",
+            "seller_id",
+            "last_message",
+            "last_message_at",
+            "unread",
+        ]
+
+    def get_last_message(self, obj):
+        message = obj.last_message
+        if message is None:
+            return None
+        return {
+            "id": message.id,
+            "sender_id": message.sender_id,
+            "content": message.content,
+            "created_at": message.created_at,
+        }
+
+    def get_unread(self, obj):
+        return obj.unread_for(self.context["request"].user)
+
+
 # ✉️ Simplified Message Create Serializer
 class MessageCreateSerializer(serializers.ModelSerializer):
     sender     = serializers.ReadOnlyField(source="sender.email")
@@ -204,8 +270,6 @@ class OrderSerializer(serializers.ModelSerializer):
     total_price          = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     address_details      = serializers.JSONField(required=False)
 
-    stripe_payment_intent_id = serializers.CharField(required=False, allow_blank=True, allow_null=True)
-
     class Meta:
         model = Order
         fields = [
@@ -226,7 +290,8 @@ class OrderSerializer(serializers.ModelSerializer):
             "paid_at",
             "address_details",
         ]
-        read_only_fields = ["status", "created_at", "paid_at"]
+        # The Stripe ids are set by api.payments, never by the client.
+        read_only_fields = ["status", "created_at", "paid_at", "stripe_payment_intent_id"]
 
     def validate(self, data):
         listing_price   = data["listing"].price or 0
@@ -264,6 +329,51 @@ class CategoryValueSerializer(serializers.Serializer):
     value    = serializers.IntegerField()
 
 
+class RevenueSummarySerializer(serializers.Serializer):
+    revenue           = serializers.DecimalField(max_digits=14, decimal_places=2)
+    orders            = serializers.IntegerField()
+    averageOrderValue = serializers.DecimalField(max_digits=12, decimal_places=2)
+    attachRate        = serializers.FloatField()
+
+
+class RevenuePeriodSerializer(serializers.Serializer):
+    period  = serializers.SerializerMethodField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    orders  = serializers.IntegerField()
+
+    def get_period(self, obj):
+        fmt = "%Y-%m" if self.context.get("bucket") == "month" else "%Y-%m-%d"
+        return obj["period"].strftime(fmt)
+
+
+class TopListingSerializer(serializers.Serializer):
+    listing = serializers.IntegerField()
+    title   = serializers.CharField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    orders  = serializers.IntegerField()
+
+
+class OfferingAttachSerializer(serializers.Serializer):
+    offering   = serializers.IntegerField()
+    name       = serializers.CharField()
+    orders     = serializers.IntegerField()
+    attachRate = serializers.FloatField()
+
+
+class PlatformDaySerializer(serializers.Serializer):
+    day         = serializers.DateField()
+    gmv         = serializers.DecimalField(max_digits=14, decimal_places=2)
+    newUsers    = serializers.IntegerField()
+    newListings = serializers.IntegerField()
+    activeUsers = serializers.IntegerField()
+
+
+class StatusTotalSerializer(serializers.Serializer):
+    status = serializers.CharField()
+    orders = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
 # ─── Notifications Serializer ────────────────────────────────────────────────
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -0,0 +1,123 @@
+# api/storage.py
+
+"""
+Content-addressed media storage.
+
+Uploaded files are named after the sha256 of their bytes:
+
+    posting_images/3f/3fa1…e9.jpg
+
+so identical uploads share one file, and a URL's content can never change.
+That lets api.media.serve_media mark responses `immutable` with the hash
+as a strong ETag. Because files are shared, they are only removed once no
+row references them: right after a PostingImage is deleted (see the
+signal handler below), and by the `gc_media` management command, which
+sweeps up anything else left unreferenced.
+"""
+
+import hashlib
+import os
+import re
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+HASHED_NAME_RE = re.compile(r"(?:^|/)[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(?:\.\w+)?$")
+
+
+def file_digest(content):
+    digest = getattr(content, "content_hash", None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return sha256.hexdigest()
+
+
+def digest_from_name(name):
+    match = HASHED_NAME_RE.search(name or "")
+    return match.group("digest") if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, **kwargs):
+        # Two writers racing on the same name are writing the same bytes.
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def hashed_name(self, name, digest):
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], f"{digest}{ext}").replace(os.sep, "/")
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.hashed_name(name, file_digest(content))
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+_media_storage = None
+
+
+def get_media_storage():
+    """Storage for uploaded media (used as a callable so migrations stay stable)."""
+    global _media_storage
+    if _media_storage is None:
+        _media_storage = ContentAddressedStorage()
+    return _media_storage
+
+
+# ─── Reference counting ──────────────────────────────────────────────────────
+
+def referenced_names():
+    """Every media name some row still points at."""
+    from .models import CommunityUser, PostingImage
+
+    names = set()
+    for image, renditions in PostingImage.objects.values_list("image", "renditions").iterator():
+        names.add(image)
+        for rendition in (renditions or {}).values():
+            names.update(v for k, v in rendition.items() if k not in ("width", "height"))
+    names.update(
+        CommunityUser.objects.exclude(profile_picture="").exclude(profile_picture=None)
+            .values_list("profile_picture", flat=True)
+    )
+    return names
+
+
+def release_image_files(image_name, renditions, content_hash):
+    """Delete an image's files if no remaining PostingImage shares them."""
+    from .models import PostingImage
+
+    shared = PostingImage.objects.filter(image=image_name)
+    if content_hash:
+        shared = shared | PostingImage.objects.filter(content_hash=content_hash)
+    if shared.exists():
+        return
+    storage = get_media_storage()
+    names = [image_name] + [
+        v for rendition in (renditions or {}).values()
+        for k, v in rendition.items() if k not in ("width", "height")
+    ]
+    for name in names:
+        if name:
+            storage.delete(name)
+
+
+@receiver(post_delete, sender="api.PostingImage")
+def release_files_on_delete(sender, instance, **kwargs):
+    image_name, renditions, digest = instance.image.name, instance.renditions, instance.content_hash
+    transaction.on_commit(lambda: release_image_files(image_name, renditions, digest))
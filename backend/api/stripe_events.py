@@ -0,0 +1,169 @@
+# api/stripe_events.py
+
+"""
+Stripe webhook ingestion.
+
+StripeWebhookView only verifies the signature and appends the event to
+StripeEvent. A redelivery of an event id it already has is a no-op, so a
+webhook costs the request thread one INSERT however busy a sale gets. The
+`process_stripe_events` command then applies pending events in batches
+(`process_pending`):
+
+* every order transition in a batch is one UPDATE, limited to orders that
+  are still PENDING, so replays and out-of-order events are harmless;
+* buyers of newly paid orders get their notifications in one bulk insert
+  and are pushed over ws/notifications/ (api.notifications).
+
+If a batch fails, its events are retried one at a time. An event that still
+fails is marked processed with its error, so it cannot block the queue.
+"""
+
+import json
+import logging
+from collections import Counter
+
+import stripe
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .counters import adjust as adjust_counters
+from .models import Notification, Order, StripeEvent
+from .notifications import publish as publish_notifications
+
+logger = logging.getLogger(__name__)
+
+PAID_EVENTS = {
+    "payment_intent.succeeded",
+    "checkout.session.completed",
+    "checkout.session.async_payment_succeeded",
+}
+CANCELED_EVENTS = {
+    "payment_intent.canceled",
+    "checkout.session.expired",
+    "checkout.session.async_payment_failed",
+}
+
+
+class InvalidSignature(Exception):
+    pass
+
+
+def verify(payload, signature):
+    """The event in `payload` (bytes) if `signature` is Stripe's; else InvalidSignature."""
+    secret = getattr(settings, "STRIPE_WEBHOOK_SECRET", None)
+    if not secret:
+        raise InvalidSignature("STRIPE_WEBHOOK_SECRET is not configured")
+    try:
+        stripe.WebhookSignature.verify_header(
+            payload, signature, secret, tolerance=getattr(settings, "STRIPE_WEBHOOK_TOLERANCE", 300)
+        )
+        event = json.loads(payload)
+    except (stripe.SignatureVerificationError, ValueError) as exc:
+        raise InvalidSignature(str(exc)) from exc
+    if not isinstance(event, dict) or not event.get("id") or not event.get("type"):
+        raise InvalidSignature("Not a Stripe event")
+    return event
+
+
+def record(event):
+    """Append `event` unless it is already there; True if it was new."""
+    _, created = StripeEvent.objects.get_or_create(
+        event_id=event["id"], defaults={"type": event["type"], "payload": event}
+    )
+    return created
+
+
+def process_pending(batch_size=None):
+    """Apply one batch of pending events; returns how many were handled."""
+    batch_size = batch_size or getattr(settings, "STRIPE_EVENTS_BATCH_SIZE", 500)
+    with transaction.atomic():
+        pending = StripeEvent.objects.filter(processed_at=None).order_by("id")
+        if connection.features.has_select_for_update_skip_locked:
+            # Concurrent processors each claim different events.
+            pending = pending.select_for_update(skip_locked=True)
+        events = list(pending[:batch_size])
+        if not events:
+            return 0
+
+        errors = {}
+        try:
+            with transaction.atomic():
+                apply_events(events)
+        except Exception:
+            logger.exception("Batch of %s Stripe events failed; retrying one by one", len(events))
+            for event in events:
+                try:
+                    with transaction.atomic():
+                        apply_events([event])
+                except Exception as exc:
+                    logger.exception("Stripe event %s failed", event.event_id)
+                    errors[event.pk] = f"{type(exc).__name__}: {exc}"
+
+        now = timezone.now()
+        StripeEvent.objects.filter(
+            pk__in=[event.pk for event in events if event.pk not in errors]
+        ).update(processed_at=now)
+        for pk, error in errors.items():
+            StripeEvent.objects.filter(pk=pk).update(processed_at=now, error=error)
+    return len(events)
+
+
+def apply_events(events):
+    paid, canceled = [], []
+    for event in events:
+        obj = (event.payload.get("data") or {}).get("object") or {}
+        if event.type in PAID_EVENTS and obj.get("payment_status", "paid") == "paid":
+            paid.append(obj)
+        elif event.type in CANCELED_EVENTS:
+            canceled.append(obj)
+
+    # Paid first: an order both paid and canceled in one batch ends up paid.
+    paid_orders = _transition(paid, Order.STATUS_PAID, paid_at=timezone.now())
+    _transition(canceled, Order.STATUS_CANCELED)
+    _notify_paid(paid_orders)
+
+
+def _transition(objects, new_status, **fields):
+    """Move the PENDING orders behind `objects` to `new_status`; returns [(id, buyer_id)]."""
+    if not objects:
+        return []
+    intents, sessions, order_ids = set(), set(), set()
+    for obj in objects:
+        (intents if obj.get("object") == "payment_intent" else sessions).add(obj.get("id"))
+        order_id = (obj.get("metadata") or {}).get("order_id")
+        if str(order_id).isdigit():
+            order_ids.add(int(order_id))
+    pending = Order.objects.filter(
+        Q(stripe_payment_intent_id__in=intents)
+        | Q(stripe_checkout_session_id__in=sessions)
+        | Q(pk__in=order_ids),
+        status=Order.STATUS_PENDING,
+    )
+    rows = list(pending.values_list("id", "buyer_id"))
+    if rows:
+        Order.objects.filter(pk__in=[pk for pk, _ in rows], status=Order.STATUS_PENDING).update(
+            status=new_status, **fields
+        )
+    return rows
+
+
+def _notify_paid(rows):
+    if not rows:
+        return
+    order_type = ContentType.objects.get_for_model(Order)
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            recipient_id=buyer_id,
+            verb="payment received for your order",
+            target_content_type=order_type,
+            target_object_id=order_id,
+        )
+        for order_id, buyer_id in rows
+    ])
+    # bulk_create skips post_save: count and push them ourselves
+    for buyer_id, count in Counter(buyer_id for _, buyer_id in rows).items():
+        adjust_counters(buyer_id, unread_notifications=count)
+    publish_notifications(notifications)
@@ -0,0 +1,178 @@
+# api/stripe_stub.py
+
+"""
+A local stand-in for the slice of the Stripe API that checkout uses
+(PaymentIntents and Checkout Sessions), for tests and offline load tests.
+
+    python manage.py stripe_stub --port 12111
+    STRIPE_API_BASE=http://127.0.0.1:12111 python manage.py runserver
+
+Like Stripe, it stores the response to every POST that carries an
+Idempotency-Key and replays it for a repeat of that key, so retry handling
+can be exercised end to end. Confirming a PaymentIntent
+(POST /v1/payment_intents/<id>/confirm) succeeds it and, given a webhook
+URL and secret, delivers a signed `payment_intent.succeeded` event there.
+Objects live in memory only.
+"""
+
+import hmac
+import itertools
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+_BRACKETS = re.compile(r"([^\[\]]+)")
+
+
+def _unflatten(pairs):
+    """Stripe's form encoding (a[b][0][c]=1) back into dicts."""
+    result = {}
+    for key, value in pairs:
+        parts = _BRACKETS.findall(key)
+        target = result
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return result
+
+
+def sign(payload, secret, timestamp=None):
+    """A Stripe-Signature header for `payload` (str), as Stripe computes it."""
+    timestamp = int(timestamp or time.time())
+    mac = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), sha256).hexdigest()
+    return f"t={timestamp},v1={mac}"
+
+
+class StripeStub:
+    def __init__(self, webhook_url=None, webhook_secret=None):
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.objects = {}
+        self.responses = {}       # Idempotency-Key → (status, body)
+        self.created = 0          # objects actually created (replays excluded)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._events = []
+
+    def handle(self, method, path, params, idempotency_key=None):
+        """(status, body) for one API call."""
+        with self._lock:
+            if method == "POST" and idempotency_key in self.responses:
+                return self.responses[idempotency_key]
+            response = self._dispatch(method, path.rstrip("/"), params)
+            if method == "POST" and idempotency_key:
+                self.responses[idempotency_key] = response
+            events, self._events = self._events, []
+        for event in events:
+            self.deliver(event)
+        return response
+
+    def deliver(self, event):
+        """POST a signed webhook `event` to webhook_url (if set)."""
+        if not (self.webhook_url and self.webhook_secret):
+            return
+        payload = json.dumps(event)
+        request = urllib.request.Request(self.webhook_url, data=payload.encode(), headers={
+            "Content-Type": "application/json",
+            "Stripe-Signature": sign(payload, self.webhook_secret),
+        })
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+        except OSError:
+            logger.exception("Webhook delivery of %s failed", event["id"])
+
+    def _dispatch(self, method, path, params):
+        if method == "POST" and path == "/v1/payment_intents":
+            return 200, self._create("pi", {
+                "object": "payment_intent",
+                "amount": int(params.get("amount", 0)),
+                "currency": params.get("currency", "usd"),
+                "status": "requires_payment_method",
+                "metadata": params.get("metadata", {}),
+            })
+        if method == "POST" and path == "/v1/checkout/sessions":
+            items = params.get("line_items", {}).values()
+            return 200, self._create("cs", {
+                "object": "checkout.session",
+                "amount_total": sum(
+                    int(item["price_data"]["unit_amount"]) * int(item.get("quantity", 1)) for item in items
+                ),
+                "status": "open",
+                "success_url": params.get("success_url"),
+                "metadata": params.get("metadata", {}),
+            })
+        match = re.fullmatch(r"/v1/payment_intents/(\w+)/confirm", path)
+        if method == "POST" and match and match.group(1) in self.objects:
+            intent = self.objects[match.group(1)]
+            intent["status"] = "succeeded"
+            self._events.append({
+                "id": f"evt_stub{next(self._ids)}",
+                "object": "event",
+                "type": "payment_intent.succeeded",
+                "created": int(time.time()),
+                "data": {"object": dict(intent)},
+            })
+            return 200, intent
+        match = re.fullmatch(r"/v1/(?:payment_intents|checkout/sessions)/(\w+)", path)
+        if method == "GET" and match and match.group(1) in self.objects:
+            return 200, self.objects[match.group(1)]
+        return 404, {"error": {"type": "invalid_request_error", "message": f"No such resource: {path}"}}
+
+    def _create(self, prefix, fields):
+        object_id = f"{prefix}_stub{next(self._ids)}"
+        obj = {"id": object_id, "livemode": False, **fields}
+        if prefix == "pi":
+            obj["client_secret"] = f"{object_id}_secret_stub"
+        else:
+            obj["url"] = f"https://checkout.stripe.test/{object_id}"
+        self.objects[object_id] = obj
+        self.created += 1
+        return obj
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"     # keep-alive, like the real API
+
+    def do_GET(self):
+        self._respond(dict(parse_qsl(self.path.partition("?")[2])))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self._respond(_unflatten(parse_qsl(self.rfile.read(length).decode())))
+
+    def _respond(self, params):
+        status, body = self.server.stub.handle(
+            self.command, self.path.partition("?")[0], params, self.headers.get("Idempotency-Key")
+        )
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=0, stub=None):
+    """A ThreadingHTTPServer serving `stub` (server.stub); port 0 picks a free one."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.stub = stub or StripeStub()
+    return server
+
+
+def start_in_thread(host="127.0.0.1", port=0):
+    """Start a stub in a daemon thread; returns (server, base_url)."""
+    server = make_server(host, port)
+    threading.Thread(target=server.serve_forever, name="stripe-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -1,3 +1,1468 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
+from base64 import b64encode
+from urllib.parse import urlparse
 
-# Create your tests here.
+from unittest import skipUnless
+
+import jwt
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from channels.layers import InMemoryChannelLayer
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from . import authentication, consumers, revenue
+from .authentication import LocalTokenVerifier, TTLCache
+from .channel_layers import FastInMemoryChannelLayer, group_send_many
+from .conversations import delete_messages
+from .counters import get_counters, repair
+from .emails import queue_digests
+from .filters import PostingFilterBackend
+from .firebase_keys import KeyFetchError, SigningKeyManager
+from .images import RENDITION_WIDTHS
+from .media import serve_media
+from .outbox import send_due
+from .pagination import EstimatedCountPaginator
+from .platform_stats import refresh as refresh_platform_stats
+from .rollups import rebuild as rebuild_rollups
+from .storage import digest_from_name, get_media_storage
+from .stripe_events import process_pending
+from .stripe_stub import StripeStub, sign, start_in_thread
+from .write_behind import MessageWriter, write_messages
+
+from .models import (
+    CommunityUser,
+    Category,
+    PaymentMethod,
+    Offering,
+    CommunityPosting,
+    PostingImage,
+    Favorite,
+    Tag,
+    ListingTag,
+    Message,
+    Notification,
+    Order,
+    Conversation,
+    UserCounters,
+    OutboundEmail,
+    StripeEvent,
+    UserDailyActivity,
+    PlatformDailyStats,
+)
+
+
+def make_user(email):
+    return CommunityUser.objects.create(email=email)
+
+
+def make_posting(user, category, title="Bike", **kwargs):
+    kwargs.setdefault("description", f"{title} for sale")
+    kwargs.setdefault("price", 10)
+    kwargs.setdefault("location", "San Jose")
+    return CommunityPosting.objects.create(user=user, category=category, title=title, **kwargs)
+
+
+class PostingFeedQueryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_user("seller@example.com")
+        self.buyer = make_user("buyer@example.com")
+        self.category = Category.objects.create(name="Bikes")
+        self.cash = PaymentMethod.objects.create(name="Cash")
+        self.delivery = Offering.objects.create(name="Delivery", extra_cost=5)
+        self.tag = Tag.objects.create(name="vintage")
+
+    def add_postings(self, count):
+        for i in range(count):
+            posting = make_posting(self.seller, self.category, title=f"Bike {i}")
+            posting.payment_methods.add(self.cash)
+            posting.offerings.add(self.delivery)
+            PostingImage.objects.create(posting=posting, image=f"posting_images/{i}.jpg")
+            ListingTag.objects.create(listing=posting, tag=self.tag)
+            Favorite.objects.create(user=self.buyer, listing=posting)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/postings/")
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        self.add_postings(2)
+        small = self.count_list_queries()
+        self.add_postings(20)
+        self.assertEqual(self.count_list_queries(), small)
+
+    def test_my_ads_and_detail_use_feed_queryset(self):
+        self.add_postings(3)
+        self.client.force_authenticate(self.seller)
+        with self.assertNumQueries(6):
+            response = self.client.get("/api/postings/my-ads/")
+        self.assertEqual(len(response.data["results"]), 3)
+
+        posting = CommunityPosting.objects.first()
+        with self.assertNumQueries(6):
+            response = self.client.get(f"/api/postings/{posting.id}/")
+        self.assertEqual(response.data["tags"][0]["tag"]["name"], "vintage")
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_user("seller@example.com")
+        self.category = Category.objects.create(name="Bikes")
+        postings = [make_posting(self.seller, self.category, title=f"Bike {i}") for i in range(7)]
+        # Several rows sharing one timestamp must still page without gaps or repeats.
+        CommunityPosting.objects.filter(id__in=[p.id for p in postings[:4]]).update(
+            created_at=postings[0].created_at
+        )
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def test_pages_cover_every_row_once_in_order(self):
+        ids = self.walk("/api/postings/?page_size=2")
+        expected = list(
+            CommunityPosting.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_to_prior_page(self):
+        first = self.client.get("/api/postings/?page_size=3").data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertEqual(
+            [row["id"] for row in back["results"]],
+            [row["id"] for row in first["results"]],
+        )
+        self.assertIsNone(back["previous"])
+
+    def test_invalid_cursor_is_404(self):
+        cursor = b64encode(b"p=not-a-date|1").decode()
+        response = self.client.get(f"/api/postings/?cursor={cursor}")
+        self.assertEqual(response.status_code, 404)
+
+    def test_inbox_is_paginated(self):
+        buyer = make_user("buyer@example.com")
+        listing = CommunityPosting.objects.first()
+        for i in range(3):
+            Message.objects.create(listing=listing, sender=buyer, recipient=self.seller, content=str(i))
+        self.client.force_authenticate(self.seller)
+        response = self.client.get("/api/messages/inbox/?page_size=2")
+        self.assertEqual([m["content"] for m in response.data["results"]], ["2", "1"])
+        self.assertEqual(urlparse(response.data["next"]).path, "/api/messages/inbox/")
+
+    def test_notifications_are_paginated(self):
+        buyer = make_user("buyer@example.com")
+        listing = CommunityPosting.objects.first()
+        for i in range(3):
+            Message.objects.create(listing=listing, sender=buyer, recipient=self.seller, content=str(i))
+        self.client.force_authenticate(self.seller)
+        ids = self.walk("/api/notifications/?page_size=1")
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+
+class PostingSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        seller = make_user("seller@example.com")
+        bikes = Category.objects.create(name="Bikes")
+        furniture = Category.objects.create(name="Furniture")
+        vintage = Tag.objects.create(name="vintage")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.road = make_posting(seller, bikes, title="Red road bike")
+            self.bmx = make_posting(seller, bikes, title="BMX", description="Kids bike, barely used")
+            self.chair = make_posting(seller, furniture, title="Oak chair", description="Vintage chair")
+            ListingTag.objects.create(listing=self.road, tag=vintage)
+            ListingTag.objects.create(listing=self.chair, tag=vintage)
+
+    def test_title_matches_rank_first_and_prefixes_match(self):
+        data = self.client.get("/api/postings/search/", {"q": "bik"}).data
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["results"][0]["id"], self.road.id)
+
+    def test_facets_and_filters(self):
+        data = self.client.get("/api/postings/search/", {"q": "vintage"}).data
+        self.assertEqual({r["id"] for r in data["results"]}, {self.road.id, self.chair.id})
+        self.assertEqual(data["facets"]["tags"], [{"name": "vintage", "count": 2}])
+        self.assertEqual(
+            sorted(c["name"] for c in data["facets"]["categories"]), ["Bikes", "Furniture"]
+        )
+
+        data = self.client.get(
+            "/api/postings/search/", {"q": "vintage", "category": self.chair.category_id}
+        ).data
+        self.assertEqual([r["id"] for r in data["results"]], [self.chair.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bmx.title = "Trampoline"
+            self.bmx.description = "Garden toy"
+            self.bmx.save()
+            self.road.delete()
+        self.assertEqual(self.client.get("/api/postings/search/", {"q": "road"}).data["count"], 0)
+        self.assertEqual(self.client.get("/api/postings/search/", {"q": "tramp"}).data["count"], 1)
+
+
+class PostingFilterIndexTests(TestCase):
+    """
+    Every filter combination must be answered from an index – never a
+    full scan of api_communityposting.
+    """
+    combos = [
+        {"category": "1"},
+        {"category": "1,2"},
+        {"location": "San Jose"},
+        {"price_min": "5", "price_max": "50"},
+        {"created_after": "2025-01-01"},
+        {"payment_methods": "1"},
+        {"offerings": "1,2"},
+        {"tags": "vintage"},
+        {"category": "1", "price_min": "5"},
+        {"category": "1", "payment_methods": "1", "tags": "vintage"},
+        {"location": "San Jose", "created_after": "2025-01-01"},
+    ]
+
+    def setUp(self):
+        seller = make_user("seller@example.com")
+        self.category = Category.objects.create(name="Bikes")
+        for i in range(3):
+            make_posting(seller, self.category, title=f"Bike {i}")
+
+    def filtered(self, params):
+        request = APIView().initialize_request(APIRequestFactory().get("/api/postings/", params))
+        queryset = CommunityPosting.objects.order_by("-created_at", "-id")
+        return PostingFilterBackend().filter_queryset(request, queryset, view=None)
+
+    def test_filters_apply(self):
+        self.assertEqual(self.filtered({"category": str(self.category.id), "price_min": "5"}).count(), 3)
+        self.assertEqual(self.filtered({"price_max": "5"}).count(), 0)
+        self.assertEqual(self.filtered({"tags": "vintage"}).count(), 0)
+
+    def test_invalid_values_are_rejected(self):
+        response = APIClient().get("/api/postings/", {"price_min": "cheap"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("price_min", response.data)
+        for value in ("NaN", "Infinity", "-inf"):
+            response = APIClient().get("/api/postings/", {"price_max": value})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("price_max", response.data)
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite-specific")
+    def test_every_filter_combo_uses_an_index(self):
+        for params in self.combos:
+            with self.subTest(params=params):
+                plan = self.filtered(params).explain()
+                for line in plan.splitlines():
+                    if "api_communityposting " in line or line.rstrip().endswith("api_communityposting"):
+                        self.assertRegex(line, r"USING (COVERING )?INDEX|USING INTEGER PRIMARY KEY")
+
+
+verifier_calls = []
+
+
+def counting_verifier(id_token):
+    verifier_calls.append(id_token)
+    return LocalTokenVerifier.verify_id_token(id_token)
+
+
+@override_settings(FIREBASE_TOKEN_VERIFIER="api.tests.counting_verifier")
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        authentication.clear_caches()
+        verifier_calls.clear()
+        self.client = APIClient()
+
+    def get_profile(self, token):
+        return self.client.get("/api/user/profile/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_token_and_user_are_resolved_once_per_token(self):
+        token = LocalTokenVerifier.issue("alice@example.com")
+        self.assertEqual(self.get_profile(token).data["email"], "alice@example.com")
+        with self.assertNumQueries(1):   # is the cached user still active?
+            response = self.get_profile(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(verifier_calls), 1)
+
+    def test_users_deactivated_elsewhere_are_rejected_despite_the_cache(self):
+        token = LocalTokenVerifier.issue("alice@example.com")
+        self.assertEqual(self.get_profile(token).status_code, 200)
+        # update() sends no signal, as when another process deactivates the user.
+        CommunityUser.objects.filter(email="alice@example.com").update(is_active=False)
+        self.assertEqual(len(authentication.user_cache), 1)
+        self.assertEqual(self.get_profile(token).status_code, 403)
+        self.assertEqual(len(authentication.user_cache), 0)
+
+    def test_profile_changes_invalidate_cached_user(self):
+        token = LocalTokenVerifier.issue("alice@example.com")
+        self.get_profile(token)
+        self.assertEqual(len(authentication.user_cache), 1)
+        user = CommunityUser.objects.get(email="alice@example.com")
+        user.first_name = "Alice"
+        user.save()
+        self.assertEqual(len(authentication.user_cache), 0)
+        self.assertEqual(self.get_profile(token).data["first_name"], "Alice")
+
+    def test_invalid_and_expired_tokens_are_rejected(self):
+        self.assertEqual(self.get_profile("garbage").status_code, 403)
+        expired = LocalTokenVerifier.issue("alice@example.com", lifetime=-10)
+        self.assertEqual(self.get_profile(expired).status_code, 403)
+        self.assertEqual(len(authentication.token_cache), 0)
+
+    def test_cache_is_bounded_lru_and_honours_expiry(self):
+        cache = TTLCache(max_size=2)
+        far = time.time() + 60
+        cache.set("a", 1, far)
+        cache.set("b", 2, far)
+        cache.get("a")
+        cache.set("c", 3, far)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("d", 4, time.time() - 1)
+        self.assertIsNone(cache.get("d"))
+
+
+def make_signing_fixture():
+    """A throwaway RSA key and self-signed cert, standing in for Google's."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.test")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256())
+    )
+    return key, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class SigningKeyManagerTests(TestCase):
+    project_id = "toro-test"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.private_key, cls.cert_pem = make_signing_fixture()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, "certs.json")
+        self.fetches = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fetch(self, url):
+        self.fetches.append(url)
+        return {"kid-1": self.cert_pem}, time.time() + 3600
+
+    def offline(self, url):
+        raise KeyFetchError("network disabled in tests")
+
+    def token(self, **overrides):
+        now = int(time.time())
+        claims = {
+            "iss": f"https://securetoken.google.com/{self.project_id}",
+            "aud": self.project_id,
+            "sub": "uid-123",
+            "email": "alice@example.com",
+            "iat": now,
+            "exp": now + 3600,
+            **overrides,
+        }
+        return jwt.encode(claims, self.private_key, algorithm="RS256", headers={"kid": "kid-1"})
+
+    def test_fetches_once_and_persists_keys(self):
+        manager = SigningKeyManager(self.cache_path, fetch=self.fetch)
+        claims = manager.verify(self.token(), self.project_id)
+        self.assertEqual(claims["uid"], "uid-123")
+        manager.verify(self.token(), self.project_id)
+        self.assertEqual(len(self.fetches), 1)
+        with open(self.cache_path) as f:
+            self.assertIn("kid-1", json.load(f)["certs"])
+
+    def test_cold_worker_verifies_from_disk_without_network(self):
+        SigningKeyManager(self.cache_path, fetch=self.fetch).refresh()
+        cold = SigningKeyManager(self.cache_path, fetch=self.offline)
+        self.assertEqual(cold.verify(self.token(), self.project_id)["email"], "alice@example.com")
+
+    def test_expired_disk_cache_is_refetched(self):
+        with open(self.cache_path, "w") as f:
+            json.dump({"expires_at": time.time() - 1, "certs": {"kid-1": self.cert_pem}}, f)
+        SigningKeyManager(self.cache_path, fetch=self.fetch).verify(self.token(), self.project_id)
+        self.assertEqual(len(self.fetches), 1)
+
+    def test_rejects_wrong_audience_expired_and_foreign_signatures(self):
+        manager = SigningKeyManager(self.cache_path, fetch=self.fetch)
+        bad_tokens = [
+            self.token(aud="someone-else"),
+            self.token(exp=int(time.time()) - 10),
+            self.token(sub=""),
+            jwt.encode({"sub": "x"}, "an-hmac-secret-that-is-not-rsa-key", algorithm="HS256", headers={"kid": "kid-1"}),
+        ]
+        for bad in bad_tokens:
+            with self.assertRaises(jwt.InvalidTokenError):
+                manager.verify(bad, self.project_id)
+
+
+def make_jpeg(width=2000, height=1000, name="photo.jpg", exif=True):
+    from io import BytesIO
+    from PIL import Image
+
+    image = Image.new("RGB", (width, height), (200, 30, 30))
+    out = BytesIO()
+    options = {}
+    if exif:
+        tags = Image.Exif()
+        tags[0x0110] = "Secret Camera"  # Model
+        options["exif"] = tags.tobytes()
+    image.save(out, format="JPEG", **options)
+    return SimpleUploadedFile(name, out.getvalue(), content_type="image/jpeg")
+
+
+class MediaTestCase(TestCase):
+    """Runs against a throwaway MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        self._media = tempfile.TemporaryDirectory()
+        media_settings = override_settings(MEDIA_ROOT=self._media.name, IMAGE_PIPELINE_EAGER=True)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.addCleanup(self._media.cleanup)
+
+    def create_posting(self, user, files, **data):
+        self.client.force_authenticate(user)
+        payload = {
+            "title": "Bike",
+            "description": "Red bike",
+            "location": "San Jose",
+            "price": "10",
+            "category": self.category.id,
+            "payment_methods_ids": [self.cash.id],
+            "offerings_ids": [],
+            "images": files,
+            **data,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/postings/", payload, format="multipart")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response
+
+
+class ImagePipelineTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.seller = make_user("seller@example.com")
+        self.category = Category.objects.create(name="Bikes")
+        self.cash = PaymentMethod.objects.create(name="Cash")
+
+    def test_upload_builds_renditions_and_strips_exif(self):
+        from PIL import Image
+
+        self.create_posting(self.seller, [make_jpeg()])
+        image = PostingImage.objects.get()
+        self.assertEqual(set(image.renditions), set(RENDITION_WIDTHS))
+        for label, width in RENDITION_WIDTHS.items():
+            rendition = image.renditions[label]
+            self.assertEqual((rendition["width"], rendition["height"]), (width, width // 2))
+            for fmt in ("webp", "jpeg"):
+                with image.image.storage.open(rendition[fmt]) as f:
+                    self.assertFalse(Image.open(f).getexif())
+        with image.image.open() as f:
+            self.assertFalse(Image.open(f).getexif())
+
+        data = self.client.get(f"/api/postings/{image.posting_id}/").data["images"][0]
+        self.assertEqual(data["srcset"].count("w,"), 2)
+        self.assertIn(".webp 160w", data["srcset_webp"])
+
+    def test_the_exif_original_is_deleted(self):
+        from .images import process_image
+
+        original = get_media_storage().save("posting_images/photo.jpg", make_jpeg())
+        posting = make_posting(self.seller, self.category)
+        images = [PostingImage.objects.create(posting=posting, image=original) for _ in range(2)]
+        path = os.path.join(self._media.name, original)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            process_image(images[0].pk)
+        self.assertTrue(os.path.exists(path))   # the second row still uses it
+        with self.captureOnCommitCallbacks(execute=True):
+            process_image(images[1].pk)
+        self.assertFalse(os.path.exists(path))
+        images[0].refresh_from_db()
+        self.assertNotEqual(images[0].image.name, original)
+        self.assertTrue(os.path.exists(os.path.join(self._media.name, images[0].image.name)))
+
+    def test_small_images_are_not_upscaled(self):
+        self.create_posting(self.seller, [make_jpeg(width=300, height=300, exif=False)])
+        renditions = PostingImage.objects.get().renditions
+        self.assertEqual(renditions["full"]["width"], 300)
+        self.assertEqual(renditions["thumbnail"]["width"], 160)
+
+
+class BulkImageUploadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.seller = make_user("seller@example.com")
+        self.category = Category.objects.create(name="Bikes")
+        self.cash = PaymentMethod.objects.create(name="Cash")
+
+    def test_duplicates_are_stored_once_with_a_single_insert(self):
+        files = [make_jpeg(name="a.jpg"), make_jpeg(name="b.jpg"), make_jpeg(width=100, name="c.jpg")]
+        with CaptureQueriesContext(connection) as ctx:
+            self.create_posting(self.seller, files)
+        image_inserts = [
+            q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "api_postingimage"')
+        ]
+        self.assertEqual(len(image_inserts), 1)
+        self.assertEqual(PostingImage.objects.count(), 2)
+        self.assertTrue(all(len(i.content_hash) == 64 for i in PostingImage.objects.all()))
+
+    def test_identical_upload_on_another_posting_shares_the_stored_file(self):
+        first = self.create_posting(self.seller, [make_jpeg()]).data["id"]
+        second = self.create_posting(self.seller, [make_jpeg(name="again.jpg")]).data["id"]
+        a = PostingImage.objects.get(posting_id=first)
+        b = PostingImage.objects.get(posting_id=second)
+        self.assertEqual(a.image.name, b.image.name)
+        self.assertEqual(a.renditions, b.renditions)
+
+    def test_update_adds_and_deletes_in_one_go(self):
+        posting_id = self.create_posting(self.seller, [make_jpeg()]).data["id"]
+        old = PostingImage.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/postings/{posting_id}/",
+                {"images": [make_jpeg(width=640, name="new.jpg")], "deleted_images": [old.id]},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [img["id"] for img in response.data["images"]],
+            list(PostingImage.objects.values_list("id", flat=True)),
+        )
+        self.assertNotEqual(PostingImage.objects.get().id, old.id)
+
+
+class ContentAddressedMediaTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.seller = make_user("seller@example.com")
+        self.category = Category.objects.create(name="Bikes")
+        self.cash = PaymentMethod.objects.create(name="Cash")
+
+    def media_path(self, name):
+        return os.path.join(self._media.name, name)
+
+    def test_files_are_named_by_content_and_stored_once(self):
+        storage = get_media_storage()
+        first = storage.save("posting_images/a.jpg", SimpleUploadedFile("a.jpg", b"same bytes"))
+        second = storage.save("posting_images/b.JPG", SimpleUploadedFile("b.JPG", b"same bytes"))
+        self.assertEqual(first, second)
+        digest = digest_from_name(first)
+        self.assertEqual(first, f"posting_images/{digest[:2]}/{digest}.jpg")
+
+    def test_hashed_media_is_served_immutable_with_etag(self):
+        from django.test import RequestFactory
+
+        name = get_media_storage().save("posting_images/a.jpg", SimpleUploadedFile("a.jpg", b"bytes"))
+        factory = RequestFactory()
+        response = serve_media(factory.get("/media/" + name), name, document_root=self._media.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["ETag"], f'"{digest_from_name(name)}"')
+
+        request = factory.get("/media/" + name, HTTP_IF_NONE_MATCH=response["ETag"])
+        response = serve_media(request, name, document_root=self._media.name)
+        self.assertEqual(response.status_code, 304)
+
+    def test_deleting_the_last_reference_releases_files(self):
+        first = self.create_posting(self.seller, [make_jpeg()]).data["id"]
+        second = self.create_posting(self.seller, [make_jpeg()]).data["id"]
+        image = PostingImage.objects.get(posting_id=first)
+        names = [image.image.name] + [r["webp"] for r in image.renditions.values()]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CommunityPosting.objects.get(id=first).delete()
+        self.assertTrue(all(os.path.exists(self.media_path(n)) for n in names))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CommunityPosting.objects.get(id=second).delete()
+        self.assertFalse(any(os.path.exists(self.media_path(n)) for n in names))
+
+    def test_gc_media_removes_only_unreferenced_files(self):
+        from django.core.management import call_command
+
+        self.create_posting(self.seller, [make_jpeg()])
+        orphan = get_media_storage().save("posting_images/x.jpg", SimpleUploadedFile("x.jpg", b"orphan"))
+        call_command("gc_media", "--min-age=0", stdout=open(os.devnull, "w"))
+        self.assertFalse(os.path.exists(self.media_path(orphan)))
+        image = PostingImage.objects.get()
+        self.assertTrue(os.path.exists(self.media_path(image.image.name)))
+        self.assertTrue(os.path.exists(self.media_path(image.renditions["card"]["jpeg"])))
+
+
+class ChannelLayerTests(TestCase):
+    def test_group_send_many_reaches_each_channel_once(self):
+        async def scenario():
+            layer = FastInMemoryChannelLayer()
+            owner, buyer = await layer.new_channel(), await layer.new_channel()
+            await layer.group_add("message_1", owner)
+            await layer.group_add("message_1", buyer)
+            await layer.group_add("user_1", owner)
+            await group_send_many(layer, ["message_1", "user_1"], {"type": "chat_message", "n": 1})
+            received = [await layer.receive(owner), await layer.receive(buyer)]
+            return received, dict(layer.channels)
+
+        received, pending = async_to_sync(scenario)()
+        self.assertEqual(received, [{"type": "chat_message", "n": 1}] * 2)
+        self.assertEqual(pending, {})
+
+    def test_fallback_to_group_send_on_plain_layers(self):
+        async def scenario():
+            layer = InMemoryChannelLayer()
+            channel = await layer.new_channel()
+            await layer.group_add("message_1", channel)
+            await group_send_many(layer, ["message_1", "user_2"], {"type": "chat_message"})
+            return await layer.receive(channel)
+
+        self.assertEqual(async_to_sync(scenario)(), {"type": "chat_message"})
+
+
+class MessageConsumerTests(TestCase):
+    def setUp(self):
+        consumers.listing_owners.clear()
+        self.owner = make_user("owner@example.com")
+        self.buyer = make_user("buyer@example.com")
+        self.posting = make_posting(self.owner, Category.objects.create(name="Bikes"))
+
+    async def connect(self, user, listing_id):
+        communicator = ApplicationCommunicator(consumers.MessageConsumer.as_asgi(), {
+            "type": "websocket",
+            "path": f"/ws/messages/{listing_id}/",
+            "user": user,
+            "url_route": {"kwargs": {"listing_id": str(listing_id)}},
+        })
+        await communicator.send_input({"type": "websocket.connect"})
+        response = await communicator.receive_output()
+        return communicator, response["type"] == "websocket.accept"
+
+    async def send(self, communicator, text):
+        await communicator.send_input({"type": "websocket.receive", "text": json.dumps({"message": text})})
+
+    def test_messages_reuse_the_listing_resolved_at_connect(self):
+        async def scenario():
+            communicator, connected = await self.connect(self.buyer, self.posting.id)
+            self.assertTrue(connected)
+            for text in ("hi", "still available?", "great"):
+                await self.send(communicator, text)
+                echoed = json.loads((await communicator.receive_output())["text"])
+                self.assertEqual(echoed["message"], text)
+            await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+            await communicator.wait()
+
+        with CaptureQueriesContext(connection) as ctx:
+            async_to_sync(scenario)()
+        # Only the lookup at connect touches the posting table.
+        self.assertEqual(len([q for q in ctx.captured_queries if "api_communityposting" in q["sql"]]), 1)
+        self.assertEqual(
+            list(Message.objects.values_list("recipient_id", flat=True)), [self.owner.id] * 3
+        )
+
+    def test_deleting_the_listing_invalidates_the_cache(self):
+        async def scenario():
+            communicator, _ = await self.connect(self.buyer, self.posting.id)
+            await database_sync_to_async(self.posting.delete)()
+            await self.send(communicator, "hello?")
+            return await communicator.receive_output()
+
+        self.assertEqual(async_to_sync(scenario)()["type"], "websocket.close")
+        self.assertFalse(Message.objects.exists())
+
+    def test_unknown_listing_is_rejected(self):
+        async def scenario():
+            return (await self.connect(self.buyer, 999999))[1]
+
+        self.assertFalse(async_to_sync(scenario)())
+
+
+class MessageWriteBehindTests(TestCase):
+    def setUp(self):
+        self.owner = make_user("owner@example.com")
+        self.buyer = make_user("buyer@example.com")
+        self.posting = make_posting(self.owner, Category.objects.create(name="Bikes"))
+
+    def message(self, content):
+        return Message(sender=self.buyer, recipient=self.owner, listing=self.posting, content=content)
+
+    def test_batches_messages_and_notifications(self):
+        writer = MessageWriter(batch_size=2)
+        queued = [self.message(f"m{i}") for i in range(3)]
+        for message in queued:
+            self.assertTrue(writer.submit(message))
+        self.assertFalse(Message.objects.exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            writer.flush()
+        inserts = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith(('INSERT INTO "api_message"', 'INSERT INTO "api_notification"'))
+        ]
+        self.assertEqual(len(inserts), 4)  # 2 batches × (messages + notifications)
+        self.assertEqual(
+            list(Message.objects.values_list("uid", "created_at")),
+            [(m.uid, m.created_at) for m in queued],
+        )
+        self.assertEqual(Notification.objects.filter(recipient=self.owner).count(), 3)
+
+    def test_full_queue_refuses_messages(self):
+        writer = MessageWriter(max_pending=1)
+        self.assertTrue(writer.submit(self.message("first")))
+        self.assertFalse(writer.submit(self.message("second")))
+        writer.flush()
+        self.assertTrue(writer.submit(self.message("second")))
+
+
+class NotificationConsumerTests(TestCase):
+    def setUp(self):
+        self.owner = make_user("owner@example.com")
+        self.buyer = make_user("buyer@example.com")
+        self.posting = make_posting(self.owner, Category.objects.create(name="Bikes"))
+
+    def send_message(self, content="hi"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(
+                sender=self.buyer, recipient=self.owner, listing=self.posting, content=content
+            )
+
+    async def connect(self, query=b""):
+        communicator = ApplicationCommunicator(consumers.NotificationConsumer.as_asgi(), {
+            "type": "websocket", "path": "/ws/notifications/", "user": self.owner, "query_string": query,
+        })
+        await communicator.send_input({"type": "websocket.connect"})
+        self.assertEqual((await communicator.receive_output())["type"], "websocket.accept")
+        return communicator
+
+    async def next_frame(self, communicator):
+        return json.loads((await communicator.receive_output())["text"])
+
+    def test_pushes_new_notifications_with_counters(self):
+        async def scenario():
+            communicator = await self.connect()
+            first = await self.next_frame(communicator)
+            await database_sync_to_async(self.send_message)()
+            pushed = await self.next_frame(communicator)
+            await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+            await communicator.wait()
+            return first, pushed
+
+        first, pushed = async_to_sync(scenario)()
+        self.assertEqual(first["notifications"], [])
+        self.assertEqual(
+            first["counters"], {"unreadMessages": 0, "unreadNotifications": 0, "newOrdersToday": 0}
+        )
+        self.assertEqual(first["last_id"], 0)
+        self.assertEqual([n["verb"] for n in pushed["notifications"]], ["sent you a message"])
+        self.assertEqual(pushed["counters"]["unreadMessages"], 1)
+
+    def test_resumes_after_last_id(self):
+        seen = self.send_message("one")
+        self.send_message("two")
+        self.send_message("three")
+        last_id = Notification.objects.get(target_object_id=seen.id).id
+
+        async def scenario():
+            communicator = await self.connect(f"last_id={last_id}".encode())
+            frame = await self.next_frame(communicator)
+            await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+            await communicator.wait()
+            return frame
+
+        frame = async_to_sync(scenario)()
+        self.assertEqual(len(frame["notifications"]), 2)
+        self.assertTrue(all(n["id"] > last_id for n in frame["notifications"]))
+        self.assertFalse(frame["more"])
+        self.assertEqual(frame["counters"]["unreadMessages"], 3)
+
+
+class UserCountersTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = make_user("owner@example.com")
+        self.buyer = make_user("buyer@example.com")
+        self.posting = make_posting(self.owner, Category.objects.create(name="Bikes"))
+
+    def message(self, content="hi"):
+        return Message.objects.create(
+            sender=self.buyer, recipient=self.owner, listing=self.posting, content=content
+        )
+
+    def counters(self, user):
+        self.client.force_authenticate(user)
+        with self.assertNumQueries(1):
+            return self.client.get("/api/analytics/user/notifications/").data
+
+    def assertMatchesRecount(self, user):
+        counters = self.counters(user)
+        repair(user.pk)
+        self.assertEqual(counters, get_counters(user.pk))
+
+    def test_signals_and_read_endpoints_keep_counters_exact(self):
+        first, second, third = self.message(), self.message(), self.message()
+        Order.objects.create(buyer=self.buyer, listing=self.posting, total_price=10)
+        self.assertEqual(
+            self.counters(self.owner),
+            {"unreadMessages": 3, "unreadNotifications": 4, "newOrdersToday": 1},
+        )
+
+        self.client.force_authenticate(self.owner)
+        self.client.post(f"/api/messages/{first.id}/toggle-read/")
+        self.client.post("/api/messages/mark-read/", {"ids": [first.id, second.id]}, format="json")
+        self.assertEqual(self.counters(self.owner)["unreadMessages"], 1)
+        third.delete()
+        self.assertEqual(self.counters(self.owner)["unreadMessages"], 0)
+        self.assertMatchesRecount(self.owner)
+
+    def test_write_behind_batches_are_counted(self):
+        writer = MessageWriter()
+        for i in range(3):
+            writer.submit(Message(sender=self.buyer, recipient=self.owner, listing=self.posting, content="x"))
+        writer.flush()
+        self.assertEqual(self.counters(self.owner)["unreadMessages"], 3)
+        self.assertMatchesRecount(self.owner)
+
+    def test_repair_command_fixes_drift(self):
+        from django.core.management import call_command
+
+        self.message()
+        UserCounters.objects.filter(pk=self.owner.pk).update(unread_messages=42)
+        call_command("repair_counters", f"--user={self.owner.pk}", stdout=open(os.devnull, "w"))
+        self.assertEqual(UserCounters.objects.get(pk=self.owner.pk).unread_messages, 1)
+
+
+class ConversationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_user("seller@example.com")
+        self.buyer = make_user("buyer@example.com")
+        self.other = make_user("other@example.com")
+        category = Category.objects.create(name="Bikes")
+        self.bike = make_posting(self.seller, category)
+        self.lamp = make_posting(self.seller, category, title="Lamp")
+
+    def say(self, sender, recipient, listing, content="hi"):
+        return Message.objects.create(sender=sender, recipient=recipient, listing=listing, content=content)
+
+    def test_inbox_has_one_row_per_conversation(self):
+        for i in range(3):
+            self.say(self.buyer, self.seller, self.bike, f"q{i}")
+        last = self.say(self.seller, self.buyer, self.bike, "a")
+        self.say(self.other, self.seller, self.lamp)
+        self.say(self.other, self.seller, self.bike)
+
+        self.client.force_authenticate(self.seller)
+        with self.assertNumQueries(1):
+            rows = self.client.get("/api/messages/conversations/").data["results"]
+        self.assertEqual(len(rows), 3)
+        by_buyer = {(row["buyer"], row["listing"]): row for row in rows}
+        bike_thread = by_buyer[("buyer@example.com", self.bike.id)]
+        self.assertEqual(bike_thread["unread"], 3)
+        self.assertEqual(bike_thread["last_message"]["id"], last.id)
+        # The client compares these to last_message.sender_id ("You: …").
+        self.assertEqual((bike_thread["buyer_id"], bike_thread["seller_id"]), (self.buyer.id, self.seller.id))
+
+        self.client.force_authenticate(self.buyer)
+        rows = self.client.get("/api/messages/conversations/").data["results"]
+        self.assertEqual([(row["listing"], row["unread"]) for row in rows], [(self.bike.id, 1)])
+
+    def test_history_is_paginated_and_private(self):
+        messages = [self.say(self.buyer, self.seller, self.bike, f"m{i}") for i in range(5)]
+        conversation = Conversation.objects.get()
+        self.assertTrue(all(m.conversation_id == conversation.id for m in messages))
+
+        self.client.force_authenticate(self.seller)
+        url = f"/api/messages/conversations/{conversation.id}/"
+        page = self.client.get(url, {"page_size": 3}).data
+        self.assertEqual([m["content"] for m in page["results"]], ["m4", "m3", "m2"])
+        rest = self.client.get(page["next"]).data
+        self.assertEqual([m["content"] for m in rest["results"]], ["m1", "m0"])
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_reads_and_deletes_keep_the_conversation_current(self):
+        first = self.say(self.buyer, self.seller, self.bike, "first")
+        second = self.say(self.buyer, self.seller, self.bike, "second")
+        self.client.force_authenticate(self.seller)
+        self.client.post("/api/messages/mark-read/", {"ids": [first.id]}, format="json")
+        conversation = Conversation.objects.get()
+        self.assertEqual((conversation.seller_unread, conversation.last_message_id), (1, second.id))
+
+        second.delete()
+        conversation.refresh_from_db()
+        self.assertEqual((conversation.seller_unread, conversation.last_message_id), (0, first.id))
+
+    def test_delete_conversation_is_set_based(self):
+        first = self.say(self.buyer, self.seller, self.bike, "first")
+        write_messages([
+            Message(sender=self.seller, recipient=self.buyer, listing=self.bike,
+                    content=f"r{i}", parent_message=first)
+            for i in range(1200)
+        ])
+        self.say(self.other, self.seller, self.bike)
+        self.say(self.buyer, self.seller, self.lamp)
+
+        self.client.force_authenticate(self.buyer)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.delete(f"/api/messages/conversation/{self.bike.id}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertLess(len(ctx.captured_queries), 25)
+
+        self.assertEqual(Message.objects.filter(listing=self.bike).count(), 1)
+        self.assertFalse(Notification.objects.filter(recipient=self.buyer).exists())
+        self.assertEqual(Conversation.objects.filter(listing=self.bike).count(), 1)
+        for user in (self.seller, self.buyer):
+            counters = get_counters(user.id)
+            repair(user.id)
+            self.assertEqual(counters, get_counters(user.id))
+        self.assertEqual(get_counters(self.buyer.id)["unreadMessages"], 0)
+
+    def test_deleting_deep_reply_chains_keeps_queries_flat(self):
+        parent = self.say(self.buyer, self.seller, self.bike, "root")
+        for i in range(40):
+            parent = Message.objects.create(sender=self.seller, recipient=self.buyer, listing=self.bike,
+                                            content=f"r{i}", parent_message=parent)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(delete_messages(Message.objects.filter(content="root")), 41)
+        self.assertFalse(Message.objects.exists())
+        self.assertLess(max(q["sql"].count("SELECT") for q in ctx.captured_queries), 6)
+
+    def test_soft_delete_hides_the_thread_for_one_side(self):
+        self.say(self.buyer, self.seller, self.bike, "old")
+        self.client.force_authenticate(self.seller)
+        url = f"/api/messages/conversation/{self.bike.id}/"
+        self.assertEqual(self.client.delete(url, QUERY_STRING="soft=1").data, {"cleared": 1})
+        self.assertEqual(self.client.get("/api/messages/conversations/").data["results"], [])
+        self.assertEqual(get_counters(self.seller.id)["unreadMessages"], 0)
+
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(len(self.client.get("/api/messages/conversations/").data["results"]), 1)
+
+        self.say(self.buyer, self.seller, self.bike, "new")
+        self.client.force_authenticate(self.seller)
+        rows = self.client.get("/api/messages/conversations/").data["results"]
+        self.assertEqual(len(rows), 1)
+        history = self.client.get(f"/api/messages/conversations/{rows[0]['id']}/").data["results"]
+        self.assertEqual([m["content"] for m in history], ["new"])
+        inbox = self.client.get("/api/messages/inbox/").data["results"]
+        self.assertEqual([m["content"] for m in inbox], ["new"])
+
+
+class FlakyEmailBackend(BaseEmailBackend):
+    """Records connections and messages; refuses anything sent to bounce@."""
+    connections = 0
+    sent = []
+
+    def open(self):
+        FlakyEmailBackend.connections += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if "bounce@example.com" in message.to:
+                raise OSError("550 mailbox unavailable")
+            FlakyEmailBackend.sent.append(message)
+        return len(messages)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_user("seller@example.com")
+        self.buyer = make_user("buyer@example.com")
+        self.posting = make_posting(self.seller, Category.objects.create(name="Bikes"))
+        self.cash = PaymentMethod.objects.create(name="Cash")
+        FlakyEmailBackend.connections = 0
+        FlakyEmailBackend.sent = []
+
+    def test_checkout_only_queues_the_confirmation(self):
+        self.client.force_authenticate(self.buyer)
+        response = self.client.post(
+            "/api/orders/", {"listing": self.posting.id, "payment_method": self.cash.id}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.to, email.status), ("buyer@example.com", OutboundEmail.STATUS_QUEUED))
+        self.assertIn("Bike", email.body)
+
+        self.assertEqual(send_due(), (1, 0))
+        self.assertEqual(mail.outbox[0].subject, f"✅ Order Confirmation – Order #{response.data['id']}")
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.STATUS_SENT, 1))
+
+    @override_settings(EMAIL_BACKEND="api.tests.FlakyEmailBackend", OUTBOX_MAX_ATTEMPTS=2)
+    def test_batches_share_a_connection_and_failures_back_off(self):
+        for i in range(3):
+            OutboundEmail.objects.create(to=f"user{i}@example.com", subject="Hi", body="…")
+        bounce = OutboundEmail.objects.create(to="bounce@example.com", subject="Hi", body="…")
+
+        self.assertEqual(send_due(), (3, 1))
+        self.assertEqual((FlakyEmailBackend.connections, len(FlakyEmailBackend.sent)), (1, 3))
+        bounce.refresh_from_db()
+        self.assertEqual((bounce.status, bounce.attempts), (OutboundEmail.STATUS_QUEUED, 1))
+        self.assertIn("550", bounce.last_error)
+        self.assertGreater(bounce.next_attempt_at, timezone.now())
+        self.assertEqual(send_due(), (0, 0))  # not due yet
+
+        OutboundEmail.objects.filter(pk=bounce.pk).update(next_attempt_at=timezone.now())
+        with self.assertLogs("api.outbox", "ERROR"):
+            self.assertEqual(send_due(), (0, 1))
+        bounce.refresh_from_db()
+        self.assertEqual((bounce.status, bounce.attempts), (OutboundEmail.STATUS_DEAD, 2))
+
+    @override_settings(EMAIL_DIGEST_MAX_ITEMS=5)
+    def test_digest_rolls_notifications_into_one_email_per_user(self):
+        for _ in range(8):
+            Order.objects.create(buyer=self.buyer, listing=self.posting, total_price=10)
+        # Savepoint, notifications, email insert, mark update, release
+        with self.assertNumQueries(5):
+            self.assertEqual(queue_digests(), 1)
+        digest = OutboundEmail.objects.get(to="seller@example.com")
+        self.assertEqual(digest.subject, "🔔 8 new notifications on Toro Marketplace")
+        self.assertEqual(digest.body.count("buyer@example.com purchased your listing"), 5)
+        self.assertIn("…and 3 more.", digest.body)
+
+        self.assertEqual(queue_digests(), 0)
+        Order.objects.create(buyer=self.buyer, listing=self.posting, total_price=10)
+        self.assertEqual(queue_digests(), 1)
+
+
+class PaymentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server, base_url = start_in_thread()
+        cls.enterClassContext(override_settings(STRIPE_API_BASE=base_url, STRIPE_MAX_NETWORK_RETRIES=0))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.buyer = make_user("buyer@example.com")
+        self.posting = make_posting(make_user("seller@example.com"), Category.objects.create(name="Bikes"))
+        self.order = Order.objects.create(buyer=self.buyer, listing=self.posting, total_price="12.34")
+        # A fresh stub per test: order ids (and so idempotency keys) repeat.
+        self.stub = self.server.stub = StripeStub()
+        self.client.force_authenticate(self.buyer)
+
+    def intent(self, order_id):
+        return self.client.post("/api/create-payment-intent/", {"order_id": order_id}, format="json")
+
+    def test_payment_intent_is_created_once_per_order(self):
+        first, retry = self.intent(self.order.id).data, self.intent(self.order.id).data
+        self.assertEqual(first, retry)
+        self.assertEqual(self.stub.created, 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.stripe_payment_intent_id, first["payment_intent_id"])
+        self.assertEqual(self.stub.objects[first["payment_intent_id"]]["amount"], 1234)
+
+        # Even if the id never got stored, the derived idempotency key replays it.
+        Order.objects.filter(pk=self.order.pk).update(stripe_payment_intent_id=None)
+        self.assertEqual(self.intent(self.order.id).data, first)
+        self.assertEqual(self.stub.created, 1)
+
+    def test_only_the_buyers_pending_orders_can_be_paid(self):
+        self.client.force_authenticate(make_user("other@example.com"))
+        self.assertEqual(self.intent(self.order.id).status_code, 404)
+        self.client.force_authenticate(self.buyer)
+        Order.objects.filter(pk=self.order.pk).update(status=Order.STATUS_PAID)
+        self.assertEqual(self.intent(self.order.id).status_code, 400)
+
+    def test_checkout_session_for_an_order(self):
+        url = "/api/create-stripe-session/"
+        first = self.client.post(url, {"order_id": self.order.id}, format="json").data
+        again = self.client.post(url, {"order_id": self.order.id}, format="json").data
+        self.assertEqual(first, again)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.stripe_checkout_session_id, first["sessionId"])
+        self.assertEqual(self.stub.objects[first["sessionId"]]["amount_total"], 1234)
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test")
+class StripeWebhookTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.buyer = make_user("buyer@example.com")
+        self.posting = make_posting(make_user("seller@example.com"), Category.objects.create(name="Bikes"))
+
+    def order(self, n):
+        return Order.objects.create(
+            buyer=self.buyer, listing=self.posting, total_price=10, stripe_payment_intent_id=f"pi_{n}"
+        )
+
+    def deliver(self, event_id, intent_id, type="payment_intent.succeeded", secret="whsec_test"):
+        payload = json.dumps({
+            "id": event_id, "type": type,
+            "data": {"object": {"id": intent_id, "object": "payment_intent"}},
+        })
+        return self.client.post(
+            "/api/stripe/webhook/", payload, content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign(payload, secret),
+        )
+
+    def test_events_are_verified_and_stored_once(self):
+        self.assertEqual(self.deliver("evt_1", "pi_1", secret="whsec_wrong").status_code, 400)
+        self.assertEqual(self.deliver("evt_1", "pi_1").status_code, 200)
+        self.assertEqual(self.deliver("evt_1", "pi_1").status_code, 200)  # Stripe retried
+        self.assertEqual(StripeEvent.objects.filter(processed_at=None).count(), 1)
+
+    def test_batches_mark_orders_paid_and_notify_buyers(self):
+        orders = [self.order(n) for n in range(50)]
+        for n in range(50):
+            self.deliver(f"evt_{n}", f"pi_{n}")
+        self.deliver("evt_dup", "pi_0")                       # a second event, same intent
+        self.deliver("evt_other", "pi_0", type="charge.updated")
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(process_pending(), 52)
+        self.assertLess(len(ctx.captured_queries), 20)
+        self.assertFalse(StripeEvent.objects.filter(processed_at=None).exists())
+
+        paid = Order.objects.filter(status=Order.STATUS_PAID, paid_at__isnull=False)
+        self.assertEqual(paid.count(), len(orders))
+        self.assertEqual(
+            Notification.objects.filter(recipient=self.buyer, verb="payment received for your order").count(), 50
+        )
+        self.assertEqual(get_counters(self.buyer.id)["unreadNotifications"], 50)
+
+        # Late cancellation of a paid order changes nothing.
+        self.deliver("evt_late", "pi_0", type="payment_intent.canceled")
+        process_pending()
+        self.assertEqual(Order.objects.get(pk=orders[0].pk).status, Order.STATUS_PAID)
+
+
+class AnalyticsRollupTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = make_user("user@example.com")
+        self.seller = make_user("seller@example.com")
+        self.bikes = Category.objects.create(name="Bikes")
+        self.lamps = Category.objects.create(name="Lamps")
+        self.bike = make_posting(self.seller, self.bikes)
+        self.lamp = make_posting(self.seller, self.lamps, title="Lamp")
+        self.client.force_authenticate(self.user)
+
+    def get(self, endpoint):
+        with self.assertNumQueries(1):
+            return self.client.get(f"/api/analytics/user/{endpoint}/").data
+
+    def test_signals_keep_the_dashboard_current(self):
+        make_posting(self.user, self.bikes)
+        doomed = make_posting(self.user, self.bikes)
+        orders = [Order.objects.create(buyer=self.user, listing=listing, total_price=10)
+                  for listing in (self.bike, self.bike, self.lamp)]
+        doomed.delete()
+        orders[0].delete()
+
+        month = timezone.localdate().strftime("%Y-%m")
+        self.assertEqual(self.get("overview"), {
+            "postsThisMonth": 1, "totalPosts": 1, "salesThisMonth": 2, "totalSales": 2,
+        })
+        self.assertEqual(self.get("posts-by-month"), [{"month": month, "count": 1}])
+        self.assertEqual(self.get("sales-by-month"), [{"month": month, "count": 2}])
+        self.assertEqual(
+            sorted((row["category"], row["value"]) for row in self.get("sales-by-category")),
+            [("Bikes", 1), ("Lamps", 1)],
+        )
+
+    def test_rebuild_buckets_history_by_day(self):
+        old = make_posting(self.user, self.bikes)
+        make_posting(self.user, self.bikes)
+        order = Order.objects.create(buyer=self.user, listing=self.lamp, total_price=10)
+        last_year = timezone.now() - datetime.timedelta(days=400)
+        CommunityPosting.objects.filter(pk=old.pk).update(created_at=last_year)
+        Order.objects.filter(pk=order.pk).update(created_at=last_year)
+        UserDailyActivity.objects.all().delete()
+
+        rebuild_rollups()
+        months = self.get("posts-by-month")
+        self.assertEqual([row["month"] for row in months],
+                         [last_year.strftime("%Y-%m"), timezone.localdate().strftime("%Y-%m")])
+        overview = self.get("overview")
+        self.assertEqual((overview["totalPosts"], overview["postsThisMonth"]), (2, 1))
+        self.assertEqual((overview["totalSales"], overview["salesThisMonth"]), (1, 0))
+        start = (timezone.localdate() - datetime.timedelta(days=30)).isoformat()
+        self.assertEqual(self.client.get("/api/analytics/user/sales-by-category/", {"start": start}).data, [])
+
+    def test_deleting_a_user_takes_their_rollups_along(self):
+        make_posting(self.user, self.bikes)
+        Order.objects.create(buyer=self.user, listing=self.bike, total_price=10)
+        self.user.delete()
+        # Deferred FK checks: a rollup row re-created for the deleted user fails here.
+        connection.check_constraints()
+        self.assertFalse(UserDailyActivity.objects.filter(user_id=self.user.pk).exists())
+
+    def test_dashboard_combines_the_panels_and_revalidates(self):
+        make_posting(self.user, self.bikes)
+        for listing in (self.bike, self.lamp, self.lamp):
+            Order.objects.create(buyer=self.user, listing=listing, total_price=10)
+        start = {"start": timezone.localdate().isoformat()}
+
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/analytics/user/dashboard/", start)
+        self.assertEqual(response.data, {
+            "overview": self.client.get("/api/analytics/user/overview/").data,
+            "postsByMonth": self.client.get("/api/analytics/user/posts-by-month/", start).data,
+            "salesByMonth": self.client.get("/api/analytics/user/sales-by-month/", start).data,
+            "salesByCategory": self.client.get("/api/analytics/user/sales-by-category/", start).data,
+        })
+
+        etag = response["ETag"]
+        again = self.client.get("/api/analytics/user/dashboard/", start, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((again.status_code, again["ETag"]), (304, etag))
+        Order.objects.create(buyer=self.user, listing=self.bike, total_price=10)
+        changed = self.client.get("/api/analytics/user/dashboard/", start, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data["overview"]["totalSales"], 4)
+
+    def test_malformed_dates_are_a_400(self):
+        for panel in ("dashboard", "posts-by-month", "sales-by-month", "sales-by-category"):
+            for params in ({"start": "bogus"}, {"end": "2024-02-30"}):
+                with self.subTest(panel=panel, params=params):
+                    response = self.client.get(f"/api/analytics/user/{panel}/", params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn("error", response.data)
+
+
+class SellerRevenueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_user("seller@example.com")
+        self.buyer = make_user("buyer@example.com")
+        category = Category.objects.create(name="Bikes")
+        self.bike = make_posting(self.seller, category, price="19.99")
+        self.lamp = make_posting(self.seller, category, title="Lamp", price="5.10")
+        self.wrap = Offering.objects.create(name="Gift wrap", extra_cost="0.01")
+        self.client.force_authenticate(self.seller)
+
+    def order(self, listing, total, days_ago=0, status=Order.STATUS_PAID, offerings=()):
+        order = Order.objects.create(buyer=self.buyer, listing=listing, total_price=total, status=status)
+        order.offerings.set(offerings)
+        if days_ago:
+            Order.objects.filter(pk=order.pk).update(
+                created_at=timezone.now() - datetime.timedelta(days=days_ago)
+            )
+        return order
+
+    def test_revenue_summary_series_and_top_listings(self):
+        self.order(self.bike, "20.00", offerings=[self.wrap])
+        self.order(self.bike, "19.99")
+        self.order(self.lamp, "5.10", days_ago=40)
+        self.order(self.lamp, "99.00", status=Order.STATUS_PENDING)
+        make_posting(self.buyer, None)   # someone else's sales don't count
+
+        data = self.client.get("/api/analytics/seller/revenue/", {"bucket": "month"}).data
+        self.assertEqual(data["summary"], {
+            "revenue": "45.09", "orders": 3, "averageOrderValue": "15.03", "attachRate": 0.3333,
+        })
+        self.assertEqual([row["revenue"] for row in data["series"]], ["5.10", "39.99"])
+        self.assertEqual(data["series"][-1]["period"], timezone.localdate().strftime("%Y-%m"))
+        self.assertEqual([(row["title"], row["revenue"]) for row in data["topListings"]],
+                         [("Bike", "39.99"), ("Lamp", "5.10")])
+        self.assertEqual(data["offerings"], [
+            {"offering": self.wrap.pk, "name": "Gift wrap", "orders": 1, "attachRate": 0.3333},
+        ])
+
+        today = timezone.localdate().isoformat()
+        recent = self.client.get("/api/analytics/seller/revenue/", {"start": today, "end": today}).data
+        self.assertEqual([row["period"] for row in recent["series"]], [today])
+        self.assertEqual(recent["summary"]["revenue"], "39.99")
+        bad = self.client.get("/api/analytics/seller/revenue/", {"start": "2024-13-01"})
+        self.assertEqual(bad.status_code, 400)
+
+    def test_streamed_revenue_matches_the_database(self):
+        for i in range(25):
+            self.order(self.bike if i % 3 else self.lamp, f"{i}.{i:02d}", days_ago=i % 4)
+        orders = revenue.seller_orders(self.seller)
+        for bucket in revenue.BUCKETS:
+            expected = revenue.revenue_by(orders, bucket)
+            self.assertEqual(revenue.stream_revenue(orders, bucket, 7, use_numpy=False), expected)
+            if revenue.np is not None:
+                self.assertEqual(revenue.stream_revenue(orders, bucket, 7), expected)
+
+
+class PlatformStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = CommunityUser.objects.create(email="staff@example.com", username="staff", is_staff=True)
+        self.buyer = make_user("buyer@example.com")
+        self.bikes = Category.objects.create(name="Bikes")
+        self.bike = make_posting(self.staff, self.bikes)
+        self.client.force_authenticate(self.staff)
+
+    def order(self, status=Order.STATUS_PAID, days_ago=0, total=10):
+        order = Order.objects.create(buyer=self.buyer, listing=self.bike, total_price=total, status=status)
+        if days_ago:
+            Order.objects.filter(pk=order.pk).update(
+                created_at=timezone.now() - datetime.timedelta(days=days_ago)
+            )
+        return order
+
+    def stats(self):
+        response = self.client.get("/api/analytics/platform/")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_refresh_is_incremental_and_catches_late_payments(self):
+        self.order(total="12.50")
+        self.order(status=Order.STATUS_PENDING)
+        late = self.order(status=Order.STATUS_PENDING, days_ago=10)
+        self.assertEqual(refresh_platform_stats(), 11)
+
+        data = self.stats()
+        today = data["days"][-1]
+        self.assertEqual((today["gmv"], today["newListings"], today["activeUsers"]), ("12.50", 1, 2))
+        self.assertEqual({row["status"]: row["orders"] for row in data["ordersByStatus"]},
+                         {"PENDING": 2, "PAID": 1, "CANCELED": 0})
+        self.assertEqual(data["listingsByCategory"], [{"category": "Bikes", "value": 1}])
+
+        Order.objects.filter(pk=late.pk).update(status=Order.STATUS_PAID, paid_at=timezone.now())
+        self.assertEqual(refresh_platform_stats(), 11)   # back to the late order's day
+        self.assertEqual(refresh_platform_stats(), 3)    # just the lookback window
+        self.assertEqual(self.stats()["days"][0]["gmv"], "10.00")
+
+        Order.objects.filter(pk=late.pk).update(status=Order.STATUS_CANCELED)
+        refresh_platform_stats()
+        self.assertEqual(self.stats()["days"][0]["gmv"], "10.00")
+        refresh_platform_stats(full=True)
+        self.assertEqual(self.stats()["days"][0]["gmv"], "0.00")
+        self.assertEqual(PlatformDailyStats.objects.count(), 11)
+
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get("/api/analytics/platform/").status_code, 403)
+
+    @skipUnless(connection.vendor == "sqlite", "PostgreSQL and MySQL estimate from table statistics")
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=3)
+    def test_admin_changelists_estimate_unfiltered_counts(self):
+        orders = [self.order() for _ in range(3)]
+        orders.pop(0).delete()
+        # SQLite: the highest id, which still counts the deleted row
+        self.assertEqual(EstimatedCountPaginator(Order.objects.order_by("pk"), 100).count, orders[-1].pk)
+        self.assertEqual(EstimatedCountPaginator(Order.objects.filter(buyer=self.buyer), 100).count, 2)
+
+        admin = CommunityUser.objects.create(email="root@example.com", username="root",
+                                             is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        response = self.client.get("/admin/api/order/")
+        self.assertEqual(response.status_code, 200)
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_user("seller@example.com")
+        self.buyer = make_user("buyer@example.com")
+        card = PaymentMethod.objects.create(name="Card")
+        bike = make_posting(self.seller, None, title='Bike, "red"')
+        self.orders = [
+            Order.objects.create(buyer=self.buyer, listing=bike, payment_method=card, total_price=f"{i}.05")
+            for i in range(5)
+        ]
+        Order.objects.filter(pk=self.orders[0].pk).update(
+            created_at=timezone.now() - datetime.timedelta(days=30)
+        )
+        Order.objects.create(buyer=self.seller, listing=make_posting(self.buyer, None), total_price=1)
+        self.client.force_authenticate(self.seller)
+
+    def download(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_sales_export_streams_csv_and_jsonl(self):
+        with self.assertNumQueries(1):
+            response, body = self.download("/api/orders/sales/export/")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("attachment;", response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([int(row["id"]) for row in rows], [o.pk for o in reversed(self.orders)])
+        self.assertEqual((rows[0]["listing_title"], rows[0]["buyer_email"], rows[0]["total_price"]),
+                         ('Bike, "red"', "buyer@example.com", "4.05"))
+        self.assertEqual((rows[0]["payment_method_name"], rows[0]["paid_at"]), ("Card", ""))
+
+        today = timezone.localdate().isoformat()
+        _, body = self.download("/api/orders/sales/export/", **{"as": "jsonl", "start": today})
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(lines), 4)
+        self.assertEqual((lines[-1]["id"], lines[-1]["total_price"]), (self.orders[1].pk, "1.05"))
+
+        _, body = self.download("/api/orders/export/", **{"as": "jsonl"})
+        self.assertEqual([json.loads(line)["seller_email"] for line in body.splitlines()],
+                         ["buyer@example.com"])
+        self.assertEqual(self.client.get("/api/orders/sales/export/", {"as": "xml"}).status_code, 400)
+
+    def test_signed_links_download_without_a_header(self):
+        link_token = self.client.post("/api/orders/export-link/").data["link_token"]
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get("/api/orders/sales/export/").status_code, 403)
+        response = anonymous.get("/api/orders/sales/export/", {"link_token": link_token})
+        self.assertEqual(response.status_code, 200)
+        body = b"".join(response.streaming_content).decode()
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(body)))), 5)
+        # Only the export URLs accept it, and only until it expires.
+        self.assertEqual(anonymous.get("/api/orders/sales/", {"link_token": link_token}).status_code, 403)
+        self.assertEqual(anonymous.get("/api/orders/export/", {"link_token": link_token + "x"}).status_code, 403)
+        with override_settings(DOWNLOAD_LINK_MAX_AGE=-1):
+            self.assertEqual(anonymous.get("/api/orders/export/", {"link_token": link_token}).status_code, 403)
+
+    def test_csv_cells_cannot_start_a_formula(self):
+        CommunityPosting.objects.filter(title='Bike, "red"').update(title='=HYPERLINK("http://x","y")')
+        PaymentMethod.objects.filter(name="Card").update(name="@SUM(A1)")
+        Order.objects.filter(pk=self.orders[4].pk).update(total_price="-4.05")
+        _, body = self.download("/api/orders/sales/export/")
+        row = next(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(row["listing_title"], """'=HYPERLINK("http://x","y")""")
+        self.assertEqual(row["payment_method_name"], "'@SUM(A1)")
+        self.assertEqual(row["total_price"], "-4.05")
+
+        _, body = self.download("/api/orders/sales/export/", **{"as": "jsonl"})
+        self.assertEqual(json.loads(body.splitlines()[0])["listing_title"], '=HYPERLINK("http://x","y")')
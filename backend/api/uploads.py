@@ -0,0 +1,94 @@
+# api/uploads.py
+
+import hashlib
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from . import images as image_pipeline
+from .models import PostingImage
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every uploaded file to a temp file on disk (never into memory,
+    whatever its size) and computes its sha256 on the fly, so the content
+    hash is known without a second read. FileSystemStorage then moves the
+    temp file into MEDIA_ROOT instead of copying it.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.content_hash = self._sha256.hexdigest()
+        return super().file_complete(file_size)
+
+
+def content_hash(upload):
+    """The upload's sha256; computed in chunks for files that bypassed the handler."""
+    digest = getattr(upload, "content_hash", None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    for chunk in upload.chunks():
+        sha256.update(chunk)
+    upload.seek(0)
+    upload.content_hash = sha256.hexdigest()
+    return upload.content_hash
+
+
+def attach_images(posting, uploads, delete_ids=()):
+    """
+    Adds `uploads` to `posting` and removes the images in `delete_ids`.
+    Call it inside the caller's transaction.
+
+    Identical files are stored once: duplicates within the upload, and
+    files already attached to this posting, are skipped. A file already
+    stored for another posting reuses that file and its renditions. All
+    new rows go in with one bulk_create.
+    """
+    if delete_ids:
+        PostingImage.objects.filter(posting=posting, id__in=delete_ids).delete()
+
+    by_hash = {}
+    for upload in uploads:
+        by_hash.setdefault(content_hash(upload), upload)
+    if not by_hash:
+        return []
+
+    already_attached = set(
+        PostingImage.objects
+            .filter(posting=posting, content_hash__in=by_hash)
+            .values_list("content_hash", flat=True)
+    )
+    stored = {
+        row["content_hash"]: row
+        for row in PostingImage.objects
+            .filter(content_hash__in=by_hash)
+            .exclude(posting=posting)
+            .values("content_hash", "image", "renditions")
+    }
+
+    new_images = []
+    for digest, upload in by_hash.items():
+        if digest in already_attached:
+            continue
+        if digest in stored:
+            existing = stored[digest]
+            new_images.append(PostingImage(
+                posting=posting,
+                image=existing["image"],
+                renditions=existing["renditions"],
+                content_hash=digest,
+            ))
+        else:
+            new_images.append(PostingImage(posting=posting, image=upload, content_hash=digest))
+
+    created = PostingImage.objects.bulk_create(new_images)
+    image_pipeline.schedule(image.id for image in created if not image.renditions)
+    return created
@@ -17,13 +17,18 @@ from .views import (
     PaymentMethodViewSet,
     OfferingViewSet,
     OrderViewSet,
+    NotificationViewSet,
     CreatePaymentIntent,
     CreateStripeSession,
+    StripeWebhookView,
     UserOverviewView,
     UserPostsByMonthView,
     UserSalesByMonthView,
     UserSalesByCategoryView,
     UserNotificationsView,
+    UserDashboardView,
+    SellerRevenueView,
+    PlatformAnalyticsView,
 )
 
 router = DefaultRouter()
@@ -36,6 +41,7 @@ router.register(r'messages', MessageViewSet, basename='messages')
 router.register(r'payment-methods', PaymentMethodViewSet, basename='payment-methods')
 router.register(r'offerings', OfferingViewSet, basename='offerings')
 router.register(r'orders', OrderViewSet, basename='orders')
+router.register(r'notifications', NotificationViewSet, basename='notifications')
 
 urlpatterns = [
     # DRF router: standard CRUD + @action endpoints
@@ -64,12 +70,16 @@ urlpatterns = [
     # Stripe integration
     path('create-payment-intent/', CreatePaymentIntent.as_view(), name='create-payment-intent'),
     path('create-stripe-session/', CreateStripeSession.as_view(), name='create-stripe-session'),
+    path('stripe/webhook/', StripeWebhookView.as_view(), name='stripe-webhook'),
 
     # Analytics / Notifications
     path('analytics/user/overview/', UserOverviewView.as_view(), name='analytics-user-overview'),
     path('analytics/user/posts-by-month/', UserPostsByMonthView.as_view(), name='analytics-user-posts-by-month'),
     path('analytics/user/sales-by-month/', UserSalesByMonthView.as_view(), name='analytics-user-sales-by-month'),
     path('analytics/user/sales-by-category/', UserSalesByCategoryView.as_view(), name='analytics-user-sales-by-category'),
+    path('analytics/user/dashboard/', UserDashboardView.as_view(), name='analytics-user-dashboard'),
+    path('analytics/seller/revenue/', SellerRevenueView.as_view(), name='analytics-seller-revenue'),
+    path('analytics/platform/', PlatformAnalyticsView.as_view(), name='analytics-platform'),
     path('analytics/user/notifications/', UserNotificationsView.as_view(), name='analytics-user-notifications'),
 ]
 
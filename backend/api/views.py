@@ -1,16 +1,19 @@
 # api/views.py
 
-from datetime import date
+import hashlib
+import json
 
-import stripe
 from django.conf import settings
-from django.core.mail import send_mail
-from django.db.models import Q, Count, F, DateField
-from django.db.models.functions import TruncMonth, Cast
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
 from django.contrib.auth import get_user_model
 
-from firebase_admin import auth as firebase_auth
-import api.firebase_admin_setup
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
@@ -18,12 +21,13 @@ from rest_framework.generics import RetrieveAPIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
 from .models import (
+    Conversation,
     CommunityPosting,
     Category,
-    PostingImage,
     Favorite,
     Tag,
     ListingTag,
@@ -31,7 +35,27 @@ from .models import (
     PaymentMethod,
     Offering,
     Order,
+    Notification,
+    UserDailyActivity,
+    UserDailyCategoryOrders,
 )
+from .authentication import DownloadLinkAuthentication, sign_download_link, verify_token
+from .conversations import (
+    clear_conversations, delete_messages, refresh_conversations, visible_conversations,
+    visible_messages,
+)
+from .emails import queue_order_confirmation
+from .exports import FORMATS, export_response
+from .counters import adjust as adjust_counters, get_counters
+from .notifications import publish_counters
+from . import revenue
+from .payments import PaymentError, checkout_session_for, payment_intent_for
+from .stripe_events import InvalidSignature, record as record_stripe_event, verify as verify_stripe_event
+from .filters import PostingFilterBackend
+from .platform_stats import overview as platform_overview
+from .pagination import ConversationPagination, KeysetPagination, NotificationPagination
+from .search import search_postings
+from .uploads import HashingFileUploadHandler, attach_images
 from .serializers import (
     CommunityPostingSerializer,
     CategorySerializer,
@@ -40,6 +64,7 @@ from .serializers import (
     ListingTagSerializer,
     MessageSerializer,
     MessageCreateSerializer,
+    ConversationSerializer,
     UserProfileSerializer,
     PaymentMethodSerializer,
     OfferingSerializer,
@@ -47,10 +72,16 @@ from .serializers import (
     OverviewSerializer,
     MonthCountSerializer,
     CategoryValueSerializer,
+    RevenueSummarySerializer,
+    RevenuePeriodSerializer,
+    TopListingSerializer,
+    OfferingAttachSerializer,
+    PlatformDaySerializer,
+    StatusTotalSerializer,
+    NotificationSerializer,
 )
 
 User = get_user_model()
-stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
 class HelloWorldView(APIView):
@@ -66,14 +97,14 @@ class VerifyFirebaseToken(APIView):
         if not id_token:
             return Response({"error": "Token missing"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            decoded = firebase_auth.verify_id_token(id_token)
+            decoded = verify_token(id_token)
             return Response({"uid": decoded["uid"], "email": decoded.get("email")})
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_401_UNAUTHORIZED)
 
 
 class PostingDetailView(RetrieveAPIView):
-    queryset = CommunityPosting.objects.all()
+    queryset = CommunityPosting.objects.for_feed()
     serializer_class = CommunityPostingSerializer
     permission_classes = [AllowAny]
     lookup_field = "id"
@@ -81,16 +112,25 @@ class PostingDetailView(RetrieveAPIView):
 
 class CommunityPostingViewSet(viewsets.ModelViewSet):
     """
-    /api/postings/             → all listings (with ?mine=)
+    /api/postings/             → all listings (with ?mine=, and the filters in
+                                  api.filters.PostingFilterBackend: category,
+                                  price_min/max, location, payment_methods,
+                                  offerings, tags, created_after)
+    /api/postings/search/?q=    → ranked full-text search with tag/category facets
     /api/postings/{id}/         → detail, update, delete
     /api/postings/{id}/orders/  → orders placed on this listing (seller only)
     """
     serializer_class = CommunityPostingSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = KeysetPagination
+    filter_backends = [PostingFilterBackend]
 
     def get_queryset(self):
-        qs = CommunityPosting.objects.all().order_by("-created_at")
+        qs = CommunityPosting.objects.all()
+        if self.action not in ("destroy", "orders"):
+            qs = qs.for_feed()
+        qs = qs.order_by("-created_at", "-id")
         if self.action == "list" and self.request.user.is_authenticated:
             if self.request.query_params.get("mine") in ["true", "1", "yes"]:
                 qs = qs.filter(user=self.request.user)
@@ -98,7 +138,9 @@ class CommunityPostingViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="my-ads", permission_classes=[IsAuthenticated])
     def my_ads(self, request):
-        qs = CommunityPosting.objects.filter(user=request.user).order_by("-created_at")
+        qs = self.filter_queryset(
+            CommunityPosting.objects.for_feed().filter(user=request.user).order_by("-created_at", "-id")
+        )
         page = self.paginate_queryset(qs)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -106,22 +148,50 @@ class CommunityPostingViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"], url_path="search")
+    def search(self, request):
+        """
+        GET /api/postings/search/?q=red bik&category=3&tag=vintage&limit=20&offset=0
+        """
+        params = request.query_params
+        try:
+            limit = min(max(int(params.get("limit", 20)), 1), 100)
+            offset = max(int(params.get("offset", 0)), 0)
+            category = int(params["category"]) if params.get("category") else None
+        except ValueError:
+            return Response({"error": "limit, offset and category must be integers."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        result = search_postings(
+            params.get("q", ""),
+            category=category,
+            tag=params.get("tag") or None,
+            limit=limit,
+            offset=offset,
+        )
+        postings = CommunityPosting.objects.for_feed().in_bulk(result.ids)
+        ranked = [postings[pk] for pk in result.ids if pk in postings]
+        return Response({
+            "count": result.count,
+            "results": self.get_serializer(ranked, many=True).data,
+            "facets": result.facets,
+        })
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Stream uploads to disk and hash them while they arrive (see api.uploads).
+        request.upload_handlers = [HashingFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        posting = serializer.save(user=self.request.user)
-        for image in self.request.FILES.getlist("images"):
-            PostingImage.objects.create(posting=posting, image=image)
+        with transaction.atomic():
+            posting = serializer.save(user=self.request.user)
+            attach_images(posting, self.request.FILES.getlist("images"))
 
     def perform_update(self, serializer):
-        posting = serializer.save()
-        for image in self.request.FILES.getlist("images"):
-            PostingImage.objects.create(posting=posting, image=image)
-        deleted_ids = self.request.data.getlist("deleted_images")
-        try:
-            deleted_ids = [int(i) for i in deleted_ids if str(i).isdigit()]
-            if deleted_ids:
-                PostingImage.objects.filter(posting=posting, id__in=deleted_ids).delete()
-        except Exception:
-            pass
+        deleted_ids = [int(i) for i in self.request.data.getlist("deleted_images") if str(i).isdigit()]
+        with transaction.atomic():
+            posting = serializer.save()
+            attach_images(posting, self.request.FILES.getlist("images"), delete_ids=deleted_ids)
 
     def destroy(self, request, *args, **kwargs):
         posting = self.get_object()
@@ -132,6 +202,13 @@ class CommunityPostingViewSet(viewsets.ModelViewSet):
             )
         return super().destroy(request, *args, **kwargs)
 
+    def perform_destroy(self, instance):
+        # Clear the chat first, set-based, instead of letting the cascade
+        # load and signal every message one by one.
+        with transaction.atomic():
+            delete_messages(Message.objects.filter(listing=instance))
+            instance.delete()
+
     @action(
         detail=True,
         methods=["get"],
@@ -197,12 +274,16 @@ class ListingTagViewSet(viewsets.ModelViewSet):
 
 class MessageViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         user = self.request.user
-        return Message.objects.filter(
-            Q(sender=user) | Q(recipient=user)
-        ).order_by("-created_at")
+        return visible_messages(
+            Message.objects.filter(Q(sender=user) | Q(recipient=user))
+                .select_related("sender", "recipient", "listing")
+                .order_by("-created_at", "-id"),
+            user,
+        )
 
     def get_serializer_class(self):
         return (
@@ -217,9 +298,45 @@ class MessageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"], url_path="inbox")
     def inbox(self, request):
         msgs = self.get_queryset()
+        page = self.paginate_queryset(msgs)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(msgs, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"], url_path="conversations")
+    def conversations(self, request):
+        """
+        The user's inbox: one row per conversation, most recent activity
+        first (served by the conversation_buyer/seller indexes). Threads the
+        user cleared stay hidden until a new message arrives.
+        """
+        qs = (
+            visible_conversations(request.user)
+                .select_related("listing", "buyer", "seller", "last_message")
+        )
+        paginator = ConversationPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        serializer = ConversationSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["get"], url_path=r"conversations/(?P<conversation_id>\d+)")
+    def conversation_history(self, request, conversation_id=None):
+        """One conversation's messages, newest first (cursor-paginated)."""
+        user = request.user
+        conversation = (
+            Conversation.objects.filter(Q(buyer=user) | Q(seller=user), pk=conversation_id).first()
+        )
+        if conversation is None:
+            return Response({"error": "Conversation not found."}, status=status.HTTP_404_NOT_FOUND)
+        msgs = conversation.messages.select_related("sender", "recipient", "listing")
+        cleared_at = conversation.cleared_at_for(user)
+        if cleared_at is not None:
+            msgs = msgs.filter(created_at__gt=cleared_at)
+        page = self.paginate_queryset(msgs)
+        return self.get_paginated_response(MessageSerializer(page, many=True).data)
+
     @action(detail=False, methods=["post"], url_path="send")
     def send_message(self, request):
         sender = request.user
@@ -271,12 +388,21 @@ class MessageViewSet(viewsets.ModelViewSet):
             return Response({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
         msg.read = not msg.read
         msg.save(update_fields=["read"])
+        adjust_counters(request.user.id, unread_messages=-1 if msg.read else 1)
+        refresh_conversations([msg.conversation_id])
+        publish_counters(request.user.id)
         return Response({"id": msg.id, "read": msg.read})
 
     @action(detail=False, methods=["post"], url_path="mark-read")
     def mark_read(self, request):
         ids = request.data.get("ids", [])
-        marked = Message.objects.filter(recipient=request.user, id__in=ids).update(read=True)
+        unread = Message.objects.filter(recipient=request.user, id__in=ids, read=False)
+        conversation_ids = list(unread.values_list("conversation_id", flat=True).distinct())
+        marked = unread.update(read=True)
+        if marked:
+            adjust_counters(request.user.id, unread_messages=-marked)
+            refresh_conversations(conversation_ids)
+            publish_counters(request.user.id)
         return Response({"marked": marked})
 
     @action(
@@ -286,34 +412,56 @@ class MessageViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated],
     )
     def delete_conversation(self, request, listing_id=None):
+        """
+        Delete the user's messages about a listing, with their replies and
+        notifications. ?soft=1 only hides the thread(s) from this user; the
+        other participant keeps them.
+        """
         user = request.user
+        if request.query_params.get("soft") in ("1", "true"):
+            cleared = clear_conversations(user, Conversation.objects.filter(listing_id=listing_id))
+            if cleared:
+                publish_counters(user.id)
+            return Response(
+                {"cleared": len(cleared)},
+                status=status.HTTP_200_OK if cleared else status.HTTP_404_NOT_FOUND
+            )
         qs = Message.objects.filter(listing_id=listing_id).filter(
             Q(sender=user) | Q(recipient=user)
         )
-        count, _ = qs.delete()
+        count = delete_messages(qs)
+        if count:
+            publish_counters(user.id)
         return Response(
             {"deleted": count},
             status=status.HTTP_204_NO_CONTENT if count else status.HTTP_404_NOT_FOUND
         )
 
 
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    /api/notifications/ → your notifications, newest first (cursor-paginated)
+    """
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
+
+    def get_queryset(self):
+        return (
+            Notification.objects
+                 .filter(recipient=self.request.user)
+                 .select_related("actor", "target_content_type")
+                 .order_by("-timestamp", "-id")
+        )
+
+
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
     def get(self, request):
-        try:
-            id_token = request.META.get("HTTP_AUTHORIZATION", "").split()[-1]
-            decoded = firebase_auth.verify_id_token(id_token)
-            email = decoded.get("email")
-            user, _ = User.objects.get_or_create(
-                email=email,
-                defaults={"username": email.split("@")[0], "is_active": True}
-            )
-        except Exception:
-            return Response({"error": "Invalid token."}, status=status.HTTP_401_UNAUTHORIZED)
-
-        return Response(UserProfileSerializer(user).data)
+        # FirebaseAuthentication has already verified the token and resolved the user.
+        return Response(UserProfileSerializer(request.user).data)
 
     def put(self, request):
         serializer = UserProfileSerializer(request.user, data=request.data)
@@ -330,6 +478,10 @@ class UserProfileView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# The export downloads also take a signed ?link_token= (see export_link).
+EXPORT_AUTHENTICATION = [DownloadLinkAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+
+
 class OrderViewSet(viewsets.ModelViewSet):
     """
     /api/orders/       → orders where you’re the buyer
@@ -337,52 +489,64 @@ class OrderViewSet(viewsets.ModelViewSet):
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return (
             Order.objects
                  .filter(buyer=self.request.user)
-                 .order_by("-created_at")
+                 .order_by("-created_at", "-id")
         )
 
     def perform_create(self, serializer):
-        order = serializer.save(buyer=self.request.user)
-        if order.buyer.email:
-            try:
-                addr = order.address_details or {}
-                message = (
-                    f"Hi {addr.get('first_name', '')} {addr.get('last_name', '')},\n\n"
-                    f"Thanks for your purchase on Toro Marketplace!\n\n"
-                    f"📦 Listing: {order.listing.title}\n"
-                    f"💳 Payment: {order.payment_method.name}\n"
-                    f"💰 Total: ${order.total_price}\n"
-                    f"📍 Status: {order.status}\n"
-                    f"🕒 Placed: {order.created_at.strftime('%Y-%m-%d %H:%M')}\n\n"
-                    f"📬 Shipping Address:\n"
-                    f"{addr.get('street', '')}\n"
-                    f"{addr.get('city', '')}, {addr.get('state', '')} {addr.get('zip', '')}\n"
-                    f"{addr.get('country', '')}\n"
-                    f"✉️ Email: {addr.get('email', '')}\n"
-                    f"📞 Phone: {addr.get('phone', '')}\n\n"
-                    f"You can view your receipt or manage your order in your dashboard.\n\n"
-                    f"Toro Marketplace 🐂"
-                )
-                send_mail(
-                    subject=f"✅ Order Confirmation – Order #{order.id}",
-                    message=message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[order.buyer.email],
-                    fail_silently=True,
-                )
-            except Exception as e:
-                print(f"[!] Email sending failed: {e}")
+        # The confirmation is only queued; `send_outbox` delivers it.
+        with transaction.atomic():
+            order = serializer.save(buyer=self.request.user)
+            queue_order_confirmation(order)
+
+    @action(detail=False, methods=["get"], url_path="export",
+            authentication_classes=EXPORT_AUTHENTICATION)
+    def export(self, request):
+        """Your orders as a streamed file: ?as=csv|jsonl&start=&end=&status= (api.exports)."""
+        return self._export(request, self.get_queryset(), "orders")
+
+    @action(detail=False, methods=["post"], url_path="export-link")
+    def export_link(self, request):
+        """
+        A short-lived `link_token` for the export URLs, so the browser can
+        download them through a plain link instead of buffering a blob.
+        """
+        return Response({
+            "link_token": sign_download_link(request.user),
+            "expires_in": getattr(settings, "DOWNLOAD_LINK_MAX_AGE", 60),
+        })
+
+    @action(detail=False, methods=["get"], url_path="sales/export",
+            authentication_classes=EXPORT_AUTHENTICATION)
+    def sales_export(self, request):
+        """Orders on your listings, streamed like /api/orders/export/."""
+        return self._export(request, Order.objects.filter(listing__user=request.user), "sales")
+
+    def _export(self, request, orders, name):
+        # Not ?format=: DRF reserves it for picking a renderer.
+        fmt = request.query_params.get("as", "csv")
+        if fmt not in FORMATS:
+            return Response({"error": "as must be csv or jsonl"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            bounds = _date_bounds(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        orders = revenue.placed_between(orders, **bounds)
+        if request.query_params.get("status"):
+            orders = orders.filter(status=request.query_params["status"])
+        return export_response(orders, fmt, name)
 
     @action(detail=False, methods=["get"], url_path="sales", permission_classes=[IsAuthenticated])
     def sales(self, request):
         qs = (
             Order.objects
                  .filter(listing__user=request.user)
-                 .order_by("-created_at")
+                 .order_by("-created_at", "-id")
         )
         page = self.paginate_queryset(qs)
         if page is not None:
@@ -394,87 +558,141 @@ class OrderViewSet(viewsets.ModelViewSet):
 
 
 class CreatePaymentIntent(APIView):
+    """
+    POST {order_id} → the client secret of the order's PaymentIntent. The
+    amount is the order's total; calling again returns the same intent.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        order_id = request.data.get("order_id")
+        order = (
+            Order.objects.filter(pk=order_id, buyer=request.user).first()
+            if str(order_id).isdigit() else None
+        )
+        if order is None:
+            return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+        if order.status != Order.STATUS_PENDING:
+            return Response({"error": "Order is not awaiting payment"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            amount = float(request.data.get("amount", 0))
-            if amount <= 0:
-                return Response({"error": "Invalid amount"}, status=status.HTTP_400_BAD_REQUEST)
-
-            intent = stripe.PaymentIntent.create(
-                amount=int(amount * 100),
-                currency="usd",
-                automatic_payment_methods={"enabled": True},
-            )
-            return Response({"client_secret": intent.client_secret})
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            intent = payment_intent_for(order)
+        except PaymentError as e:
+            return Response({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response({"client_secret": intent.client_secret, "payment_intent_id": intent.id})
 
 
 class CreateStripeSession(APIView):
+    """
+    POST {order_id} or {listing_id} → a Checkout Session id. Sessions for an
+    order are created once; listing-only requests are deduplicated by the
+    client's Idempotency-Key header.
+    """
     permission_classes = [IsAuthenticated]
 
+    SUCCESS_URL = "http://localhost:3000/order-confirmation/success?session_id={CHECKOUT_SESSION_ID}"
+    CANCEL_URL = "http://localhost:3000/checkout/cancel"
+
     def post(self, request):
-        try:
-            listing_id = request.data.get("listing_id")
-            listing = CommunityPosting.objects.get(id=listing_id)
+        order_id = request.data.get("order_id")
+        listing_id = request.data.get("listing_id")
+        order = None
+        if order_id:
+            order = (
+                Order.objects.select_related("listing").filter(pk=order_id, buyer=request.user).first()
+                if str(order_id).isdigit() else None
+            )
+            if order is None:
+                return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+            listing = order.listing
+        else:
+            listing = (
+                CommunityPosting.objects.filter(id=listing_id).first()
+                if str(listing_id).isdigit() else None
+            )
+            if listing is None:
+                return Response({"error": "Listing not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            session = stripe.checkout.Session.create(
-                mode="payment",
-                payment_method_types=["card"],
-                line_items=[{
-                    "price_data": {
-                        "currency": "usd",
-                        "unit_amount": int(listing.price * 100),
-                        "product_data": {
-                            "name": listing.title,
-                            "description": listing.description,
-                        },
-                    },
-                    "quantity": 1,
-                }],
-                billing_address_collection="required",
-                success_url="http://localhost:3000/order-confirmation/success?session_id={CHECKOUT_SESSION_ID}",
-                cancel_url="http://localhost:3000/checkout/cancel",
+        try:
+            session = checkout_session_for(
+                listing, self.SUCCESS_URL, self.CANCEL_URL,
+                order=order, key=request.headers.get("Idempotency-Key"),
             )
+        except PaymentError as e:
+            return Response({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response({"sessionId": session.id})
 
-            return Response({"sessionId": session.id})
-        except CommunityPosting.DoesNotExist:
-            return Response({"error": "Listing not found"}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class StripeWebhookView(APIView):
+    """
+    POST /api/stripe/webhook/ → verify, store, 200. Events are applied later,
+    in batches, by `process_stripe_events` (see api.stripe_events).
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        try:
+            event = verify_stripe_event(request.body, request.headers.get("Stripe-Signature"))
+        except InvalidSignature as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        record_stripe_event(event)
+        return Response({"received": True})
 
 
 # ─── Analytics: user-scoped endpoints ────────────────────────────────────────
 
+def _range_q(request):
+    """The ?start=/&end= day range as a Q (or None when unbounded); ValueError if malformed."""
+    bounds = _date_bounds(request)
+    q = Q()
+    if bounds["start"]:
+        q &= Q(day__gte=bounds["start"])
+    if bounds["end"]:
+        q &= Q(day__lte=bounds["end"])
+    return q or None
+
+
+def _in_range(rollups, request):
+    q = _range_q(request)
+    return rollups.filter(q) if q else rollups
+
+
+def _sales_by_category(user, request):
+    qs = (
+        _in_range(UserDailyCategoryOrders.objects.filter(user=user), request)
+        .filter(orders__gt=0)
+        .values("category__name")
+        .annotate(value=Sum("orders"))
+        .order_by("-value")
+    )
+    rows = [{"category": row["category__name"], "value": row["value"]} for row in qs]
+    return CategoryValueSerializer(rows, many=True).data
+
+
+def _by_month(rollups, field):
+    return (
+        rollups
+        .filter(**{f"{field}__gt": 0})
+        .annotate(month=TruncMonth("day"))
+        .values("month")
+        .annotate(count=Sum(field))
+        .order_by("month")
+    )
+
+
 class UserOverviewView(APIView):
+    """Counts come from the daily rollups (api.rollups), not the raw tables."""
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        today = date.today()
-
-        total_posts = CommunityPosting.objects.filter(user=user).count()
-        posts_this_month = CommunityPosting.objects.filter(
-            user=user,
-            created_at__year=today.year,
-            created_at__month=today.month,
-        ).count()
-
-        total_sales = Order.objects.filter(buyer=user).count()
-        sales_this_month = Order.objects.filter(
-            buyer=user,
-            created_at__year=today.year,
-            created_at__month=today.month,
-        ).count()
-
-        payload = {
-            "postsThisMonth": posts_this_month,
-            "totalPosts": total_posts,
-            "salesThisMonth": sales_this_month,
-            "totalSales": total_sales,
-        }
+        month_start = timezone.localdate().replace(day=1)
+        this_month = Q(day__gte=month_start)
+        payload = UserDailyActivity.objects.filter(user=request.user).aggregate(
+            postsThisMonth=Coalesce(Sum("posts", filter=this_month), 0),
+            totalPosts=Coalesce(Sum("posts"), 0),
+            salesThisMonth=Coalesce(Sum("orders", filter=this_month), 0),
+            totalSales=Coalesce(Sum("orders"), 0),
+        )
         serializer = OverviewSerializer(payload)
         return Response(serializer.data)
 
@@ -483,97 +701,176 @@ class UserPostsByMonthView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        start = request.query_params.get("start")
-        end   = request.query_params.get("end")
+        try:
+            rollups = _in_range(UserDailyActivity.objects.filter(user=request.user), request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = MonthCountSerializer(_by_month(rollups, "posts"), many=True)
+        return Response(serializer.data)
 
-        qs = CommunityPosting.objects.filter(user=request.user)
-        if start:
-            qs = qs.filter(created_at__date__gte=start)
-        if end:
-            qs = qs.filter(created_at__date__lte=end)
 
-        qs = (
-            qs
-            .annotate(month_dt=TruncMonth("created_at"))
-            .annotate(month=Cast("month_dt", output_field=DateField()))
-            .values("month")
-            .annotate(count=Count("id"))
-            .order_by("month")
-        )
-        serializer = MonthCountSerializer(qs, many=True)
+class UserSalesByMonthView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            rollups = _in_range(UserDailyActivity.objects.filter(user=request.user), request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = MonthCountSerializer(_by_month(rollups, "orders"), many=True)
         return Response(serializer.data)
 
 
-class UserSalesByMonthView(APIView):
+class UserSalesByCategoryView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        start = request.query_params.get("start")
-        end   = request.query_params.get("end")
+        try:
+            return Response(_sales_by_category(request.user, request))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        qs = Order.objects.filter(buyer=request.user)
-        if start:
-            qs = qs.filter(created_at__date__gte=start)
-        if end:
-            qs = qs.filter(created_at__date__lte=end)
 
-        qs = (
-            qs
-            .annotate(month_dt=TruncMonth("created_at"))
-            .annotate(month=Cast("month_dt", output_field=DateField()))
+class UserDashboardView(APIView):
+    """
+    GET /api/analytics/user/dashboard/ → overview, postsByMonth, salesByMonth
+    and salesByCategory in one response (same ?start=/&end= as the single
+    panels), from two queries: the monthly rollup totals, with the in-range
+    sums as conditional aggregates, and the category breakdown.
+
+    The response carries an ETag of its content; a matching If-None-Match
+    gets a 304 with no body.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            in_range = _range_q(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        def sum_in_range(field):
+            return Sum(field, filter=in_range) if in_range else Sum(field)
+
+        months = (
+            UserDailyActivity.objects.filter(user=request.user)
+            .annotate(month=TruncMonth("day"))
             .values("month")
-            .annotate(count=Count("id"))
+            .annotate(
+                all_posts=Sum("posts"),
+                all_orders=Sum("orders"),
+                posts_in_range=sum_in_range("posts"),
+                orders_in_range=sum_in_range("orders"),
+            )
             .order_by("month")
         )
-        serializer = MonthCountSerializer(qs, many=True)
-        return Response(serializer.data)
+        this_month = timezone.localdate().replace(day=1)
+        overview = {"postsThisMonth": 0, "totalPosts": 0, "salesThisMonth": 0, "totalSales": 0}
+        posts_by_month, sales_by_month = [], []
+        for row in months:
+            overview["totalPosts"] += row["all_posts"]
+            overview["totalSales"] += row["all_orders"]
+            if row["month"] == this_month:
+                overview["postsThisMonth"] = row["all_posts"]
+                overview["salesThisMonth"] = row["all_orders"]
+            if row["posts_in_range"]:
+                posts_by_month.append({"month": row["month"], "count": row["posts_in_range"]})
+            if row["orders_in_range"]:
+                sales_by_month.append({"month": row["month"], "count": row["orders_in_range"]})
 
+        payload = {
+            "overview": OverviewSerializer(overview).data,
+            "postsByMonth": MonthCountSerializer(posts_by_month, many=True).data,
+            "salesByMonth": MonthCountSerializer(sales_by_month, many=True).data,
+            "salesByCategory": _sales_by_category(request.user, request),
+        }
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        etag = f'"{digest[:32]}"'
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            response = Response(payload)
+        response["ETag"] = etag
+        # Browsers keep the body and revalidate it on every load.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+def _date_bounds(request):
+    """?start=/&end= as dates (None when absent); ValueError if malformed."""
+    bounds = {}
+    for name in ("start", "end"):
+        value = request.query_params.get(name)
+        try:
+            bounds[name] = parse_date(value) if value else None
+        except ValueError:
+            bounds[name] = None
+        if value and bounds[name] is None:
+            raise ValueError(f"Invalid {name} date")
+    return bounds
 
-class UserSalesByCategoryView(APIView):
+
+class SellerRevenueView(APIView):
+    """
+    GET /api/analytics/seller/revenue/?start=&end=&bucket=day|month
+    → revenue of the user's paid sales (api.revenue): summary (revenue,
+    orders, averageOrderValue, attachRate), series per bucket, topListings
+    and per-offering attach rates. Dates are YYYY-MM-DD, both inclusive.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        start = request.query_params.get("start")
-        end   = request.query_params.get("end")
+        bucket = request.query_params.get("bucket", "day")
+        if bucket not in revenue.BUCKETS:
+            return Response({"error": "bucket must be day or month"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            bounds = _date_bounds(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        qs = Order.objects.filter(buyer=request.user)
-        if start:
-            qs = qs.filter(created_at__date__gte=start)
-        if end:
-            qs = qs.filter(created_at__date__lte=end)
+        orders = revenue.seller_orders(request.user, **bounds)
+        return Response({
+            "summary": RevenueSummarySerializer(revenue.summary(orders)).data,
+            "series": RevenuePeriodSerializer(
+                revenue.revenue_by(orders, bucket), many=True, context={"bucket": bucket}
+            ).data,
+            "topListings": TopListingSerializer(revenue.top_listings(orders), many=True).data,
+            "offerings": OfferingAttachSerializer(revenue.offering_attach(orders), many=True).data,
+        })
 
-        qs = (
-            qs
-            .values(category=F("listing__category__name"))
-            .annotate(value=Count("id"))
-            .order_by("-value")
-        )
-        serializer = CategoryValueSerializer(qs, many=True)
-        return Response(serializer.data)
+
+# ─── Analytics: platform-wide (staff) ───────────────────────────────────────
+
+class PlatformAnalyticsView(APIView):
+    """
+    GET /api/analytics/platform/?start=&end= → per-day GMV, new and active
+    users and new listings, order totals per status and listings per
+    category, read from the aggregates api.platform_stats maintains.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        try:
+            bounds = _date_bounds(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        stats = platform_overview(**bounds)
+        return Response({
+            "days": PlatformDaySerializer(stats["days"], many=True).data,
+            "ordersByStatus": StatusTotalSerializer(stats["ordersByStatus"], many=True).data,
+            "listingsByCategory": CategoryValueSerializer(stats["listingsByCategory"], many=True).data,
+            "refreshedAt": stats["refreshedAt"],
+        })
 
 
 class UserNotificationsView(APIView):
     """
-    Returns:
+    Returns (from the user's maintained counters, one primary-key lookup):
       - unreadMessages: number of unread messages addressed to the user
+      - unreadNotifications: number of unread notifications
       - newOrdersToday: number of new orders placed today on listings the user owns
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-
-        unread_messages = Message.objects.filter(
-            recipient=user,
-            read=False
-        ).count()
-
-        new_orders_today = Order.objects.filter(
-            listing__user=user,
-            created_at__date=date.today()
-        ).count()
-
-        return Response({
-            "unreadMessages": unread_messages,
-            "newOrdersToday": new_orders_today,
-        })
+        return Response(get_counters(request.user.id))
@@ -0,0 +1,188 @@
+# api/write_behind.py
+
+"""
+Write-behind persistence for chat messages (CHAT_WRITE_BEHIND).
+
+MessageConsumer builds each Message in memory, with its uid and created_at
+already assigned, and broadcasts it straight away. A MessageWriter thread
+then saves the queued messages in batches: one transaction, one bulk_create
+for the messages and one for their notifications.
+
+Guarantees:
+
+* The queue is bounded (CHAT_WRITE_BEHIND_MAX_PENDING). When it is full,
+  `submit()` refuses the message and the consumer writes it through
+  synchronously. That slows the sender down instead of growing memory.
+* The queue is flushed on interpreter shutdown (atexit) and by `stop()`.
+  A hard crash loses at most the messages accepted in the last flush
+  interval.
+* If a batch fails (say a listing was deleted meanwhile), its messages are
+  retried one by one so a single bad row cannot take the others with it.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .conversations import assign_conversations, record_messages
+from .counters import adjust as adjust_counters
+from .models import Message, Notification, message_notification
+from .notifications import publish as publish_notifications
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def write_messages(messages):
+    """Insert `messages` and their recipients' notifications; returns them."""
+    with transaction.atomic():
+        assign_conversations(messages)
+        Message.objects.bulk_create(messages)
+        record_messages(messages)
+        notifications = Notification.objects.bulk_create(
+            [message_notification(message) for message in messages if message.recipient_id]
+        )
+        # bulk_create skips post_save: count and push them ourselves
+        unread = Counter(message.recipient_id for message in messages if message.recipient_id)
+        for recipient_id, count in unread.items():
+            adjust_counters(recipient_id, unread_messages=count, unread_notifications=count)
+        publish_notifications(notifications)
+    return messages
+
+
+class MessageWriter:
+    def __init__(self, batch_size=200, flush_interval=0.05, max_pending=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def submit(self, message):
+        """Queue `message` for writing; False if the queue is full."""
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until everything submitted so far has been written."""
+        if self._thread is None:
+            self.drain()
+        else:
+            self._queue.join()
+
+    def stop(self, timeout=10):
+        if self._thread is None:
+            self.drain()
+            return
+        self._queue.put(_STOP, timeout=timeout)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def drain(self):
+        """Write everything queued, in the calling thread."""
+        while True:
+            batch = self._take(self._next_nowait, self._next_nowait)
+            if not batch:
+                return
+            self._write(batch)
+
+    # ── internals ────────────────────────────────────────────────────────────
+
+    def _next_nowait(self, timeout=None):
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _next_until(self, deadline):
+        def get(timeout=None):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                return self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return None
+        return get
+
+    def _take(self, first, rest):
+        batch = []
+        item = first()
+        while item is not None:
+            if item is _STOP:
+                self._queue.task_done()
+                batch.append(_STOP)
+                break
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+            item = rest()
+        return batch
+
+    def _run(self):
+        try:
+            while True:
+                batch = self._take(
+                    self._queue.get, self._next_until(time.monotonic() + self.flush_interval)
+                )
+                stopping = batch and batch[-1] is _STOP
+                if stopping:
+                    batch.pop()
+                if batch:
+                    self._write(batch)
+                if stopping:
+                    return
+        finally:
+            connection.close()
+
+    def _write(self, batch):
+        try:
+            write_messages(batch)
+        except Exception:
+            logger.exception("Batch write of %s messages failed; retrying one by one", len(batch))
+            for message in batch:
+                try:
+                    write_messages([message])
+                except Exception:
+                    logger.exception("Dropping chat message %s", message.uid)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_message_writer():
+    """The process's MessageWriter, or None when CHAT_WRITE_BEHIND is off."""
+    global _writer
+    if not getattr(settings, "CHAT_WRITE_BEHIND", False):
+        return None
+    with _writer_lock:
+        if _writer is None:
+            _writer = MessageWriter(
+                batch_size=getattr(settings, "CHAT_WRITE_BEHIND_BATCH_SIZE", 200),
+                flush_interval=getattr(settings, "CHAT_WRITE_BEHIND_FLUSH_INTERVAL", 0.05),
+                max_pending=getattr(settings, "CHAT_WRITE_BEHIND_MAX_PENDING", 10000),
+            )
+            _writer.start()
+        return _writer
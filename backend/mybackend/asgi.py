@@ -3,16 +3,19 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from django.urls import re_path
-from api import consumers  # make sure NotificationConsumer lives here too
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mybackend.settings')
+django_asgi_app = get_asgi_application()
+
+from api import consumers  # noqa: E402  (needs the app registry loaded)
+from api.authentication import FirebaseTokenAuthMiddleware  # noqa: E402
 
 application = ProtocolTypeRouter({
     # HTTP is unchanged
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
 
-    # WebSocket: both chats and notifications
-    "websocket": AuthMiddlewareStack(
+    # WebSocket: both chats and notifications (session or ?token= auth)
+    "websocket": AuthMiddlewareStack(FirebaseTokenAuthMiddleware(
         URLRouter([
             # your existing chat consumer
             re_path(
@@ -20,11 +23,11 @@ application = ProtocolTypeRouter({
                 consumers.MessageConsumer.as_asgi()
             ),
 
-            # new notifications consumer
+            # live notifications + unread counters
             re_path(
                 r"^ws/notifications/$",
                 consumers.NotificationConsumer.as_asgi()
             ),
         ])
-    ),
+    )),
 })
@@ -2,6 +2,7 @@
 
 from pathlib import Path
 import os
+import sys
 
 # ─── Base directory ───────────────────────────────────────────────────────────
 
@@ -106,6 +107,14 @@ STATIC_URL = '/static/'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Serve MEDIA_ROOT from Django (api.media.serve_media). Leave off when a web
+# server or CDN serves media; uploads are content-addressed either way.
+SERVE_MEDIA = DEBUG
+
+# PostingImage renditions (api/images.py) are built on this many background
+# threads after upload; set IMAGE_PIPELINE_EAGER to build them inline instead.
+IMAGE_PIPELINE_WORKERS = 2
+IMAGE_PIPELINE_EAGER   = False
 
 
 # ─── Default primary key field type ───────────────────────────────────────────
@@ -132,16 +141,65 @@ REST_FRAMEWORK = {
 }
 
 
+# ─── Firebase Auth ────────────────────────────────────────────────────────────
+
+FIREBASE_CREDENTIALS_FILE = BASE_DIR / 'firebase_key.json'
+FIREBASE_PROJECT_ID       = None     # defaults to project_id in the credentials file
+
+# Callable used to verify ID tokens. The default checks RS256 signatures
+# locally against Google's signing certs, which are cached on disk at
+# FIREBASE_KEY_CACHE_PATH (see api/firebase_keys.py). For offline dev/tests
+# use "api.authentication.local_verify_id_token" (see LocalTokenVerifier).
+FIREBASE_TOKEN_VERIFIER   = "api.firebase_keys.verify_id_token"
+FIREBASE_KEY_CACHE_PATH   = BASE_DIR / 'firebase_certs_cache.json'
+FIREBASE_TOKEN_CLOCK_SKEW = 0        # seconds of leeway on exp/iat
+# Verified tokens (and the users they resolve to) are cached per process,
+# bounded LRU, for at most this many seconds and never past the token's exp.
+# A cached user is still checked to be active on every request.
+FIREBASE_TOKEN_CACHE_SIZE = 1024
+FIREBASE_TOKEN_CACHE_TTL  = 300
+
+# Signed ?link_token= for file downloads started from a plain link (order
+# exports), valid this many seconds. See DownloadLinkAuthentication.
+DOWNLOAD_LINK_MAX_AGE = 60
+
+
 # ─── Channels / WebSockets ─────────────────────────────────────────────────────
 
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'CONFIG': {
-            'hosts': [('127.0.0.1', 6379)],
+# Layers are shared across processes through Redis (fan-out batched per
+# message), at REDIS_URL or the local default. The single-process in-memory
+# layer is opt-in: CHANNEL_LAYERS_IN_MEMORY=1 (one node, or dev without
+# Redis) and the test runner. It cannot reach other processes, so workers
+# behind a load balancer must never use it.
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')
+CHANNEL_LAYERS_IN_MEMORY = (
+    os.environ.get('CHANNEL_LAYERS_IN_MEMORY') == '1' or 'test' in sys.argv[1:2]
+)
+
+if CHANNEL_LAYERS_IN_MEMORY:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'api.channel_layers.FastInMemoryChannelLayer',
         },
-    },
-}
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'api.channel_layers.BatchedRedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+            },
+        },
+    }
+
+# Write-behind chat persistence (api.write_behind): broadcast first, then
+# bulk-insert messages and notifications every FLUSH_INTERVAL seconds or
+# BATCH_SIZE messages. MAX_PENDING bounds the queue; past it, messages are
+# written through synchronously.
+CHAT_WRITE_BEHIND = False
+CHAT_WRITE_BEHIND_BATCH_SIZE = 200
+CHAT_WRITE_BEHIND_FLUSH_INTERVAL = 0.05
+CHAT_WRITE_BEHIND_MAX_PENDING = 10000
 
 
 # ─── Stripe Payment Keys ──────────────────────────────────────────────────────
@@ -149,13 +207,54 @@ CHANNEL_LAYERS = {
 STRIPE_PUBLIC_KEY  = "pk_test_51RF0z8QwZ6p2QUvMv8etQl1SVBO3SKHD52A2rEtrBxTkt3UUDEigL7pUEoUoSHzqLl3gYREyeUFoctxmTXIsfmEE005qYckJZJ"
 STRIPE_SECRET_KEY  = "sk_test_51RF0z8QwZ6p2QUvMhNYSOZL0k5sHkVXXw0ViZmnKDcaPDzgLeqWhGMlQjpwiT41NTHXqu4pU3ROH07dVWoToR5cO00sEx5fKyk"
 
+# api.payments: STRIPE_API_BASE overrides the API host (e.g. the local stub,
+# `manage.py stripe_stub`). Calls time out after STRIPE_TIMEOUT seconds and
+# network failures are retried, with the same idempotency key.
+STRIPE_API_BASE = os.environ.get("STRIPE_API_BASE")
+STRIPE_TIMEOUT = 10
+STRIPE_MAX_NETWORK_RETRIES = 2
+
+# Webhooks (api.stripe_events): /api/stripe/webhook/ verifies and stores
+# events; `manage.py process_stripe_events` applies them BATCH_SIZE at a time.
+STRIPE_WEBHOOK_SECRET = os.environ.get("STRIPE_WEBHOOK_SECRET")
+STRIPE_WEBHOOK_TOLERANCE = 300
+STRIPE_EVENTS_BATCH_SIZE = 500
+
 
 # ─── Email Settings ──────────────────────────────────────────────────────────
 
-EMAIL_BACKEND      = "django.core.mail.backends.smtp.EmailBackend"
+# Set EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend (or the
+# locmem one) to run the outbox offline; files land in EMAIL_FILE_PATH.
+EMAIL_BACKEND      = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_FILE_PATH    = os.environ.get("EMAIL_FILE_PATH", str(BASE_DIR / "sent_emails"))
+EMAIL_TIMEOUT      = 10
 EMAIL_HOST         = "smtp.gmail.com"
 EMAIL_PORT         = 587
 EMAIL_USE_TLS      = True
 EMAIL_HOST_USER    = "jaewe9@gmail.com"
 EMAIL_HOST_PASSWORD= "plih phvw qykb froq"   # Gmail App Password
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# Outbox (api.outbox): emails are queued in the database and delivered by
+# `manage.py send_outbox`, BATCH_SIZE per SMTP connection. Failures back off
+# exponentially from RETRY_DELAY seconds; after MAX_ATTEMPTS they are DEAD.
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_MAX_RETRY_DELAY = 6 * 3600
+
+# Notification digests (`manage.py send_digests`, e.g. daily from cron) list
+# at most this many notifications per email.
+EMAIL_DIGEST_MAX_ITEMS = 20
+
+
+# ─── Platform analytics ─────────────────────────────────────────────────────
+
+# `manage.py refresh_platform_stats` (api.platform_stats, e.g. every few
+# minutes from cron) recomputes the days since its previous run, going back
+# this many days further to catch orders paid or canceled meanwhile.
+PLATFORM_STATS_LOOKBACK_DAYS = 2
+
+# Admin changelists over big tables (api.admin.LargeTableAdmin) show an
+# estimated total instead of running COUNT(*) once a table reaches this size.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
@@ -2,9 +2,11 @@ import React, { useEffect, useState } from "react";
 import { toast } from "react-toastify";
 import { useLocation, useNavigate, Link } from "react-router-dom";
 import { FaHeart, FaTrash } from "react-icons/fa";
+import { fetchPage } from "../pagination";
 
 export default function ListingsPage() {
   const [listings, setListings] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null); // the next page of listings
   const [filtered, setFiltered] = useState([]);
   const [categories, setCategories] = useState([]);
   const [likedMap, setLikedMap] = useState({});
@@ -29,12 +31,6 @@ export default function ListingsPage() {
       .then(setUser)
       .catch(() => toast.error("Failed to load user"));
 
-    // Fetch listings
-    fetch("http://127.0.0.1:8000/api/postings/")
-      .then((res) => res.json())
-      .then(setListings)
-      .catch(() => toast.error("Failed to load listings"));
-
     // Fetch categories
     fetch("http://127.0.0.1:8000/api/categories/")
       .then((res) => res.json())
@@ -42,6 +38,36 @@ export default function ListingsPage() {
       .catch(() => toast.error("Failed to load categories"));
   }, []);
 
+  const categoryId = categories.find(
+    (c) => c.name.toLowerCase() === selectedCategory.toLowerCase()
+  )?.id;
+
+  // First page of listings; the category filter runs on the server, so
+  // every page loaded afterwards is already in that category.
+  useEffect(() => {
+    const params = new URLSearchParams();
+    if (selectedCategory) {
+      if (categoryId === undefined) return; // categories not loaded yet
+      params.set("category", categoryId);
+    }
+    fetchPage(`http://127.0.0.1:8000/api/postings/?${params}`)
+      .then((data) => {
+        setListings(data.results);
+        setNextUrl(data.next);
+      })
+      .catch(() => toast.error("Failed to load listings"));
+  }, [selectedCategory, categoryId]);
+
+  const loadMore = () => {
+    fetchPage(nextUrl)
+      .then((data) => {
+        setListings((prev) => [...prev, ...data.results]);
+        setNextUrl(data.next);
+      })
+      .catch(() => toast.error("Failed to load more listings"));
+  };
+
+  // Search and sort apply to the listings loaded so far.
   useEffect(() => {
     let results = [...listings];
 
@@ -178,6 +204,8 @@ export default function ListingsPage() {
                   >
                     <img
                       src={imageUrl}
+                      srcSet={item.images?.[0]?.srcset || undefined}
+                      sizes="320px"
                       alt="Listing"
                       style={styles.image}
                       onError={(e) => {
@@ -215,6 +243,12 @@ export default function ListingsPage() {
           })}
         </div>
       )}
+
+      {nextUrl && (
+        <button onClick={loadMore} style={styles.loadMore}>
+          Load more listings
+        </button>
+      )}
     </div>
   );
 }
@@ -325,4 +359,15 @@ const styles = {
     cursor: "pointer",
     marginTop: "10px",
   },
+  loadMore: {
+    display: "block",
+    margin: "2rem auto 0",
+    padding: "10px 18px",
+    background: "#007bff",
+    color: "#fff",
+    border: "none",
+    borderRadius: "6px",
+    cursor: "pointer",
+    fontSize: "0.95rem",
+  },
 };
@@ -2,6 +2,7 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { auth } from "./firebase";
+import { fetchAllPages } from "./pagination";
 import { toast } from "react-toastify";
 import { FaTrash, FaChevronDown, FaChevronUp } from "react-icons/fa";
 
@@ -21,14 +22,12 @@ export default function MyMessages() {
           return;
         }
 
-        const res = await fetch("http://127.0.0.1:8000/api/messages/", {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-
-        if (!res.ok) throw new Error("Failed to load messages");
-
-        const data = await res.json();
-        setMessages(data);
+        // Every page, so that "Sort: Oldest" really starts at the oldest.
+        setMessages(
+          await fetchAllPages("http://127.0.0.1:8000/api/messages/?page_size=100", {
+            headers: { Authorization: `Bearer ${token}` },
+          })
+        );
       } catch (err) {
         console.error("Error fetching messages:", err);
         toast.error("Could not load your messages.");
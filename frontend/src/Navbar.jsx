@@ -1,10 +1,11 @@
 // src/Navbar.jsx
-import React, { useState, useEffect } from "react";
+import React, { useState } from "react";
 import { Link, useNavigate, useLocation } from "react-router-dom";
 import { auth } from "./firebase";
 import { signOut } from "firebase/auth";
 import { toast } from "react-toastify";
 import { useAuth } from "./Auth/AuthContext";
+import useNotificationSocket from "./notificationSocket";
 import { FaBell, FaEnvelope } from "react-icons/fa";
 
 export default function Navbar() {
@@ -15,42 +16,11 @@ export default function Navbar() {
   const navigate = useNavigate();
   const location = useLocation();
 
-  useEffect(() => {
-    if (!user) return;
-    let mounted = true;
-
-    async function loadCounts() {
-      const current = auth.currentUser;
-      if (!current) return;
-
-      const token = await current.getIdToken();
-
-      // notifications summary
-      const notRes = await fetch("/api/analytics/user/notifications/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      if (notRes.ok && mounted) {
-        const { unreadMessages, newOrdersToday } = await notRes.json();
-        setNotifCount(unreadMessages + newOrdersToday);
-      }
-
-      // unread messages
-      const msgRes = await fetch("/api/messages/inbox/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      if (msgRes.ok && mounted) {
-        const data = await msgRes.json();
-        setMsgCount(data.filter((m) => !m.read).length);
-      }
-    }
-
-    loadCounts();
-    const intervalId = setInterval(loadCounts, 60_000);
-    return () => {
-      mounted = false;
-      clearInterval(intervalId);
-    };
-  }, [user]);
+  // counts are pushed over ws/notifications/ (no polling)
+  useNotificationSocket(({ counters }) => {
+    setNotifCount(counters.unreadMessages + counters.newOrdersToday);
+    setMsgCount(counters.unreadMessages);
+  }, !!user);
 
   if (loading || !user) return null;
   if (["/login", "/register"].includes(location.pathname)) return null;
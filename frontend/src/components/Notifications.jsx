@@ -4,6 +4,8 @@ import { FaEnvelope, FaBell } from "react-icons/fa";
 import { useNavigate } from "react-router-dom";
 import { auth } from "../firebase";
 import { toast } from "react-toastify";
+import { fetchPage } from "../pagination";
+import useNotificationSocket from "../notificationSocket";
 
 export default function Notifications() {
   const [loading, setLoading] = useState(true);
@@ -26,18 +28,23 @@ export default function Notifications() {
       setUnreadCount(um);
       setNewOrdersCount(no);
 
-      // 2) Fetch inbox, extract unread message details
-      const inboxRes = await fetch("/api/messages/inbox/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      if (!inboxRes.ok) throw new Error("Failed to load messages");
-      const inboxData = await inboxRes.json();
-      // grab only unread, limit to 5, sorted newest first
-      const unread = inboxData
-        .filter((m) => !m.read)
-        .sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
-        .slice(0, 5);
-      setUnreadMessages(unread);
+      // 2) The 5 newest unread messages: the inbox comes newest first, so
+      // follow `next` only until they are found (or all `um` of them are)
+      const wanted = Math.min(5, um);
+      const unread = [];
+      let next = wanted ? "/api/messages/inbox/" : null;
+      while (next && unread.length < wanted) {
+        const page = await fetchPage(next, {
+          headers: { Authorization: `Bearer ${token}` },
+        }).catch(() => {
+          throw new Error("Failed to load messages");
+        });
+        unread.push(
+          ...page.results.filter((m) => !m.read && m.recipient === auth.currentUser.email)
+        );
+        next = page.next;
+      }
+      setUnreadMessages(unread.slice(0, 5));
     } catch (err) {
       console.error(err);
       toast.error(err.message || "Could not load notifications");
@@ -48,10 +55,15 @@ export default function Notifications() {
 
   useEffect(() => {
     fetchData();
-    const iv = setInterval(fetchData, 60_000);
-    return () => clearInterval(iv);
   }, []);
 
+  // live updates: counters on every push, the inbox only when something new arrived
+  useNotificationSocket(({ notifications, counters }) => {
+    setUnreadCount(counters.unreadMessages);
+    setNewOrdersCount(counters.newOrdersToday);
+    if (notifications.length) fetchData();
+  });
+
   if (loading) {
     return <p style={styles.loading}>Loading notifications…</p>;
   }
@@ -0,0 +1,58 @@
+// src/notificationSocket.js
+import { useEffect, useRef } from "react";
+import { auth } from "./firebase";
+
+const WS_BASE =
+  process.env.REACT_APP_WS_URL ||
+  `${window.location.protocol === "https:" ? "wss" : "ws"}://${window.location.hostname}:8000`;
+
+/**
+ * Subscribes to ws/notifications/ and calls onFrame({ notifications, counters })
+ * on connect and on every new notification. Reconnects with backoff and
+ * resumes from the last notification id it saw, so nothing is missed.
+ */
+export default function useNotificationSocket(onFrame, enabled = true) {
+  const handler = useRef(onFrame);
+  handler.current = onFrame;
+
+  useEffect(() => {
+    if (!enabled) return;
+    let socket = null;
+    let retryTimer = null;
+    let closed = false;
+    let lastId = null;
+    let delay = 1000;
+
+    async function open() {
+      const current = auth.currentUser;
+      if (!current || closed) return;
+      const params = new URLSearchParams({ token: await current.getIdToken() });
+      if (lastId !== null) params.set("last_id", lastId);
+
+      socket = new WebSocket(`${WS_BASE}/ws/notifications/?${params}`);
+      socket.onopen = () => {
+        delay = 1000;
+      };
+      socket.onmessage = (event) => {
+        const frame = JSON.parse(event.data);
+        if (frame.last_id !== undefined) lastId = Math.max(lastId ?? 0, frame.last_id);
+        frame.notifications.forEach((n) => {
+          lastId = Math.max(lastId ?? 0, n.id);
+        });
+        handler.current(frame);
+      };
+      socket.onclose = () => {
+        if (closed) return;
+        retryTimer = setTimeout(open, delay);
+        delay = Math.min(delay * 2, 30_000);
+      };
+    }
+
+    open();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (socket) socket.close();
+    };
+  }, [enabled]);
+}
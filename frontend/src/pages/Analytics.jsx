@@ -37,30 +37,15 @@ export default function Analytics() {
         if (end)   params.set("end", end);
         const qs = params.toString() ? `?${params.toString()}` : "";
 
-        // fire off all 4 requests in parallel
-        const [ovRes, pbmRes, sbmRes, sbcRes] = await Promise.all([
-          fetch(`/api/analytics/user/overview/${qs}`,          { headers }),
-          fetch(`/api/analytics/user/posts-by-month/${qs}`,    { headers }),
-          fetch(`/api/analytics/user/sales-by-month/${qs}`,    { headers }),
-          fetch(`/api/analytics/user/sales-by-category/${qs}`, { headers }),
-        ]);
+        // every panel in one request; unchanged dashboards come back as a 304
+        const res = await fetch(`/api/analytics/user/dashboard/${qs}`, { headers });
+        if (!res.ok) throw new Error("Dashboard failed");
+        const data = await res.json();
 
-        if (!ovRes.ok)  throw new Error("Overview failed");
-        if (!pbmRes.ok) throw new Error("Posts-by-month failed");
-        if (!sbmRes.ok) throw new Error("Sales-by-month failed");
-        if (!sbcRes.ok) throw new Error("Sales-by-category failed");
-
-        const [ovData, pbmData, sbmData, sbcData] = await Promise.all([
-          ovRes.json(),
-          pbmRes.json(),
-          sbmRes.json(),
-          sbcRes.json(),
-        ]);
-
-        setOverview(ovData);
-        setPostsByMonth(pbmData);
-        setSalesByMonth(sbmData);
-        setSalesByCategory(sbcData);
+        setOverview(data.overview);
+        setPostsByMonth(data.postsByMonth);
+        setSalesByMonth(data.salesByMonth);
+        setSalesByCategory(data.salesByCategory);
       } catch (err) {
         console.error(err);
         toast.error("Could not load analytics");
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { toast } from "react-toastify";
 import { auth } from "../firebase";
@@ -13,6 +13,9 @@ export default function CheckoutPage() {
   const [listing, setListing] = useState(null);
   const [selectedPayment, setSelectedPayment] = useState("");
   const [loading, setLoading] = useState(false);
+  // One order (and so one PaymentIntent) per visit, however often Pay is pressed
+  const orderRef = useRef(null);
+  const idempotencyKey = useRef(crypto.randomUUID());
 
   const [firstName, setFirstName] = useState("");
   const [lastName, setLastName] = useState("");
@@ -52,6 +55,7 @@ export default function CheckoutPage() {
       headers: {
         "Content-Type": "application/json",
         Authorization: `Bearer ${token}`,
+        "Idempotency-Key": idempotencyKey.current,
       },
       body: JSON.stringify({ listing_id: id }),
     });
@@ -79,14 +83,46 @@ export default function CheckoutPage() {
 
     try {
       if (name.includes("credit") && stripe && elements) {
+        // Place the order first: the PaymentIntent is derived from it, so the
+        // amount comes from the server and retries reuse the same intent.
+        if (!orderRef.current) {
+          const res = await fetch(`http://127.0.0.1:8000/api/orders/`, {
+            method: "POST",
+            headers: {
+              "Content-Type": "application/json",
+              Authorization: `Bearer ${token}`,
+            },
+            body: JSON.stringify({
+              listing: Number(id),
+              payment_method: Number(selectedPayment),
+              offerings: [],
+              address_details: {
+                first_name: firstName,
+                last_name: lastName,
+                email,
+                phone,
+                street,
+                city,
+                state,
+                zip,
+                country,
+              },
+            }),
+          });
+          if (!res.ok) throw new Error("Order creation failed");
+          orderRef.current = await res.json();
+        }
+        const order = orderRef.current;
+
         const intentRes = await fetch("http://127.0.0.1:8000/api/create-payment-intent/", {
           method: "POST",
           headers: {
             "Content-Type": "application/json",
             Authorization: `Bearer ${token}`,
           },
-          body: JSON.stringify({ amount: listing.price }),
+          body: JSON.stringify({ order_id: order.id }),
         });
+        if (!intentRes.ok) throw new Error("Could not start payment");
 
         const { client_secret } = await intentRes.json();
 
@@ -104,35 +140,6 @@ export default function CheckoutPage() {
         if (result.error) throw new Error(result.error.message);
         if (result.paymentIntent.status !== "succeeded") throw new Error("Payment not successful");
 
-        const paymentIntentId = result.paymentIntent.id;
-
-        const res = await fetch(`http://127.0.0.1:8000/api/orders/`, {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-            Authorization: `Bearer ${token}`,
-          },
-          body: JSON.stringify({
-            listing: Number(id),
-            payment_method: Number(selectedPayment),
-            stripe_payment_intent_id: paymentIntentId,
-            offerings: [],
-            address_details: {
-              first_name: firstName,
-              last_name: lastName,
-              email,
-              phone,
-              street,
-              city,
-              state,
-              zip,
-              country,
-            },
-          }),
-        });
-
-        if (!res.ok) throw new Error("Order creation failed");
-        const order = await res.json();
         toast.success("Order placed successfully! 🎉");
         navigate(`/order-confirmation/${order.id}`);
       } else {
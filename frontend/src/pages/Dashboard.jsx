@@ -5,8 +5,8 @@ import { useNavigate } from "react-router-dom"; // Import useNavigate
 
 const LandingPage = () => {
   const [categories, setCategories] = useState([]);
-  const [allListings, setAllListings] = useState([]);
   const [listings, setListings] = useState([]);
+  const [nextListings, setNextListings] = useState(null); // URL of the next page
   const [searchQuery, setSearchQuery] = useState("");
   // Store category name in state for the dropdown
   const [selectedCategory, setSelectedCategory] = useState("");
@@ -27,10 +27,10 @@ const LandingPage = () => {
         const categoryResponse = await axios.get("http://127.0.0.1:8000/api/categories/");
         setCategories(categoryResponse.data);
 
-        // Fetch listings (if you want to display them on the landing page)
-        const listingsResponse = await axios.get("http://127.0.0.1:8000/api/postings/");
-        setListings(listingsResponse.data);
-        setAllListings(listingsResponse.data); // Store the full listings data separately
+        // Fetch the newest listings; "Show more" follows the `next` cursor
+        const listingsResponse = await axios.get("http://127.0.0.1:8000/api/postings/?page_size=12");
+        setListings(listingsResponse.data.results);
+        setNextListings(listingsResponse.data.next);
       } catch (error) {
         console.error("Error fetching data:", error);
       } finally {
@@ -41,6 +41,16 @@ const LandingPage = () => {
     fetchData();
   }, []);
 
+  const loadMoreListings = async () => {
+    try {
+      const response = await axios.get(nextListings);
+      setListings((prev) => [...prev, ...response.data.results]);
+      setNextListings(response.data.next);
+    } catch (error) {
+      console.error("Error fetching more listings:", error);
+    }
+  };
+
   // Handle search query change with debouncing (still used for suggestions)
   useEffect(() => {
     const timer = setTimeout(() => {
@@ -192,6 +202,11 @@ const LandingPage = () => {
             </div>
           ))}
         </div>
+        {nextListings && (
+          <button onClick={loadMoreListings} style={styles.showMoreButton}>
+            Show more
+          </button>
+        )}
       </section>
     </div>
   );
@@ -315,6 +330,15 @@ const styles = {
     color: "#e91e63",
     marginTop: "1rem",
   },
+  showMoreButton: {
+    marginTop: "1.5rem",
+    padding: "0.6rem 1.5rem",
+    backgroundColor: "#5A2D76",
+    color: "#fff",
+    border: "none",
+    borderRadius: "4px",
+    cursor: "pointer",
+  },
 };
 
 export default LandingPage;
@@ -3,19 +3,43 @@ import React, { useEffect, useState, useRef } from "react";
 import { auth } from "../firebase";
 import { toast } from "react-toastify";
 import { FaTrash } from "react-icons/fa";
+import { fetchPage } from "../pagination";
+
+// Both lists come newest first, one cursor page at a time; `next` is the
+// URL of the following (older) page, or null.
+async function fetchAuthorized(url) {
+  const token = await auth.currentUser?.getIdToken();
+  return fetchPage(url, { headers: { Authorization: `Bearer ${token}` } });
+}
+
+function mergeById(newer, older) {
+  const seen = new Set(newer.map((item) => item.id));
+  return [...newer, ...older.filter((item) => !seen.has(item.id))];
+}
 
 export default function Inbox() {
-  const [conversations, setConversations] = useState({});
-  const [selectedListingId, setSelectedListingId] = useState(null);
+  const [conversations, setConversations] = useState([]);
+  // undefined until the first page arrives; null once every page is loaded.
+  const [conversationsNext, setConversationsNext] = useState(undefined);
+  const [selectedId, setSelectedId] = useState(null);
+  const [messages, setMessages] = useState([]);
+  const [messagesNext, setMessagesNext] = useState(null);
   const [replyText, setReplyText] = useState("");
   const isTyping = useRef(false);
+  const selectedRef = useRef(null);
   const currentEmail = auth.currentUser?.email;
   const messagesEndRef = useRef(null);
 
   useEffect(() => {
-    fetchMessages();
+    selectedRef.current = selectedId;
+  }, [selectedId]);
+
+  useEffect(() => {
+    fetchConversations();
     const iv = setInterval(() => {
-      if (!isTyping.current) fetchMessages();
+      if (isTyping.current) return;
+      fetchConversations();
+      if (selectedRef.current) fetchMessages(selectedRef.current);
     }, 30000);
     return () => clearInterval(iv);
   }, []);
@@ -24,70 +48,99 @@ export default function Inbox() {
     if (messagesEndRef.current) {
       messagesEndRef.current.scrollIntoView({ behavior: "smooth" });
     }
-  }, [conversations, selectedListingId]);
+  }, [selectedId, messages.length]);
 
-  async function fetchMessages() {
+  // The newest page; conversations loaded further down are kept.
+  async function fetchConversations() {
     try {
-      const token = await auth.currentUser?.getIdToken();
-      const res = await fetch("/api/messages/inbox/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      if (!res.ok) throw new Error();
-      const data = await res.json();
-
-      const grouped = {};
-      data.forEach((msg) => {
-        const lid = msg.listing;
-        if (!grouped[lid]) grouped[lid] = { title: msg.listing_title, messages: [] };
-        grouped[lid].messages.push({ ...msg, isOwn: msg.sender === currentEmail });
-      });
-      setConversations(grouped);
-      if (selectedListingId && !grouped[selectedListingId]) setSelectedListingId(null);
+      const data = await fetchAuthorized("/api/messages/conversations/");
+      setConversations((prev) => mergeById(data.results, prev));
+      setConversationsNext((prev) => (prev === undefined ? data.next : prev));
     } catch {
       toast.error("Could not load inbox");
     }
   }
 
-  async function handleSelectThread(lid) {
-    setSelectedListingId(lid);
+  async function loadMoreConversations() {
+    try {
+      const data = await fetchAuthorized(conversationsNext);
+      setConversations((prev) => mergeById(prev, data.results));
+      setConversationsNext(data.next);
+    } catch {
+      toast.error("Could not load more conversations");
+    }
+  }
+
+  // The newest page of one thread, merged into what is already shown.
+  async function fetchMessages(id, { reset = false } = {}) {
+    try {
+      const data = await fetchAuthorized(`/api/messages/conversations/${id}/`);
+      if (selectedRef.current !== id) return;
+      setMessages((prev) => (reset ? data.results : mergeById(data.results, prev)));
+      if (reset) setMessagesNext(data.next);
+      return data.results;
+    } catch {
+      toast.error("Could not load the conversation");
+      return [];
+    }
+  }
+
+  async function loadOlderMessages() {
+    try {
+      const data = await fetchAuthorized(messagesNext);
+      setMessages((prev) => mergeById(prev, data.results));
+      setMessagesNext(data.next);
+    } catch {
+      toast.error("Could not load older messages");
+    }
+  }
+
+  async function handleSelectThread(conversation) {
+    selectedRef.current = conversation.id;
+    setSelectedId(conversation.id);
+    setMessages([]);
+    setMessagesNext(null);
     setReplyText("");
-    const unreadIds = conversations[lid].messages
-      .filter(m => !m.isOwn && !m.read)
-      .map(m => m.id);
-    if (unreadIds.length) {
-      try {
-        const token = await auth.currentUser?.getIdToken();
-        await fetch("/api/messages/mark-read/", {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-            Authorization: `Bearer ${token}`,
-          },
-          body: JSON.stringify({ ids: unreadIds }),
-        });
-        fetchMessages();
-      } catch {
-        toast.error("Failed to mark as read");
-      }
+    const loaded = await fetchMessages(conversation.id, { reset: true });
+    const unreadIds = (loaded || [])
+      .filter((m) => m.sender !== currentEmail && !m.read)
+      .map((m) => m.id);
+    if (!unreadIds.length) return;
+    try {
+      const token = await auth.currentUser?.getIdToken();
+      await fetch("/api/messages/mark-read/", {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${token}`,
+        },
+        body: JSON.stringify({ ids: unreadIds }),
+      });
+      setMessages((prev) => prev.map((m) => (unreadIds.includes(m.id) ? { ...m, read: true } : m)));
+      fetchConversations();
+    } catch {
+      toast.error("Failed to mark as read");
     }
   }
 
-  async function handleDeleteThread(lid) {
+  const selected = conversations.find((c) => c.id === selectedId);
+
+  async function handleDeleteThread(conversation) {
     if (!window.confirm("Delete this entire conversation?")) return;
     try {
       const token = await auth.currentUser?.getIdToken();
-      const res = await fetch(`/api/messages/conversation/${lid}/`, {
+      const res = await fetch(`/api/messages/conversation/${conversation.listing}/`, {
         method: "DELETE",
         headers: { Authorization: `Bearer ${token}` },
       });
       // only treat 400+ as failure; 2xx/3xx (including 204) are OK
       if (res.status >= 400) throw new Error(`HTTP ${res.status}`);
-      setConversations(prev => {
-        const copy = { ...prev };
-        delete copy[lid];
-        return copy;
-      });
-      if (selectedListingId === lid) setSelectedListingId(null);
+      // The endpoint deletes every thread the user has about that listing.
+      setConversations((prev) => prev.filter((c) => c.listing !== conversation.listing));
+      if (selected && selected.listing === conversation.listing) {
+        setSelectedId(null);
+        setMessages([]);
+      }
       toast.success("Conversation deleted");
     } catch {
       toast.error("Failed to delete");
@@ -95,12 +148,12 @@ export default function Inbox() {
   }
 
   async function handleReply() {
-    if (!replyText.trim()) return;
-    const msgs = conversations[selectedListingId].messages;
-    const last = msgs[msgs.length - 1];
+    if (!replyText.trim() || !messages.length) return;
+    // Reply to the other participant's latest message (messages are newest first).
+    const target = messages.find((m) => m.sender !== currentEmail) || messages[0];
     try {
       const token = await auth.currentUser?.getIdToken();
-      const res = await fetch(`/api/messages/${last.id}/reply/`, {
+      const res = await fetch(`/api/messages/${target.id}/reply/`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -111,25 +164,28 @@ export default function Inbox() {
       if (!res.ok) throw new Error();
       setReplyText("");
       isTyping.current = false;
-      fetchMessages();
+      fetchMessages(selectedId);
+      fetchConversations();
     } catch {
       toast.error("Failed to send reply");
     }
   }
 
-  const threads = Object.entries(conversations);
-
   return (
     <div style={styles.container}>
       <aside style={styles.sidebar}>
         <h2 style={styles.sidebarTitle}>Conversations</h2>
-        {threads.map(([lid, { title, messages }]) => {
-          const last = messages[messages.length - 1];
-          const unreadCount = messages.filter(m => !m.isOwn && !m.read).length;
-          const isActive = lid.toString() === selectedListingId;
+        {conversations.map((conversation) => {
+          const last = conversation.last_message;
+          const other =
+            conversation.buyer === currentEmail ? conversation.seller : conversation.buyer;
+          const ownId =
+            conversation.buyer === currentEmail ? conversation.buyer_id : conversation.seller_id;
+          const isOwn = last && last.sender_id === ownId;
+          const isActive = conversation.id === selectedId;
           return (
             <div
-              key={lid}
+              key={conversation.id}
               style={{
                 ...styles.thread,
                 ...(isActive ? styles.threadActive : {}),
@@ -137,29 +193,29 @@ export default function Inbox() {
             >
               <div style={styles.threadContent}>
                 <div
-                  onClick={() => handleSelectThread(lid)}
+                  onClick={() => handleSelectThread(conversation)}
                   style={styles.threadInner}
                 >
-                  <div style={styles.avatar}>
-                    {(last.isOwn ? currentEmail : last.sender)[0].toUpperCase()}
-                  </div>
+                  <div style={styles.avatar}>{(other || "?")[0].toUpperCase()}</div>
                   <div style={styles.metadata}>
                     <div style={styles.threadTitle}>
-                      {title}
-                      {unreadCount > 0 && (
-                        <span style={styles.unreadBadge}>{unreadCount}</span>
+                      {conversation.listing_title}
+                      {conversation.unread > 0 && (
+                        <span style={styles.unreadBadge}>{conversation.unread}</span>
                       )}
                     </div>
-                    <div style={styles.threadPreview}>
-                      {last.isOwn ? "You: " : ""}
-                      {last.content.length > 30
-                        ? `${last.content.slice(0, 30)}…`
-                        : last.content}
-                    </div>
+                    {last && (
+                      <div style={styles.threadPreview}>
+                        {isOwn ? "You: " : ""}
+                        {last.content.length > 30
+                          ? `${last.content.slice(0, 30)}…`
+                          : last.content}
+                      </div>
+                    )}
                   </div>
                 </div>
                 <button
-                  onClick={() => handleDeleteThread(lid)}
+                  onClick={() => handleDeleteThread(conversation)}
                   style={styles.deleteBtnInline}
                   title="Delete"
                 >
@@ -169,42 +225,53 @@ export default function Inbox() {
             </div>
           );
         })}
+        {conversationsNext && (
+          <button style={styles.loadMoreBtn} onClick={loadMoreConversations}>
+            Load more conversations
+          </button>
+        )}
       </aside>
 
       <main style={styles.chat}>
         <header style={styles.chatHeader}>
-          {selectedListingId
-            ? conversations[selectedListingId].title
-            : "Select a conversation"}
+          {selected ? selected.listing_title : "Select a conversation"}
         </header>
 
         <section style={styles.messages}>
-          {selectedListingId &&
-            conversations[selectedListingId].messages
+          {selectedId && messagesNext && (
+            <button style={styles.loadMoreBtn} onClick={loadOlderMessages}>
+              Load older messages
+            </button>
+          )}
+          {selectedId &&
+            messages
               .slice()
-              .sort((a, b) => new Date(a.created_at) - new Date(b.created_at))
-              .map((msg) => (
-                <div
-                  key={msg.id}
-                  style={{
-                    ...styles.message,
-                    ...(msg.isOwn ? styles.messageSent : styles.messageReceived),
-                    opacity: msg.read || msg.isOwn ? 1 : 0.8,
-                  }}
-                >
-                  <div style={styles.messageHeader}>
-                    <strong>{msg.isOwn ? "You" : msg.sender}</strong>
-                  </div>
-                  <div style={styles.messageBody}>{msg.content}</div>
-                  <div style={styles.messageTime}>
-                    {new Date(msg.created_at).toLocaleTimeString()}
+              .reverse()
+              .map((msg) => {
+                const isOwn = msg.sender === currentEmail;
+                return (
+                  <div
+                    key={msg.id}
+                    style={{
+                      ...styles.message,
+                      ...(isOwn ? styles.messageSent : styles.messageReceived),
+                      opacity: msg.read || isOwn ? 1 : 0.8,
+                    }}
+                  >
+                    <div style={styles.messageHeader}>
+                      <strong>{isOwn ? "You" : msg.sender}</strong>
+                    </div>
+                    <div style={styles.messageBody}>{msg.content}</div>
+                    <div style={styles.messageTime}>
+                      {new Date(msg.created_at).toLocaleTimeString()}
+                    </div>
                   </div>
-                </div>
-              ))}
+                );
+              })}
           <div ref={messagesEndRef} />
         </section>
 
-        {selectedListingId && (
+        {selectedId && (
           <footer style={styles.replyBox}>
             <textarea
               style={styles.textarea}
@@ -309,6 +376,18 @@ const styles = {
     fontSize: "0.75rem",
     color: "#888",
   },
+  loadMoreBtn: {
+    display: "block",
+    width: "100%",
+    margin: "0.5rem 0",
+    padding: "0.4rem",
+    background: "transparent",
+    border: "1px solid #007bff",
+    borderRadius: 6,
+    color: "#007bff",
+    fontSize: "0.85rem",
+    cursor: "pointer",
+  },
   deleteBtnInline: {
     background: "transparent",
     border: "none",
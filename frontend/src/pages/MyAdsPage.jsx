@@ -3,6 +3,7 @@ import React, { useEffect, useState } from "react";
 import { Link, useNavigate } from "react-router-dom";
 import { FaEdit, FaTrash, FaDollarSign, FaMapMarkerAlt } from "react-icons/fa";
 import { auth } from "../firebase";
+import { fetchAllPages } from "../pagination";
 import { toast } from "react-toastify";
 
 export default function MyAdsPage() {
@@ -13,12 +14,11 @@ export default function MyAdsPage() {
     const fetchMyAds = async () => {
       try {
         const token = await auth.currentUser?.getIdToken();
-        const res = await fetch("http://127.0.0.1:8000/api/postings/?mine=true", {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        if (!res.ok) throw new Error();
-        const data = await res.json();
-        setAds(data);
+        setAds(
+          await fetchAllPages("http://127.0.0.1:8000/api/postings/?mine=true&page_size=100", {
+            headers: { Authorization: `Bearer ${token}` },
+          })
+        );
       } catch {
         toast.error("Couldn't load your ads");
       }
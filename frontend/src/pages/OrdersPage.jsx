@@ -1,6 +1,7 @@
 // src/pages/OrdersPage.jsx
 import React, { useEffect, useState, useMemo } from "react";
 import { auth } from "../firebase";
+import { fetchAllPages } from "../pagination";
 import { toast } from "react-toastify";
 import { useNavigate } from "react-router-dom";
 import { FaChevronDown, FaChevronRight } from "react-icons/fa";
@@ -29,16 +30,16 @@ export default function OrdersPage() {
 
   const navigate = useNavigate();
 
-  // Load current user's orders
+  // Load all of the current user's orders (filtered and sorted below)
   useEffect(() => {
     (async function loadOrders() {
       try {
         const token = await auth.currentUser.getIdToken();
-        const res = await fetch("/api/orders/", {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        if (!res.ok) throw new Error("Failed to fetch orders");
-        setOrders(await res.json());
+        setOrders(
+          await fetchAllPages("/api/orders/?page_size=100", {
+            headers: { Authorization: `Bearer ${token}` },
+          })
+        );
       } catch (err) {
         console.error(err);
         toast.error("Could not load your orders");
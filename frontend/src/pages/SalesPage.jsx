@@ -1,6 +1,7 @@
 // src/pages/SalesPage.jsx
 import React, { useEffect, useState, useMemo } from "react";
 import { auth } from "../firebase";
+import { fetchAllPages } from "../pagination";
 import { toast } from "react-toastify";
 import { useNavigate } from "react-router-dom";
 import { FaChevronDown, FaChevronRight } from "react-icons/fa";
@@ -32,13 +33,13 @@ export default function SalesPage() {
   useEffect(() => {
     (async function loadSales() {
       try {
+        // Every page: the filters, sorting and paging below are client-side.
         const token = await auth.currentUser.getIdToken();
-        const res = await fetch("/api/orders/sales/", {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        if (!res.ok) throw new Error("Failed to fetch sales");
-        const data = await res.json();
-        setOrders(data);
+        setOrders(
+          await fetchAllPages("/api/orders/sales/?page_size=100", {
+            headers: { Authorization: `Bearer ${token}` },
+          })
+        );
       } catch (err) {
         console.error(err);
         toast.error("Could not load your sales");
@@ -127,6 +128,32 @@ export default function SalesPage() {
     setSelectedIds({});
   };
 
+  // Download every matching sale, streamed by the server (not just this page)
+  const handleExport = async (as) => {
+    try {
+      // A plain link lets the browser stream the file straight to disk; the
+      // short-lived link_token stands in for the Authorization header.
+      const token = await auth.currentUser.getIdToken();
+      const res = await fetch("/api/orders/export-link/", {
+        method: "POST",
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (!res.ok) throw new Error("Export failed");
+      const { link_token } = await res.json();
+      const params = new URLSearchParams({ as, link_token });
+      if (dateFrom) params.set("start", dateFrom);
+      if (dateTo) params.set("end", dateTo);
+      if (statusFilter !== "all") params.set("status", statusFilter);
+      const link = document.createElement("a");
+      link.href = `http://127.0.0.1:8000/api/orders/sales/export/?${params}`;
+      link.download = "";
+      link.click();
+    } catch (err) {
+      console.error(err);
+      toast.error("Could not export your sales");
+    }
+  };
+
   const toggleSort = (col) => {
     if (sortBy === col) {
       setSortAsc(!sortAsc);
@@ -191,6 +218,12 @@ export default function SalesPage() {
         <button onClick={handleBulkShip} style={styles.bulkBtn}>
           Mark as Shipped
         </button>
+        <button onClick={() => handleExport("csv")} style={styles.exportBtn}>
+          Export CSV
+        </button>
+        <button onClick={() => handleExport("jsonl")} style={styles.exportBtn}>
+          Export JSONL
+        </button>
       </div>
 
       {/* TABLE */}
@@ -350,6 +383,14 @@ const styles = {
     borderRadius: 4,
     cursor: "pointer",
   },
+  exportBtn: {
+    padding: "6px 12px",
+    background: "#fff",
+    color: "#007bff",
+    border: "1px solid #007bff",
+    borderRadius: 4,
+    cursor: "pointer",
+  },
   table: { width: "100%", borderCollapse: "collapse" },
   th: {
     textAlign: "left",
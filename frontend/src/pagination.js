@@ -0,0 +1,21 @@
+// src/pagination.js
+// List endpoints return one cursor page at a time: { results, next }, where
+// `next` is the URL of the following page (null on the last one).
+
+export async function fetchPage(url, init) {
+  const res = await fetch(url, init);
+  if (!res.ok) throw new Error(`HTTP ${res.status}`);
+  return res.json();
+}
+
+// Every page, following `next`. Only for views that filter and sort the
+// whole (per-user) set on the client; ask for big pages (?page_size=100).
+export async function fetchAllPages(url, init) {
+  const items = [];
+  for (let next = url; next; ) {
+    const data = await fetchPage(next, init);
+    items.push(...data.results);
+    next = data.next;
+  }
+  return items;
+}